@@ -1,3 +1,4 @@
+import hashlib
 import os
 import re
 from copy import deepcopy, copy
@@ -18,6 +19,14 @@ log = get_logger(__name__)
 
 SUBMECHS_VIA_ASSEMBLIES = False
 
+# the lock that is held while meshes are written to the central mesh directories when models are processed concurrently
+_central_mesh_lock = None
+
+
+def set_central_mesh_lock(lock):
+    global _central_mesh_lock
+    _central_mesh_lock = lock
+
 
 class BaseModel(yaml.YAMLObject):
     def __init__subclass__(self, configfile, pipeline, processed_model_exists=True, configkey=None):
@@ -66,6 +75,8 @@ class BaseModel(yaml.YAMLObject):
                 defaults_string = misc.regex_replace(defaults_string, replacements={"@"+k+"@": json.dumps(v)[1:-1] for k, v in parent.items()})
                 kwargs = load_json(defaults_string)
                 kwargs.pop("defaults")
+        # the resolved definition, which is part of the fingerprint of this model's inputs
+        self.config_hash = hashlib.sha256(dump_json(kwargs).encode()).hexdigest()
         for (k, v) in kwargs.items():
             setattr(self, k, v)
         # check whether all necessary configurations are there
@@ -140,13 +151,18 @@ class BaseModel(yaml.YAMLObject):
 
         # list directly imported mesh pathes
         self._meshes = []
+        # the files of the basefile input models, the models imported from repos are defined by their commit
+        self._input_files = []
         for _, v in self.input_models.items():
             if "basefile" in v.keys():
                 r = Robot(inputfile=v["basefile"], is_human=v["is_human"] if "is_human" in v else False)
+                self._input_files += [f for f in [v["basefile"], r.xmlfile, r.smurffile] if f is not None]
                 for link in r.links:
                     for g in link.visuals + link.collisions:
                         if isinstance(g.geometry, representation.Mesh):
                             self._meshes += [xml.read_relative_filename(g.geometry.filepath[:-4], v["basefile"])]
+                            if g.geometry.input_file is not None:
+                                self._input_files.append(g.geometry.input_file)
             elif "repo" in v.keys():
                 repo_path = os.path.join(self.tempdir, "repo", os.path.basename(self.input_models["repo"]["git"]))
                 git.clone(
@@ -547,6 +563,7 @@ class BaseModel(yaml.YAMLObject):
                 for k, v in config.items():
                     if k == "name_editing":
                         link.name = misc.edit_name_string(link.name, **v, correspondance=link)
+            self.robot.regenerate_tree_maps()
             if "$name_editing" in self.frames:
                 self.robot.rename("links", self.robot.links, **self.frames.get("$name_editing", {}))
 
@@ -653,6 +670,7 @@ class BaseModel(yaml.YAMLObject):
                 if jointname in self.joints or self.joints.get("$all", False):
                     config = misc.merge_default(self.joints[jointname] if jointname in self.joints else {}, _default)
                     joint.name = misc.edit_name_string(joint.name, **config.get("name_editing", {}), correspondance=joint)
+            self.robot.regenerate_tree_maps()
             if "$name_editing" in self.joints:
                 self.robot.rename("joints", self.robot.joints, **self.joints.get("$name_editing", {}))
         # as we mess manually with some names, we need to make sure the tree maps are up to date
@@ -838,7 +856,8 @@ class BaseModel(yaml.YAMLObject):
                                          apply_scale=getattr(self, "apply_scale", None),
                                          ros_pkg_name=getattr(self, "ros_pkg_name", None),
                                          filename=getattr(self, "filename", None),
-                                         mark_as_autogenerated=getattr(self, "mark_as_autogenerated", False)
+                                         mark_as_autogenerated=getattr(self, "mark_as_autogenerated", False),
+                                         mesh_lock=_central_mesh_lock if self.pipeline.central_meshes else None
                                          )
         for vc in self.robot.collisions + self.robot.visuals:
             if isinstance(vc.geometry, representation.Mesh):
@@ -878,6 +897,15 @@ class BaseModel(yaml.YAMLObject):
                 license=getattr(self, "license", None)
             )
 
+    @staticmethod
+    def get_deploy_target_branch(failed_model=False):
+        """
+        Returns the branch of the result repo the model is deployed to
+        """
+        if os.getenv("CI_COMMIT_BRANCH", "").startswith("feature/"):
+            return os.getenv("CI_COMMIT_BRANCH")
+        return git.GIT_FAILURE_BRANCH if failed_model else git.GIT_SUCCESS_BRANCH
+
     def deploy(self, mesh_commit, failed_model=False, uses_lfs=False):
         feature_branch = None
         if os.getenv("CI_COMMIT_BRANCH", "").startswith("feature/"):
@@ -894,7 +922,7 @@ class BaseModel(yaml.YAMLObject):
         if "keep_files" in self.deployment:
             misc.store_persisting_files(self.pipeline, repo, self.deployment["keep_files"], os.path.join(self.tempdir, "_sustain"))
         # Fetch the latest changes from the target branch for a clean merge
-        git.update(repo, update_target_branch=feature_branch if feature_branch else (git.GIT_FAILURE_BRANCH if failed_model else git.GIT_SUCCESS_BRANCH))
+        git.update(repo, update_target_branch=self.get_deploy_target_branch(failed_model))
         # Remove everything so that we can implement the produced version instead
         git.clear_repo(repo)
         git.ignore(repo, "*\_history.log")
@@ -1066,3 +1094,6 @@ class BaseModel(yaml.YAMLObject):
 
     def get_input_meshes(self):
         return self._meshes
+
+    def get_input_files(self):
+        return sorted(set([os.path.abspath(f) for f in self._input_files]))
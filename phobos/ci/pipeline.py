@@ -1,15 +1,22 @@
+import hashlib
+import multiprocessing
 import os.path
+import shutil
 import sys
 import traceback
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import nullcontext
 
 import yaml
 
-from .base_model import BaseModel
+from . import base_model
+from .base_model import BaseModel, set_central_mesh_lock
 from .compare_model import CompareModel
 from .model_testing import ModelTest
 from .test_model import TestModel
 from ..common.commandline_logging import get_logger
 from ..common.defs import *
+from ..geometry.io import get_file_hash
 from ..utils import git, misc
 
 log = get_logger(__name__)
@@ -50,6 +57,14 @@ class Pipeline(yaml.YAMLObject):
         self.test_protocol = os.path.join(self.temp_dir, "test_protocol.txt")
         if not hasattr(self, "central_meshes"):
             self.central_meshes = True
+        if not hasattr(self, "n_workers"):
+            # the number of models that are processed and tested concurrently
+            self.n_workers = 1
+        if not hasattr(self, "cache_dir"):
+            # the directory (relative to root) where the outputs of the models are kept to skip the models whose
+            # inputs haven't changed in the next run, None disables this
+            self.cache_dir = None
+        self._fingerprints = {}
 
         if not subclass:
             assert hasattr(self, "model_definitions") and len(self.model_definitions) > 0
@@ -130,6 +145,12 @@ class Pipeline(yaml.YAMLObject):
                 with open(self.faillog, "w") as f:
                     f.write(dump_json(self.processing_failed, default_flow_style=False))
 
+    def __getstate__(self):
+        # the models are pickled on their own when they are sent to the worker processes
+        state = self.__dict__.copy()
+        state["models"] = []
+        return state
+
     def _get_model_failure_state(self, modelname):
         state = 0
         if modelname not in self.processing_failed:
@@ -217,7 +238,166 @@ class Pipeline(yaml.YAMLObject):
             if model.modelname == modelname_or_configkey or model.configkey == modelname_or_configkey:
                 return model
 
+    def _get_model_dependencies(self, model):
+        """Returns the configkeys of the models the model is derived from"""
+        return [v["derived_base"][:-4] for v in model.input_models.values() if "derived_base" in v.keys()]
+
+    def _get_model_fingerprint(self, model):
+        """
+        Returns a hash of everything the outputs of the model depend on: its resolved definition, the files and meshes
+        of its input models, the fingerprints of the models it is derived from, the mesh and default definitions of
+        the pipeline and the phobos version.
+        """
+        if model.configkey in self._fingerprints:
+            return self._fingerprints[model.configkey]
+        import phobos
+        h = hashlib.sha256()
+        h.update(str(getattr(phobos, "__version__", phobos.bl_info["version"])).encode())
+        h.update(dump_json({k: getattr(self, k, None) for k in [
+            "meshes", "central_meshes", "default_export_config", "default_test", "default_deployment", "remote_base"
+        ]}).encode())
+        h.update(model.config_hash.encode())
+        for f in model.get_input_files():
+            h.update(f.encode())
+            h.update(get_file_hash(f).encode() if os.path.isfile(f) else b"missing")
+        for dependency in self._get_model_dependencies(model):
+            dep_model = self.get_model(dependency)
+            h.update(dependency.encode())
+            h.update(self._get_model_fingerprint(dep_model).encode() if dep_model is not None else b"not loaded")
+        self._fingerprints[model.configkey] = h.hexdigest()
+        return self._fingerprints[model.configkey]
+
+    def _get_model_cache(self, model):
+        """
+        Returns the cache directory of the model (None if caching is disabled) and the info stored there if it has been
+        stored for the same fingerprint, else None.
+        """
+        if self.cache_dir is None:
+            return None, None
+        cache = os.path.join(self.root, self.cache_dir, model.configkey)
+        info_file = os.path.join(cache, "cache_info.json")
+        if not os.path.isfile(info_file):
+            return cache, None
+        with open(info_file, "r") as f:
+            info = load_json(f.read())
+        if info.get("fingerprint", None) != self._get_model_fingerprint(model):
+            return cache, None
+        return cache, info
+
+    @staticmethod
+    def _write_model_cache_info(cache, info):
+        with open(os.path.join(cache, "cache_info.json"), "w") as f:
+            f.write(dump_json(info, default=lambda x: x.item() if hasattr(x, "item") else str(x)))
+
+    def _store_model_in_cache(self, model, cache, processed_meshes):
+        """Stores the export directory of the model and the processed meshes in the central mesh directories"""
+        misc.recreate_dir(self, cache)
+        shutil.copytree(model.exportdir, os.path.join(cache, "export"), symlinks=True)
+        temp_dir = os.path.realpath(self.temp_dir)
+        meshes = []
+        for mesh in sorted(processed_meshes):
+            if mesh.startswith(temp_dir + os.sep) and os.path.isfile(mesh):
+                mesh = os.path.relpath(mesh, temp_dir)
+                os.makedirs(os.path.dirname(os.path.join(cache, "meshes", mesh)), exist_ok=True)
+                shutil.copy2(os.path.join(temp_dir, mesh), os.path.join(cache, "meshes", mesh))
+            meshes.append(mesh)
+        self._write_model_cache_info(cache, {
+            "fingerprint": self._get_model_fingerprint(model),
+            "process": "Good",
+            "processed_meshes": meshes
+        })
+
+    def _restore_model_from_cache(self, model, cache, info):
+        """Restores the export directory and the processed meshes of the model and returns these meshes"""
+        misc.remove_dir(self, model.exportdir)
+        shutil.copytree(os.path.join(cache, "export"), model.exportdir, symlinks=True)
+        misc.create_dir(self, model.tempdir)
+        temp_dir = os.path.realpath(self.temp_dir)
+        processed_meshes = set()
+        with base_model._central_mesh_lock if base_model._central_mesh_lock is not None else nullcontext():
+            for mesh in info["processed_meshes"]:
+                if not os.path.isabs(mesh):
+                    os.makedirs(os.path.dirname(os.path.join(temp_dir, mesh)), exist_ok=True)
+                    shutil.copy2(os.path.join(cache, "meshes", mesh), os.path.join(temp_dir, mesh))
+                    mesh = os.path.join(temp_dir, mesh)
+                processed_meshes.add(mesh)
+        model.processed_model_exists = True
+        return processed_meshes
+
+    def _run_models(self, models, function, on_done, get_dependencies=None, get_failure_result=None):
+        """
+        Calls function(model) for each model and on_done(model, result) with its return value in the order of the models.
+        If n_workers is set to more than one in the pipeline config, the models are run concurrently by a pool of
+        worker processes and each model is started as soon as the models it depends on are done.
+        on_done() is always called by this process, hence the faillog is never written concurrently. The workers hold
+        a common lock while they write to the central mesh directories.
+        If a model can't be run by a worker (e.g. it can't be pickled or the worker died), the result passed to on_done
+        is get_failure_result(state) with the traceback as failure state.
+        """
+        if self.n_workers is None or self.n_workers <= 1 or len(models) <= 1:
+            for model in models:
+                on_done(model, function(model))
+            return
+
+        def get_failed_result(model, e):
+            log.error(f"\nFailed running {model.modelname} model in a worker process with the following error:\n {e}")
+            state = ''.join(traceback.format_exception(None, e, e.__traceback__))
+            return get_failure_result(state) if get_failure_result is not None else state
+
+        configkeys = [model.configkey for model in models]
+        pending = list(models)
+        running = {}
+        results = {}
+        n_done = 0
+        with ProcessPoolExecutor(max_workers=self.n_workers, initializer=set_central_mesh_lock,
+                                 initargs=(multiprocessing.Lock(),)) as pool:
+            while len(pending) > 0 or len(running) > 0:
+                n_pending = len(pending)
+                for model in list(pending):
+                    dependencies = get_dependencies(model) if get_dependencies is not None else []
+                    if all([d in results or d not in configkeys for d in dependencies]):
+                        pending.remove(model)
+                        try:
+                            running[pool.submit(function, model)] = model
+                        except Exception as e:
+                            # e.g. the pool is broken
+                            results[model.configkey] = get_failed_result(model, e)
+                if len(running) == 0 and len(pending) == n_pending:
+                    raise AssertionError(f"Can't resolve the dependencies of the models {[m.configkey for m in pending]}")
+                if len(running) > 0:
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        model = running.pop(future)
+                        try:
+                            results[model.configkey] = future.result()
+                        except Exception as e:
+                            results[model.configkey] = get_failed_result(model, e)
+                while n_done < len(models) and models[n_done].configkey in results:
+                    on_done(models[n_done], results[models[n_done].configkey])
+                    n_done += 1
+
+    def _process_model(self, model):
+        """Processes and exports the model and returns its process state and the meshes it has processed"""
+        log.info(f"\nProcessing {model.modelname} model...")
+        cache, cache_info = self._get_model_cache(model)
+        if cache_info is not None and cache_info["process"].upper().startswith("GOOD"):
+            log.info(f"Inputs of {model.modelname} model are unchanged, restoring it from {cache}")
+            return "Good (unchanged)", self._restore_model_from_cache(model, cache, cache_info)
+        try:
+            model.process()
+            model.export()
+            if cache is not None:
+                self._store_model_in_cache(model, cache, model.processed_meshes)
+            return "Good", model.processed_meshes
+        except Exception as e:
+            log.error(f"\nFailed processing {model.modelname} model with the following error and skipped to next:\n {e}")
+            traceback.print_exc()
+            return ''.join(traceback.format_exception(None, e, e.__traceback__)), set()
+
     def process_models(self):
+        if self.cache_dir is not None:
+            assert not os.path.abspath(os.path.join(self.root, self.cache_dir)).startswith(os.path.abspath(self.temp_dir)), \
+                "The cache_dir must not be placed in the temp dir"
         # delete the temp_dir if there is already one
         misc.recreate_dir(self, self.temp_dir)
         with open(self.faillog, "w") as f:
@@ -234,23 +414,30 @@ class Pipeline(yaml.YAMLObject):
                 misc.copy(self, os.path.join(self.root, str(mp), "*."+ext), os.path.join(self.temp_dir, str(mp)))
 
         processed_meshes = set()
+        models = []
         for model in self.models:
-            log.info(f"\nProcessing {model.modelname} model...")
             if self._get_model_failure_state(model.configkey) & (F_LOAD | NA_LOAD):
+                log.info(f"\nProcessing {model.modelname} model...")
                 self.processing_failed[model.configkey]["process"] = \
                     "Skipping ", model.modelname, " as it model definition file wasn't loaded successfully!"
                 log.info(self.processing_failed[model.configkey]["process"])
                 continue
-            try:
-                model.process()
-                model.export()
-                processed_meshes = processed_meshes.union(model.processed_meshes)
-                self.processing_failed[model.configkey]["process"] = "Good"
-            except Exception as e:
-                log.error(f"\nFailed processing {model.modelname} model with the following error and skipped to next:\n {e}")
-                self.processing_failed[model.configkey]["process"] = ''.join(
-                    traceback.format_exception(None, e, e.__traceback__))
-                traceback.print_exc()
+            models.append(model)
+
+        if self.cache_dir is not None:
+            # the fingerprints are sent to the worker processes with the pipeline
+            for model in models:
+                self._get_model_fingerprint(model)
+
+        def on_processed(model, result):
+            nonlocal processed_meshes
+            self.processing_failed[model.configkey]["process"], meshes = result
+            processed_meshes = processed_meshes.union(meshes)
+            with open(self.faillog, "w") as f:
+                f.write(dump_json(self.processing_failed, default_flow_style=False))
+
+        self._run_models(models, self._process_model, on_processed, get_dependencies=self._get_model_dependencies,
+                         get_failure_result=lambda state: (state, set()))
         if self.central_meshes:
             # Remove all mesh files we have initially copied but that haven't been processed
             existing_meshes = []
@@ -269,11 +456,160 @@ class Pipeline(yaml.YAMLObject):
         with open(self.faillog, "w") as f:
             f.write(dump_json(self.processing_failed, default_flow_style=False))
 
+    def _test_model(self, model):
+        """Runs the configured test_routines for the model and returns its test state and its test results"""
+        cache, cache_info = self._get_model_cache(model)
+        if cache_info is not None and "test" in cache_info:
+            log.info(f"\nSkipping testing of {model.modelname} model as it is unchanged, taking the results from {cache}")
+            misc.create_dir(self, model.tempdir)
+            with open(model.extended_test_protocol_path, "w") as f:
+                f.write(cache_info["test_protocol"])
+            return cache_info["test"], cache_info["test_results"]
+        model.processed_model_exists = True
+        model._load_robot()
+        log.info(f"\nTesting {model.modelname} model...")
+        print(f"\nTesting {model.modelname} model...")
+        test_results = {}
+        try:
+            model.recreate_sym_links()
+            commit_hash = ""
+            compare_model = None
+            if any(["compare" in x for x in model.test["tests"]]) and type(model.test["compare_model"]) is dict:
+                # Load compare model
+                compare_model_path = os.path.join(model.tempdir, "compare_model")
+                git.clone(
+                    pipeline=self,
+                    repo=model.test["compare_model"]["git"],
+                    target=compare_model_path,
+                    branch=model.test["compare_model"].get("branch", git.GIT_PRODUCTION_BRANCH),
+                    recursive=True,
+                    ignore_failure=False,
+                    recreate=True
+                )
+                if "ignore_failing_tests_for" not in model.test["compare_model"].keys():
+                    model.test["compare_model"]["ignore_failing_tests_for"] = "None"
+
+                model_in_repo = os.path.join(compare_model_path, model.test['compare_model']['model_in_repo']) if "model_in_repo" in model.test["compare_model"] else compare_model_path
+                if os.path.exists(model_in_repo):
+                    commit_hash, _ = misc.execute_shell_command("git rev-parse HEAD", compare_model_path)
+                    log.debug(
+                        f"Loading compare model: "
+                        f"{self.relpath(model_in_repo)}"
+                    )
+                    try:
+                        compare_model = CompareModel(
+                            name=model.robotname,
+                            directory=compare_model_path,
+                            robotfile=model_in_repo,
+                            submechanisms_file=os.path.join(
+                                compare_model_path,
+                                model.test["compare_model"]["submechanisms_in_repo"]
+                            ) if "submechanisms_in_repo" in model.test["compare_model"] and model.test["compare_model"]["submechanisms_in_repo"] is not None else None
+                        )
+                    except Exception as e:
+                        model.test["compare_model"]["issues"] = repr(e)
+                        log.error("Failed to load compare model. Exception was:\n" +
+                                  ''.join(traceback.format_exception(None, e, e.__traceback__)) + "\n")
+                        traceback.print_exc()
+                else:
+                    log.warning("Compare model not found!")
+
+            model_test = ModelTest(model, compare_model)
+            model.extended_test_protocol = ""
+            model.extended_test_protocol = misc.append_string(model.extended_test_protocol, "\nRunning info procedures:", loglevel="info")
+            for p in dir(model_test):
+                if p.startswith("info_"):
+                    _protocol = getattr(model_test, p)()
+                    if _protocol is not None:
+                        model.extended_test_protocol = misc.append_string(model.extended_test_protocol, f"-> {p}", loglevel="info")
+                        model.extended_test_protocol += _protocol
+            model.extended_test_protocol = misc.append_string(model.extended_test_protocol, "\nRunning test procedures:", loglevel="info")
+            compare_model_info = model.test["compare_model"]
+            if compare_model:
+                compare_model_info.update({"loaded_smurf_file": compare_model.smurffile, "loaded_xml_file": compare_model.xmlfile})
+            test_results[model.modelname] = {
+                "ignore_failure": commit_hash.startswith(
+                    str(model.test["compare_model"]["ignore_failing_tests_for"])) if compare_model is not None else False,
+                "compare_model_present": compare_model is not None,
+                "compare_model": compare_model_info
+            }
+
+            def add_test_result(model_name, test_name, test_result):
+                if type(test_result) == tuple:
+                    value = test_result[0]
+                    protocol = test_result[1]
+                else:
+                    value = test_result
+                    protocol = ""
+                i = 2
+                if test_name in test_results[model.modelname].keys():
+                    while test_name + " " + str(i) in test_results[model.modelname].keys():
+                        i += 1
+                    test_name += " " + str(i)
+                test_results[model_name][test_name] = value
+                return value, protocol
+
+            # these tests will be run always
+            obligatory_tests = ["topological_self_consistency", "file_consistency"]
+            for otest in obligatory_tests:
+                if otest not in model.test["tests"]:
+                    model.test["tests"] += [otest]
+            # let's go testing
+            for test in model.test["tests"]:
+                model.extended_test_protocol += "\n\n"
+                if type(test) is str:
+                    model.extended_test_protocol = misc.append_string(model.extended_test_protocol, f"-> {test}", loglevel="info")
+                    _result, _protocol = add_test_result(model.modelname, test, getattr(model_test, "test_" + test)())
+                    model.extended_test_protocol += _protocol
+                    if not _result:
+                         model.extended_test_protocol = misc.append_string(model.extended_test_protocol, f"Test {test} failed for {model.modelname}", loglevel="error")
+                elif type(test) is dict and list(test.keys())[0] == "hyrodynChecks":
+                    if not HYRODYN_AVAILABLE:
+                        model.extended_test_protocol = misc.append_string(model.extended_test_protocol, "Hyrodyn checks not possible, as Hyrodyn couldn't be loaded", loglevel="warning")
+                    for htest in test["hyrodynChecks"]:
+                        if type(htest) is str:
+                            log.info(f"-> {htest}")
+                            _result, _protocol = add_test_result(model.modelname, htest, getattr(model_test, "test_hyrodyn_" + htest)())
+                            model.extended_test_protocol += _protocol
+                            if not _result:
+                                model.extended_test_protocol = misc.append_string(model.extended_test_protocol, f"Hyrodyn-Test {htest} failed for {model.modelname}", loglevel="error")
+                        elif type(htest) is dict and "move_hyrodyn_model" in htest.keys():
+                            k, v = list(htest.items())[0]
+                            getattr(model_test, k)(v)
+                            model.extended_test_protocol = misc.append_string(model.extended_test_protocol, f"-> {k}", loglevel="info")
+                        elif type(htest) is dict:
+                            k, v = list(htest.items())[0]
+                            model.extended_test_protocol = misc.append_string(model.extended_test_protocol, f"-> {k}", loglevel="info")
+                            _result, _protocol = add_test_result(model.modelname, k, getattr(model_test, "test_hyrodyn_" + k)(v))
+                            model.extended_test_protocol += _protocol
+                            if not _result:
+                                model.extended_test_protocol = misc.append_string(model.extended_test_protocol, f"Hyrodyn-Test {k} failed for {model.modelname}", loglevel="error")
+                        else:
+                            model.extended_test_protocol = misc.append_string(model.extended_test_protocol, f"Couldn't process test definition {htest}", loglevel="error")
+                elif type(test) is dict:
+                    k, v = list(test.items())[0]
+                    model.extended_test_protocol = misc.append_string(model.extended_test_protocol, f"-> {test}", loglevel="info")
+                    _result, _protocol = add_test_result(model.modelname, k, getattr(model_test, "test_" + k)(v))
+                    model.extended_test_protocol += _protocol
+                    if not _result:
+                        model.extended_test_protocol = misc.append_string(model.extended_test_protocol, f"Hyrodyn-Test {test} failed for {model.modelname}", loglevel="error")
+            state = "Good"
+        except Exception as e:
+            log.error(f"\nFailed testing {model.modelname} model with the following error and skipped to next:\n {e}")
+            state = ''.join(traceback.format_exception(None, e, e.__traceback__)) + "\n"
+            traceback.print_exc()
+        with open(model.extended_test_protocol_path, "w") as f:
+            f.write(model.extended_test_protocol)
+        if cache_info is not None:
+            cache_info.update({"test": state, "test_results": test_results, "test_protocol": model.extended_test_protocol})
+            self._write_model_cache_info(cache, cache_info)
+        return state, test_results
+
     def test_models(self):
         """Runs the configured test_routines over all models"""
         with open(self.faillog, "r") as f:
             self.processing_failed = load_json(f.read())
-        failures_ignored_for = []
+        models = []
         for model in self.models:
              # [ToDo] make this more beautiful by moving the model test to base_model
             fstate = self._get_model_failure_state(model.configkey)
@@ -281,143 +617,13 @@ class Pipeline(yaml.YAMLObject):
                 log.warning(f"\nSkipping {model.modelname} model as it wasn't successfully created."
                             f"(Code: " + bin(fstate) + ")")
                 continue
-            model.processed_model_exists = True
-            model._load_robot()
-            log.info(f"\nTesting {model.modelname} model...")
-            print(f"\nTesting {model.modelname} model...")
-            try:
-                model.recreate_sym_links()
-                commit_hash = ""
-                compare_model = None
-                if any(["compare" in x for x in model.test["tests"]]) and type(model.test["compare_model"]) is dict:
-                    # Load compare model
-                    compare_model_path = os.path.join(model.tempdir, "compare_model")
-                    git.clone(
-                        pipeline=self,
-                        repo=model.test["compare_model"]["git"],
-                        target=compare_model_path,
-                        branch=model.test["compare_model"].get("branch", git.GIT_PRODUCTION_BRANCH),
-                        recursive=True,
-                        ignore_failure=False,
-                        recreate=True
-                    )
-                    if "ignore_failing_tests_for" not in model.test["compare_model"].keys():
-                        model.test["compare_model"]["ignore_failing_tests_for"] = "None"
-
-                    model_in_repo = os.path.join(compare_model_path, model.test['compare_model']['model_in_repo']) if "model_in_repo" in model.test["compare_model"] else compare_model_path
-                    if os.path.exists(model_in_repo):
-                        commit_hash, _ = misc.execute_shell_command("git rev-parse HEAD", compare_model_path)
-                        if commit_hash.startswith(str(model.test["compare_model"]["ignore_failing_tests_for"])):
-                            failures_ignored_for += [model.modelname]
-                        log.debug(
-                            f"Loading compare model: "
-                            f"{self.relpath(model_in_repo)}"
-                        )
-                        try:
-                            compare_model = CompareModel(
-                                name=model.robotname,
-                                directory=compare_model_path,
-                                robotfile=model_in_repo,
-                                submechanisms_file=os.path.join(
-                                    compare_model_path,
-                                    model.test["compare_model"]["submechanisms_in_repo"]
-                                ) if "submechanisms_in_repo" in model.test["compare_model"] and model.test["compare_model"]["submechanisms_in_repo"] is not None else None
-                            )
-                        except Exception as e:
-                            model.test["compare_model"]["issues"] = repr(e)
-                            log.error("Failed to load compare model. Exception was:\n" +
-                                      ''.join(traceback.format_exception(None, e, e.__traceback__)) + "\n")
-                            traceback.print_exc()
-                    else:
-                        log.warning("Compare model not found!")
-
-                model_test = ModelTest(model, compare_model)
-                model.extended_test_protocol = ""
-                model.extended_test_protocol = misc.append_string(model.extended_test_protocol, "\nRunning info procedures:", loglevel="info")
-                for p in dir(model_test):
-                    if p.startswith("info_"):
-                        _protocol = getattr(model_test, p)()
-                        if _protocol is not None:
-                            model.extended_test_protocol = misc.append_string(model.extended_test_protocol, f"-> {p}", loglevel="info")
-                            model.extended_test_protocol += _protocol
-                model.extended_test_protocol = misc.append_string(model.extended_test_protocol, "\nRunning test procedures:", loglevel="info")
-                compare_model_info = model.test["compare_model"]
-                if compare_model:
-                    compare_model_info.update({"loaded_smurf_file": compare_model.smurffile, "loaded_xml_file": compare_model.xmlfile})
-                self.test_results[model.modelname] = {
-                    "ignore_failure": commit_hash.startswith(
-                        str(model.test["compare_model"]["ignore_failing_tests_for"])) if compare_model is not None else False,
-                    "compare_model_present": compare_model is not None,
-                    "compare_model": compare_model_info
-                }
-
-                def add_test_result(model_name, test_name, test_result):
-                    if type(test_result) == tuple:
-                        value = test_result[0]
-                        protocol = test_result[1]
-                    else:
-                        value = test_result
-                        protocol = ""
-                    i = 2
-                    if test_name in self.test_results[model.modelname].keys():
-                        while test_name + " " + str(i) in self.test_results[model.modelname].keys():
-                            i += 1
-                        test_name += " " + str(i)
-                    self.test_results[model_name][test_name] = value
-                    return value, protocol
-
-                # these tests will be run always
-                obligatory_tests = ["topological_self_consistency", "file_consistency"]
-                for otest in obligatory_tests:
-                    if otest not in model.test["tests"]:
-                        model.test["tests"] += [otest]
-                # let's go testing
-                for test in model.test["tests"]:
-                    model.extended_test_protocol += "\n\n"
-                    if type(test) is str:
-                        model.extended_test_protocol = misc.append_string(model.extended_test_protocol, f"-> {test}", loglevel="info")
-                        _result, _protocol = add_test_result(model.modelname, test, getattr(model_test, "test_" + test)())
-                        model.extended_test_protocol += _protocol
-                        if not _result:
-                             model.extended_test_protocol = misc.append_string(model.extended_test_protocol, f"Test {test} failed for {model.modelname}", loglevel="error")
-                    elif type(test) is dict and list(test.keys())[0] == "hyrodynChecks":
-                        if not HYRODYN_AVAILABLE:
-                            model.extended_test_protocol = misc.append_string(model.extended_test_protocol, "Hyrodyn checks not possible, as Hyrodyn couldn't be loaded", loglevel="warning")
-                        for htest in test["hyrodynChecks"]:
-                            if type(htest) is str:
-                                log.info(f"-> {htest}")
-                                _result, _protocol = add_test_result(model.modelname, htest, getattr(model_test, "test_hyrodyn_" + htest)())
-                                model.extended_test_protocol += _protocol
-                                if not _result:
-                                    model.extended_test_protocol = misc.append_string(model.extended_test_protocol, f"Hyrodyn-Test {htest} failed for {model.modelname}", loglevel="error")
-                            elif type(htest) is dict and "move_hyrodyn_model" in htest.keys():
-                                k, v = list(htest.items())[0]
-                                getattr(model_test, k)(v)
-                                model.extended_test_protocol = misc.append_string(model.extended_test_protocol, f"-> {k}", loglevel="info")
-                            elif type(htest) is dict:
-                                k, v = list(htest.items())[0]
-                                model.extended_test_protocol = misc.append_string(model.extended_test_protocol, f"-> {k}", loglevel="info")
-                                _result, _protocol = add_test_result(model.modelname, k, getattr(model_test, "test_hyrodyn_" + k)(v))
-                                model.extended_test_protocol += _protocol
-                                if not _result:
-                                    model.extended_test_protocol = misc.append_string(model.extended_test_protocol, f"Hyrodyn-Test {k} failed for {model.modelname}", loglevel="error")
-                            else:
-                                model.extended_test_protocol = misc.append_string(model.extended_test_protocol, f"Couldn't process test definition {htest}", loglevel="error")
-                    elif type(test) is dict:
-                        k, v = list(test.items())[0]
-                        model.extended_test_protocol = misc.append_string(model.extended_test_protocol, f"-> {test}", loglevel="info")
-                        _result, _protocol = add_test_result(model.modelname, k, getattr(model_test, "test_" + k)(v))
-                        model.extended_test_protocol += _protocol
-                        if not _result:
-                            model.extended_test_protocol = misc.append_string(model.extended_test_protocol, f"Hyrodyn-Test {test} failed for {model.modelname}", loglevel="error")
-                self.processing_failed[model.configkey]["test"] = "Good"
-            except Exception as e:
-                log.error(f"\nFailed testing {model.modelname} model with the following error and skipped to next:\n {e}")
-                self.processing_failed[model.configkey]["test"] = ''.join(
-                    traceback.format_exception(None, e, e.__traceback__)) + "\n"
-                traceback.print_exc()
-            with open(model.extended_test_protocol_path, "w") as f:
-                f.write(model.extended_test_protocol)
+            models.append(model)
+
+        def on_tested(model, result):
+            self.processing_failed[model.configkey]["test"], test_results = result
+            self.test_results.update(test_results)
+
+        self._run_models(models, self._test_model, on_tested, get_failure_result=lambda state: (state, {}))
         test_protocol = {"all": ""}
         test_protocol["all"] = misc.append_string(test_protocol["all"], "----------\nTest protocol:", print=True)
         success = True
@@ -520,18 +726,36 @@ class Pipeline(yaml.YAMLObject):
                             f"(Code: " + bin(fstate) + ")")
                 continue
             log.info(f"\nDeploying {model.modelname} model...")
-            try:
-                if self.central_meshes:
-                    dpl_msg = model.deploy(mesh_repos, uses_lfs=uses_lfs,
-                                        failed_model=bool(fstate & F_TEST) or bool(fstate & NA_TEST))
-                else:
-                    dpl_msg = model.deploy(None, failed_model=bool(fstate & F_TEST) or bool(fstate & NA_TEST), uses_lfs=uses_lfs)
-                self.processing_failed[model.configkey]["deploy"] = "Good" + " (" + dpl_msg + ")"
-            except Exception as e:
-                log.error(f"\nFailed deploying {model.modelname} model with the following error and skipped to next:\n {e}")
-                self.processing_failed[model.configkey]["deploy"] = ''.join(
-                    traceback.format_exception(None, e, e.__traceback__))
-                traceback.print_exc()
+            cache, cache_info = self._get_model_cache(model)
+            failed_model = bool(fstate & F_TEST) or bool(fstate & NA_TEST)
+            # the model is deployed to a different branch depending on the commit branch and its test result
+            deploy_key = f"{os.path.expandvars(model.get_deploy_target_branch(failed_model))}:{failed_model}"
+            if self.central_meshes:
+                # and the mesh submodules are updated to the current mesh commits
+                deploy_key += ":" + ",".join(sorted(v["commit"] for v in mesh_repos.values()))
+            deployments = cache_info.get("deploy", {}) if cache_info is not None else {}
+            if not isinstance(deployments, dict):
+                deployments = {}
+            if deployments.get(deploy_key, "").upper().startswith("GOOD"):
+                log.info(f"Skipping deployment of {model.modelname} model as it is unchanged since its last deployment "
+                         f"to {deploy_key.split(':')[0]}")
+                self.processing_failed[model.configkey]["deploy"] = "Good (unchanged)"
+            else:
+                try:
+                    if self.central_meshes:
+                        dpl_msg = model.deploy(mesh_repos, uses_lfs=uses_lfs, failed_model=failed_model)
+                    else:
+                        dpl_msg = model.deploy(None, failed_model=failed_model, uses_lfs=uses_lfs)
+                    self.processing_failed[model.configkey]["deploy"] = "Good" + " (" + dpl_msg + ")"
+                    if cache_info is not None:
+                        deployments[deploy_key] = self.processing_failed[model.configkey]["deploy"]
+                        cache_info["deploy"] = deployments
+                        self._write_model_cache_info(cache, cache_info)
+                except Exception as e:
+                    log.error(f"\nFailed deploying {model.modelname} model with the following error and skipped to next:\n {e}")
+                    self.processing_failed[model.configkey]["deploy"] = ''.join(
+                        traceback.format_exception(None, e, e.__traceback__))
+                    traceback.print_exc()
             if "BADGE_DIRECTORY" in os.environ.keys():
                 state = self._get_model_failure_state(model.configkey)
                 if state & F_LOAD:
@@ -1,8 +1,12 @@
 import os
-from copy import deepcopy
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import nullcontext
+from copy import copy, deepcopy
 
 import numpy as np
 import pydot
+import scipy.sparse
 import traceback
 import re
 
@@ -14,7 +18,7 @@ except ImportError:
 
 from .. import geometry as pgu, utils
 from ..common.commandline_logging import get_logger
-from ..common.defs import load_json, dump_json, KINEMATIC_TYPES
+from ..common.defs import load_json, dump_json, KINEMATIC_TYPES, BPY_AVAILABLE
 from ..utils.resources import get_resources_path
 from ..geometry import get_reflection_matrix
 from ..io import representation, sensor_representations
@@ -24,23 +28,215 @@ from ..io.smurfrobot import SMURFRobot
 from ..utils import transform, misc, git, resources
 from ..utils.misc import read_number_from_config, regex_replace, create_dir, edit_name_string, execute_shell_command, get_var, plural
 from ..utils.transform import create_transformation, inv, get_adjoint, round_array
-from ..utils.tree import find_close_ancestor_links, get_joints
+from ..utils.tree import find_close_ancestor_links, get_joints, get_joints_depth_first
 from ..utils.xml import transform_object, get_joint_info_dict
 from ..blender import reserved_keys
 
 log = get_logger(__name__)
 
 
+def _get_mesh_worker_copy(mesh):
+    """
+    Returns a copy of the mesh that can be sent to a worker process without its robot.
+    """
+    def unlinked_copy(obj):
+        obj = copy(obj)
+        obj._related_robot_instance = None
+        return obj
+
+    out = unlinked_copy(mesh)
+    out.history = list(mesh.history)
+    out._exported = dict(mesh._exported)
+    if mesh._material is not None and hasattr(mesh._material, "_related_robot_instance"):
+        out._material = unlinked_copy(mesh._material)
+        for k, v in out._material.__dict__.items():
+            if hasattr(v, "_related_robot_instance"):
+                setattr(out._material, k, unlinked_copy(v))
+    return out
+
+
+def _provide_mesh_file_in_worker(mesh, kwargs):
+    n_history = len(mesh.history)
+    mesh.provide_mesh_file(**kwargs)
+    return mesh._exported, mesh.history[n_history:]
+
+
+def _get_volume_mesh_key(mesh):
+    """
+    Returns a key that is equal for meshes that have the same geometry, i.e. the same mesh data or input file and scale.
+    """
+    source = id(mesh._mesh_object) if mesh._mesh_object is not None else mesh.input_file
+    return source, tuple(mesh.scale)
+
+
+def _get_volume_mesh(mesh):
+    """
+    Returns the scaled vertices and the faces of the closed mesh that is used to estimate the mass properties of the
+    given mesh. Like Mesh.approx_volume_and_com() this tries to improve a mesh that is not watertight and falls back to
+    its convex hull.
+    """
+    mesh.load_mesh()
+    volume_mesh = pgu.as_trimesh(mesh.mesh_object, silent=True)
+    if not volume_mesh.is_volume:
+        volume_mesh = pgu.improve_mesh(deepcopy(volume_mesh))
+    if not volume_mesh.is_volume:
+        log.warning(f"Mesh {mesh.unique_name} is not watertight taking its convex_hull to estimate its mass properties")
+        volume_mesh = volume_mesh.convex_hull
+    faces = np.asarray(volume_mesh.faces)
+    if np.prod(mesh.scale) < 0:
+        # mirroring inverts the winding
+        faces = faces[:, ::-1]
+    return np.asarray(volume_mesh.vertices) * np.asarray(mesh.scale), faces
+
+
+def _combine_mass_properties(parts):
+    """
+    Combines the mass properties of several bodies given in the same frame.
+
+    Args:
+        parts: list of (mass, com (3, ), inertia about the com (3, 3))
+
+    Returns:
+        tuple of the overall mass, com and inertia about that com
+    """
+    mass = sum([p[0] for p in parts])
+    if mass == 0:
+        return 0.0, np.zeros(3), np.zeros((3, 3))
+    com = sum([p[0] * np.asarray(p[1]) for p in parts]) / mass
+    inertia = np.zeros((3, 3))
+    for m, c, I in parts:
+        # parallel axis theorem
+        d = np.asarray(c) - com
+        inertia += I + m * (d.dot(d) * np.identity(3) - np.outer(d, d))
+    return mass, com, inertia
+
+
+def _replace_last_numbers(line, values):
+    """
+    Replaces the last len(values) numbers in the line by the given values.
+    """
+    matches = list(re.finditer(r"(?<![\w.])[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?(?![\w.])", line))
+    assert len(matches) >= len(values), f"Can't write {len(values)} values into {line}"
+    for match, value in reversed(list(zip(matches[len(matches) - len(values):], values))):
+        line = line[:match.start()] + str(float(value)) + line[match.end():]
+    return line
+
+
+def _format_kccd_fitted_volume(body, points, radius, template_lines):
+    """
+    Returns the kccd cfg lines of the volume fitted to a body. The values are written into the first BODYRADIUS and
+    BODYPOINT line of the template lines (e.g. the ones generated by urdf2kccd) to keep their format.
+    """
+    radius_line = next((line for line in template_lines if line.startswith("BODYRADIUS")), "BODYRADIUS 0")
+    point_line = next((line for line in template_lines if line.startswith("BODYPOINT")), "BODYPOINT [0, 0, 0]")
+    out = [f"# Fitted volume of {body} with {len(points)} points", _replace_last_numbers(radius_line, [radius])]
+    out += [_replace_last_numbers(point_line, point) for point in points]
+    return "\n".join(out)
+
+
+def _run_export_target(robot, method, kwargs):
+    start = time.perf_counter()
+    out = getattr(robot, method)(**kwargs)
+    return out, time.perf_counter() - start
+
+
+def _run_export_targets(targets, n_workers=None):
+    """
+    Runs the export targets as soon as all targets they depend on are done.
+    With n_workers > 1 independent targets are run concurrently by a pool of worker processes, otherwise they are run
+    one after the other in the order of the targets list. The time each target needed is logged in that order, too.
+
+    Args:
+        targets: list of (name, dependencies, prepare) where dependencies is a list of target names and
+            prepare(results) returns the (robot, method name, kwargs) to run, results being the dict of the return
+            values of the targets that are done by name
+        n_workers: the number of worker processes
+
+    Returns:
+        dict of the return values of the targets by name
+    """
+    results = {}
+    durations = {}
+    pending = list(targets)
+    running = {}
+    pool = ProcessPoolExecutor(max_workers=n_workers) if n_workers is not None and n_workers > 1 and not BPY_AVAILABLE else None
+    try:
+        while len(pending) > 0 or len(running) > 0:
+            ready = [target for target in pending if all([dep in results for dep in target[1]])]
+            if len(ready) == 0 and len(running) == 0:
+                raise AssertionError(f"Can't resolve the dependencies of the export targets {[t[0] for t in pending]}")
+            for target in ready:
+                pending.remove(target)
+                name, _, prepare = target
+                if pool is None:
+                    results[name], durations[name] = _run_export_target(*prepare(results))
+                    # the next targets might depend on this one
+                    break
+                running[pool.submit(_run_export_target, *prepare(results))] = name
+            if pool is not None and len(running) > 0:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name], durations[name] = future.result()
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+    for name, _, _ in targets:
+        log.info(f"Export target {name} took {durations[name]:.2f}s")
+    return results
+
+
+class _XMLFileWriter(object):
+    """
+    Writes each string it receives to several files and applies the regex replacements of each file to it.
+    As the xml is streamed element by element, the replacements must not span several elements.
+    """
+    def __init__(self, outputs, insert_after_first_line=None):
+        """
+        Args:
+            outputs: list of (filepath, prefix, replacements) where prefix is written only to this file and
+                replacements is a dict or a list of dicts as for regex_replace() or None
+            insert_after_first_line: a string that is inserted as own lines after the first line written
+        """
+        self.files = []
+        self.insertion = insert_after_first_line
+        for filepath, prefix, replacements in outputs:
+            f = open(filepath, "w")
+            if prefix:
+                f.write(prefix)
+            self.files.append((f, replacements))
+
+    def write(self, string):
+        if self.insertion is not None and "\n" in string:
+            head, tail = string.split("\n", 1)
+            string = head + "\n" + self.insertion + "\n" + tail
+            self.insertion = None
+        for f, replacements in self.files:
+            f.write(regex_replace(string, replacements) if replacements else string)
+
+    def close(self):
+        for f, _ in self.files:
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
 class Robot(SMURFRobot):
     def __init__(self, name=None, xmlfile=None, submechanisms_file=None, smurffile=None, verify_meshes_on_import=True,
                  inputfile=None, description=None, is_human=False, autogenerate_submechanisms=None,
-                 assert_validity=True, shallow=False, **kwargs):
+                 assert_validity=True, shallow=False, lazy_meshes=False, **kwargs):
         """ The basic robot class to represent a urdf.
+        If lazy_meshes is True, the meshes are only loaded on first geometric access (see representation.lazy_mesh_loading()).
         """
         try:
             super().__init__(xmlfile=xmlfile, submechanisms_file=submechanisms_file, smurffile=smurffile,
                              verify_meshes_on_import=verify_meshes_on_import, inputfile=inputfile, description=description,
-                             autogenerate_submechanisms=autogenerate_submechanisms, is_human=is_human, shallow=shallow, **kwargs)
+                             autogenerate_submechanisms=autogenerate_submechanisms, is_human=is_human, shallow=shallow,
+                             lazy_meshes=lazy_meshes, **kwargs)
         except Exception as e:
             log.error(f"Failed loading:\n  input: {inputfile}\n  xml: {xmlfile}\n  submechanims: {submechanisms_file}\n  smurf: {smurffile}\n"
                       f"because of:\n"+''.join(traceback.format_exception(None, e, e.__traceback__)))
@@ -53,20 +249,75 @@ class Robot(SMURFRobot):
             self.assert_validity()
 
     # export methods
-    def export_meshes(self, mesh_output_dir, rel_mesh_pathes=None, format=None, use_existing=False, apply_scale=False):
+    def export_meshes(self, mesh_output_dir, rel_mesh_pathes=None, format=None, use_existing=False, apply_scale=False,
+                      n_workers=None):
         """
         Will go through all visuals and collisions and export the meshes of all mesh geometries to in the given format to the outputdir
         Args:
             mesh_output_dir: The directory where to put the meshes
             format: a mesh format as in phobos.defs.MESH_TYPES
+            n_workers: if > 1 the meshes are converted in a pool of this many processes (not available in blender)
 
         Returns:
             None
         """
-        for vc in self.visuals + self.collisions:
-            if isinstance(vc.geometry, representation.Mesh):
-                vc.geometry.provide_mesh_file(targetpath=os.path.abspath(mesh_output_dir), rel_mesh_pathes=rel_mesh_pathes, format=format,
-                                              use_existing=use_existing, apply_scale=apply_scale)
+        self._export_meshes([(mesh_output_dir, format)], rel_mesh_pathes=rel_mesh_pathes, use_existing=use_existing,
+                            apply_scale=apply_scale, n_workers=n_workers)
+
+    def _export_meshes(self, targets, rel_mesh_pathes=None, use_existing=False, apply_scale=False, n_workers=None):
+        """
+        Exports the meshes of all visuals and collisions for each (mesh_output_dir, format) in targets.
+        With n_workers > 1 every mesh file is only provided once by a pool of worker processes, meshes that would be
+        exported to the same file with the same history just get this file assigned afterwards.
+        The _exported bookkeeping and the histories are merged back in the order of the visuals and collisions.
+        """
+        meshes = [vc.geometry for vc in self.visuals + self.collisions if isinstance(vc.geometry, representation.Mesh)]
+        if n_workers is None or n_workers <= 1 or BPY_AVAILABLE or use_existing:
+            for mesh_output_dir, format in targets:
+                for mesh in meshes:
+                    mesh.provide_mesh_file(targetpath=os.path.abspath(mesh_output_dir), rel_mesh_pathes=rel_mesh_pathes,
+                                           format=format, use_existing=use_existing, apply_scale=apply_scale)
+            return
+        if apply_scale:
+            for mesh in meshes:
+                mesh.apply_scale()
+        # group the meshes by the file they are exported to
+        groups = {}
+        for mesh_output_dir, format in targets:
+            for mesh in meshes:
+                _format, targetpath = mesh.get_export_path(os.path.abspath(mesh_output_dir), rel_mesh_pathes=rel_mesh_pathes,
+                                                           format=format)
+                kwargs = {"targetpath": os.path.abspath(mesh_output_dir), "rel_mesh_pathes": rel_mesh_pathes, "format": _format}
+                if targetpath not in groups:
+                    groups[targetpath] = (kwargs, [])
+                if not any([m is mesh for m in groups[targetpath][1]]):
+                    groups[targetpath][1].append(mesh)
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = [pool.submit(_provide_mesh_file_in_worker, _get_mesh_worker_copy(group[0]), kwargs)
+                       for kwargs, group in groups.values()]
+            results = [f.result() for f in futures]
+        for (targetpath, (kwargs, group)), (exported, history) in zip(groups.items(), results):
+            mesh = group[0]
+            mesh.history += history
+            mesh._exported.update({k: dict(v, operations=mesh._operations) for k, v in exported.items()})
+            representative_history = [x.strip() for x in mesh.history[1:] if not x.startswith("->") and x.strip()]
+            exported = {k: v for k, v in exported.items() if v["filepath"] == targetpath}
+            for other in group[1:]:
+                other_history = [x.strip() for x in other.history[1:] if not x.startswith("->") and x.strip()]
+                if other.input_file == mesh.input_file and other_history == representative_history and len(exported) > 0:
+                    # this mesh would be exported identically, so we can use the file of the representative
+                    other.history += history
+                    for k, v in exported.items():
+                        other._exported[k] = {
+                            "operations": other._operations,
+                            "filepath": targetpath,
+                            # an existing identical file is only written again if it's a copy or the mesh has changed
+                            "export_operation": v["export_operation"]
+                            if v["export_operation"] == "copy" or other._changed else "None"
+                        }
+                    other.write_history(targetpath)
+                else:
+                    other.provide_mesh_file(**kwargs)
 
     def to_x3d_string(self, float_fmt_dict=None, reduce_meshes=0):
         export_instance = self.duplicate()
@@ -144,33 +395,23 @@ class Robot(SMURFRobot):
                         actuators=[representation.Actuator(name=j.name)]
                     ))
 
-        xml_string = export_robot.to_urdf_string(float_fmt_dict=float_fmt_dict)
-
-        if ros_pkg is True:
-            xml_string = regex_replace(xml_string, {'filename="../': 'filename="package://' if ros_pkg_name is None else f'filename="package://{ros_pkg_name}/'})
+        ros_replacements = {'filename="../': 'filename="package://' if ros_pkg_name is None else f'filename="package://{ros_pkg_name}/'}
+        outputs = [(outputfile, "<!-- generated by Phobos -->\n" if mark_as_autogenerated else None,
+                    ros_replacements if ros_pkg is True else None)]
+        if copy_with_other_pathes and not ros_pkg:
+            outputs.append((outputfile[:-5] + "_ros.urdf", None, {'filename="../': 'filename="package://'}))
+        elif copy_with_other_pathes and ros_pkg:
+            outputs.append((outputfile[:-5] + "_relpath.urdf", None,
+                            ([ros_replacements] if ros_pkg is True else []) + [{'filename="package://': 'filename="../'}]))
+        world_joint = None
         if add_world_joint:
-            xml_lines = xml_string.split("\n")
-            joint_lines = representation.Joint(name="world_to_"+export_robot.root, parent="world", child=export_robot.root, joint_type="fixed").to_urdf_string().split("\n")
-            xml_string = "\n".join(xml_lines[:1] + joint_lines + xml_lines[1:])
+            world_joint = representation.Joint(name="world_to_"+export_robot.root, parent="world", child=export_robot.root, joint_type="fixed").to_urdf_string()
 
         if not os.path.exists(os.path.dirname(os.path.abspath(outputfile))):
             os.makedirs(os.path.dirname(os.path.abspath(outputfile)))
-        with open(outputfile, "w") as f:
-            if mark_as_autogenerated:
-                f.write("<!-- generated by Phobos -->\n")
-            f.write(xml_string)
-            f.close()
-
-        if copy_with_other_pathes and not ros_pkg:
-            xml_string = regex_replace(xml_string, {'filename="../': 'filename="package://'})
-            f = open(outputfile[:-5] + "_ros.urdf", "w")
-            f.write(xml_string)
-            f.close()
-        elif copy_with_other_pathes and ros_pkg:
-            xml_string = regex_replace(xml_string, {'filename="package://': 'filename="../'})
-            f = open(outputfile[:-5] + "_relpath.urdf", "w")
-            f.write(xml_string)
-            f.close()
+        # the xml is written element by element, so that the complete tree is never held in memory
+        with _XMLFileWriter(outputs, insert_after_first_line=world_joint) as f:
+            export_robot.write_urdf(f, float_fmt_dict=float_fmt_dict)
 
         log.info("URDF written to {}".format(outputfile))
         return
@@ -191,33 +432,25 @@ class Robot(SMURFRobot):
             export_robot.mesh_format = mesh_format
         export_robot.xmlfile = outputfile
 
-        xml_string = '<sdf version="1.9">\n'+export_robot.to_sdf_string(float_fmt_dict=float_fmt_dict)+"\n</sdf>"
-
-        if ros_pkg is True:
-            xml_string = regex_replace(xml_string, {'<uri>../': '<uri>package://' if ros_pkg_name is None else f'<uri>package://{ros_pkg_name}/'})
+        ros_replacements = {'<uri>../': '<uri>package://' if ros_pkg_name is None else f'<uri>package://{ros_pkg_name}/'}
+        outputs = [(outputfile, "<!-- generated by Phobos -->\n" if mark_as_autogenerated else None,
+                    ros_replacements if ros_pkg is True else None)]
+        if copy_with_other_pathes and not ros_pkg:
+            outputs.append((outputfile[:-4] + "_ros.sdf", None, {'<uri>../': '<uri>package://'}))
+        elif copy_with_other_pathes and ros_pkg:
+            outputs.append((outputfile[:-4] + "_relpath.sdf", None,
+                            ([ros_replacements] if ros_pkg is True else []) + [{'<uri>package://': '<uri>../'}]))
+        world_joint = None
         if add_world_joint:
-            xml_lines = xml_string.split("\n")
-            joint_lines = representation.Joint(name="world", parent="world", child=export_robot.root, origin=representation.Pose(relative_to="world"), joint_type="fixed").to_sdf_string().split("\n")
-            xml_string = "\n".join(xml_lines[:1] + joint_lines + xml_lines[1:])
+            world_joint = representation.Joint(name="world", parent="world", child=export_robot.root, origin=representation.Pose(relative_to="world"), joint_type="fixed").to_sdf_string()
 
         if not os.path.exists(os.path.dirname(os.path.abspath(outputfile))):
             os.makedirs(os.path.dirname(os.path.abspath(outputfile)))
-        with open(outputfile, "w") as f:
-            if mark_as_autogenerated:
-                f.write("<!-- generated by Phobos -->\n")
-            f.write(xml_string)
-            f.close()
-
-        if copy_with_other_pathes and not ros_pkg:
-            xml_string = regex_replace(xml_string, {'<uri>../': '<uri>package://'})
-            f = open(outputfile[:-4] + "_ros.sdf", "w")
-            f.write(xml_string)
-            f.close()
-        elif copy_with_other_pathes and ros_pkg:
-            xml_string = regex_replace(xml_string, {'<uri>package://': '<uri>../'})
-            f = open(outputfile[:-4] + "_relpath.sdf", "w")
-            f.write(xml_string)
-            f.close()
+        # the xml is written element by element, so that the complete tree is never held in memory
+        with _XMLFileWriter(outputs, insert_after_first_line=world_joint) as f:
+            f.write('<sdf version="1.9">\n')
+            export_robot.write_sdf(f, float_fmt_dict=float_fmt_dict)
+            f.write("\n</sdf>")
 
         log.info("SDF written to {}".format(outputfile))
         return
@@ -475,7 +708,16 @@ class Robot(SMURFRobot):
 
     def export_kccd(self, outputdir, rel_iv_meshes_path, output_mesh_format, join_before_convexhull=True,
                     keep_stls=True, keep_urdf=True, dirname="kccd",
-                    reduce_meshes=0, edit_collisions=None, **kwargs):
+                    reduce_meshes=0, edit_collisions=None, use_kccdcoveriv=False, n_workers=None, **kwargs):
+        """
+        Exports the kccd model of the robot. The cfg is generated by urdf2kccd, afterwards the volume of each body is
+        fitted to its convex hull (see geometry.fit_sphere_swept_hull()).
+
+        Args:
+            use_kccdcoveriv: if True the volumes are fitted by calling kccdcoveriv for each body instead, e.g. to
+                validate the result
+            n_workers: if > 1, the volumes are fitted by that many worker processes
+        """
         if edit_collisions is None:
             edit_collisions = {}
         kccd_meshes = os.path.join(outputdir, rel_iv_meshes_path)
@@ -544,6 +786,41 @@ class Robot(SMURFRobot):
                     }
         # now update the kccd.cfg
         kccd_cfg = open(kccd_urdf[:-5] + ".cfg", "r").read().split("\n\n")
+
+        def get_n_points(link):
+            distance = len(
+                kccd_robot.get_chain(self.get_root(), link, links=False, joints=True, fixed=False))
+            n_points = int((25 - 3) * 0.4 ** (distance / 3) + 3)  # [TODO v2.1.0] elaborate this
+            if link in edit_collisions.keys():
+                if "n_points" in edit_collisions[link].keys():
+                    n_points = edit_collisions[link]["n_points"]
+                elif "shape" in edit_collisions[link].keys() and \
+                        edit_collisions[link]["shape"].lower() != "convex":
+                    if edit_collisions[link]["shape"].lower() == "cylinder":
+                        n_points = 2
+                    elif edit_collisions[link]["shape"].lower() == "box":
+                        n_points = 8
+                    elif edit_collisions[link]["shape"].lower() == "sphere":
+                        n_points = 1
+            return n_points
+
+        def get_hull_vertices(link):
+            collision = kccd_robot.get_link(link).collisions[0]
+            mesh = pgu.as_trimesh(collision.geometry.load_mesh(), silent=True)
+            vertices = np.asarray(mesh.vertices) * np.asarray(collision.geometry.scale)
+            T = collision.origin.to_matrix()
+            return vertices.dot(T[0:3, 0:3].T) + T[0:3, 3]
+
+        bodies = [block.split()[1] for block in kccd_cfg if block.startswith("BODY ")]
+        n_points = {body: get_n_points(body[2:]) for body in bodies}
+        fitted_volumes = {}
+        if not use_kccdcoveriv:
+            fit_args = ([get_hull_vertices(body[2:]) for body in bodies], [n_points[body] for body in bodies])
+            if n_workers is not None and n_workers > 1 and len(bodies) > 1 and not BPY_AVAILABLE:
+                with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                    fitted_volumes = dict(zip(bodies, pool.map(pgu.fit_sphere_swept_hull, *fit_args)))
+            else:
+                fitted_volumes = dict(zip(bodies, map(pgu.fit_sphere_swept_hull, *fit_args)))
         new_kccd_cfg = []
         kccd_dict = {}
         dontchecks = []
@@ -570,8 +847,10 @@ class Robot(SMURFRobot):
                     kwargs["simplify_swept_from"]) > 0:
                 for link in kwargs["simplify_swept_from"]:
                     assert kccd_robot.get_link(link) is not None
-                    subtree = kccd_robot.instantiate_submodel(name="kccd_subtree", start=link, stop=None)
-                    order0 = [joint.name for joint in subtree.joints if joint.name in kccd_kinematics.keys()]
+                    _, subtree_joints = kccd_robot.get_links_and_joints_in_subtree(start=link)
+                    subtree_joints = set(subtree_joints)
+                    order0 = [joint.name for joint in kccd_robot.joints
+                              if joint.name in subtree_joints and joint.name in kccd_kinematics.keys()]
                     if len(order0) > 0:
                         block += "\nOVERWRITE " + " ".join(order0) + " WITH ORDER 0 END"
             elif block.startswith("BODY "):
@@ -588,31 +867,22 @@ class Robot(SMURFRobot):
                     dontchecks += [block[block.find("DONTCHECK") + 9:block.find("END")].strip().split(" WITH ")]
                     block = block.replace(block[block.find("DONTCHECK"):block.find("END") + 3], "")
                 # generate cover volume
-                distance = len(
-                    kccd_robot.get_chain(self.get_root(), temp["link"], links=False, joints=True, fixed=False))
-                n_points = int((25 - 3) * 0.4 ** (distance / 3) + 3)  # [TODO v2.1.0] elaborate this
-                if temp["link"] in edit_collisions.keys():
-                    if "n_points" in edit_collisions[temp["link"]].keys():
-                        n_points = edit_collisions[temp["link"]]["n_points"]
-                    elif "shape" in edit_collisions[temp["link"]].keys() and \
-                            edit_collisions[temp["link"]]["shape"].lower() != "convex":
-                        if edit_collisions[temp["link"]]["shape"].lower() == "cylinder":
-                            n_points = 2
-                        elif edit_collisions[temp["link"]]["shape"].lower() == "box":
-                            n_points = 8
-                        elif edit_collisions[temp["link"]]["shape"].lower() == "sphere":
-                            n_points = 1
-                log.info(f"Covering {temp['mesh']} of {temp['link']} with {n_points}")
-                out, _ = execute_shell_command(
-                    "kccdcoveriv " + temp["mesh"] + " " + str(n_points) + " " + temp["body"], cwd=kccd_path,
-                    silent=True)
+                log.info(f"Covering {temp['mesh']} of {temp['link']} with {n_points[temp['body']]}")
                 block_lines = block.split("\n")
                 new_block = []
                 for line in block_lines:
                     if not (line.startswith("BODYRADIUS") or line.startswith("BODYPOINT")):
                         new_block += [line]
                 new_block = "\n".join(new_block).strip()
-                new_block += "\n" + out[out.find("# Fitted volume"):].strip()
+                if use_kccdcoveriv:
+                    out, _ = execute_shell_command(
+                        "kccdcoveriv " + temp["mesh"] + " " + str(n_points[temp["body"]]) + " " + temp["body"],
+                        cwd=kccd_path, silent=True)
+                    new_block += "\n" + out[out.find("# Fitted volume"):].strip()
+                else:
+                    new_block += "\n" + _format_kccd_fitted_volume(
+                        temp["body"], *fitted_volumes[temp["body"]],
+                        template_lines=[line for line in block_lines if line.startswith(("BODYRADIUS", "BODYPOINT"))])
                 block = new_block
                 kccd_dict[coll_name] = deepcopy(temp)
             new_kccd_cfg += [block.strip() + "\n\n"]
@@ -624,12 +894,10 @@ class Robot(SMURFRobot):
             else:
                 no_coll_override[dc[0]] += [dc[1]]
         coll_names, coll_matrix = kccd_robot.generate_collision_matrix(no_coll_override=no_coll_override)
-        for i in range(len(coll_names)):
-            for j in range(i):
-                if coll_matrix[i, j] == 0:
-                    new_line = "DONTCHECK " + kccd_dict[coll_names[i]]["body"] \
-                               + " WITH " + kccd_dict[coll_names[j]]["body"] + " END\n"
-                    new_kccd_cfg += [new_line]
+        for i, j in np.argwhere(np.tril(coll_matrix == 0, k=-1)):
+            new_line = "DONTCHECK " + kccd_dict[coll_names[i]]["body"] \
+                       + " WITH " + kccd_dict[coll_names[j]]["body"] + " END\n"
+            new_kccd_cfg += [new_line]
         with open(kccd_urdf[:-5] + ".cfg", "w") as f:
             f.write("\n")
             for line in new_kccd_cfg:
@@ -717,7 +985,8 @@ class Robot(SMURFRobot):
 
     def export(self, outputdir, export_config=None, rel_mesh_paths=None, ros_pkg_name=None, no_smurf=False, filename=None,
                ros_pkg_later=False, check_submechs=True, with_meshes=True, reduce_meshes=None, use_existing_meshes=False,
-               apply_scale=False, export_null_pose=True, sort_links_and_joints=True, mark_as_autogenerated=False):
+               apply_scale=False, export_null_pose=True, sort_links_and_joints=True, mark_as_autogenerated=False,
+               n_mesh_workers=None, n_workers=None, mesh_lock=None):
         assert self.check_linkage()
         if sort_links_and_joints:
             # this sorting is required to minimize the produced diff when tracking the model in a VCS
@@ -744,16 +1013,26 @@ class Robot(SMURFRobot):
                 mesh_formats = mesh_formats.union([f.lower() for f in ex.get("additional_meshes", [])])
                 if "mesh_format" in ex:
                     mesh_formats.add(ex["mesh_format"].lower())
-            for mf in mesh_formats:
+            # the mesh directories might be shared with other processes that hold the lock while writing to them
+            with mesh_lock if mesh_lock is not None else nullcontext():
+                main_export_robot_instance._export_meshes(
+                    [(os.path.join(outputdir, rel_mesh_paths[mf]), mf) for mf in mesh_formats],
+                    apply_scale=apply_scale, n_workers=n_mesh_workers
+                )
         # export everything else
-                main_export_robot_instance.export_meshes(mesh_output_dir=os.path.join(outputdir, rel_mesh_paths[mf]), format=mf, apply_scale=apply_scale)
-        for export in export_config:
+        # the targets are run by _run_export_targets() as soon as the targets they depend on are done
+        targets = []
+        kinematic_targets = []
+        xml_target_in_smurf = None
+        ros_pkg = False
+        for i, export in enumerate(export_config):
+            target_name = f"{i}_{export['type']}"
             if export["type"] in KINEMATIC_TYPES:
                 if export.get("link_in_smurf", False):
                     export_robot_instance = main_export_robot_instance.duplicate()
                 else:
                     export_robot_instance = main_export_robot_instance
-                xml_file = export_robot_instance.export_xml(
+                targets.append((target_name, [], lambda results, robot=export_robot_instance, export=export: (robot, "export_xml", dict(
                     outputdir=outputdir,
                     format=export["type"],
                     ros_pkg=export["ros_pathes"] if "ros_pathes" in export else None,
@@ -768,18 +1047,15 @@ class Robot(SMURFRobot):
                     enforce_zero=export.get("enforce_zero", False),
                     correct_inertials=export.get("correct_inertials", False),
                     use_existing_meshes=use_existing_meshes
-                )
-                if not export.get("link_in_smurf", False):
-                    if "filename" not in export:
-                        main_export_robot_instance.additional_files[export["type"]] = xml_file
-                    else:
-                        main_export_robot_instance.additional_files[export["filename"]] = xml_file
+                ))))
+                kinematic_targets.append((target_name, export))
                 ros_pkg |= export["ros_pathes"] if "ros_pathes" in export else None
                 if export.get("link_in_smurf", False):
-                    assert xml_file_in_smurf is None, "Only one xml file can be linked in the SMURF"
-                    xml_file_in_smurf = xml_file
+                    assert xml_target_in_smurf is None, "Only one xml file can be linked in the SMURF"
+                    xml_target_in_smurf = target_name
             elif export["type"] == "submodel":
                 log.debug(f"Exporting submodel {export['name']}")
+                # the submodels are defined here, as this changes the submodel_defs of the main export robot
                 if export["name"] not in main_export_robot_instance.submodel_defs:
                     export_robot_instance = main_export_robot_instance.define_submodel(
                         name=export["name"],
@@ -810,7 +1086,7 @@ class Robot(SMURFRobot):
                 else:
                     _export_config = [ec for ec in export_config if ec["type"] not in ["for-loop", "submodel"]]
                 main_export_robot_instance.submodel_defs[export["name"]]["export_dir"] = os.path.join(outputdir, "submodels", export["name"])
-                export_robot_instance.export(
+                targets.append((target_name, [], lambda results, robot=export_robot_instance, export=export, _export_config=_export_config: (robot, "export", dict(
                     outputdir=main_export_robot_instance.submodel_defs[export["name"]]["export_dir"],
                     export_config=_export_config,
                     rel_mesh_paths={k: os.path.join("..", "..", v) for k, v in rel_mesh_paths.items()},
@@ -819,48 +1095,69 @@ class Robot(SMURFRobot):
                     no_smurf=no_smurf,
                     filename=export.get("filename", None),
                     mark_as_autogenerated=mark_as_autogenerated
-                )
+                ))))
             elif export["type"] == "pdf":
-                main_export_robot_instance.export_pdf(outputfile=os.path.join(outputdir, self.name.replace('/','_') + ".pdf"))
+                targets.append((target_name, [], lambda results: (main_export_robot_instance, "export_pdf", dict(
+                    outputfile=os.path.join(outputdir, self.name.replace('/','_') + ".pdf")
+                ))))
             elif export["type"] == "kccd":
                 export_robot_instance = main_export_robot_instance.duplicate()
-                export_robot_instance.export_kccd(
+                targets.append((target_name, [], lambda results, robot=export_robot_instance, export=export: (robot, "export_kccd", dict(
                     outputdir=outputdir,
                     rel_iv_meshes_path=rel_mesh_paths["iv"],
                     output_mesh_format="stl",
                     **export
-                )
+                ))))
             elif export["type"] == "joint_limits":
                 kwargs = {}
                 if "file_name" in export:
                     kwargs["file_name"] = export["file_name"]
                 if "joints" in export:
                     kwargs["joint_desc"] = export["joints"]
-                main_export_robot_instance.export_joint_limits(
+                targets.append((target_name, [], lambda results, kwargs=kwargs: (main_export_robot_instance, "export_joint_limits", dict(
                     outputdir=outputdir,
                     mark_as_autogenerated=mark_as_autogenerated,
                     **kwargs
-                )
+                ))))
             elif export["type"] == "smurf":
                 # will be exported by default
                 pass
             else:
                 log.error(f"Can't export according to following export configuration:\n{export}")
+
+        def register_xml_files(results):
+            for target_name, export in kinematic_targets:
+                if target_name == xml_target_in_smurf:
+                    continue
+                if "filename" not in export:
+                    main_export_robot_instance.additional_files[export["type"]] = results[target_name]
+                else:
+                    main_export_robot_instance.additional_files[export["filename"]] = results[target_name]
+
         # export smurf
         if not no_smurf:
-            main_export_robot_instance.export_smurf(
-                outputdir=outputdir,
-                robotfile=xml_file_in_smurf,
-                check_submechs=check_submechs,
-                with_submodel_defs=True,
-                filename=filename,
-                mark_as_autogenerated=mark_as_autogenerated,
-                with_meshes=False  # has been done before
-            )
+            def prepare_smurf(results):
+                register_xml_files(results)
+                return main_export_robot_instance, "export_smurf", dict(
+                    outputdir=outputdir,
+                    robotfile=results[xml_target_in_smurf] if xml_target_in_smurf is not None else None,
+                    check_submechs=check_submechs,
+                    with_submodel_defs=True,
+                    filename=filename,
+                    mark_as_autogenerated=mark_as_autogenerated,
+                    with_meshes=False  # has been done before
+                )
+            targets.append(("smurf", [t[0] for t in kinematic_targets], prepare_smurf))
         # export ros package files
         if ros_pkg and not ros_pkg_later:
-            main_export_robot_instance.export_ros_package_files(outputdir, ros_pkg_name, mark_as_autogenerated=mark_as_autogenerated)
-        elif ros_pkg and ros_pkg_later:
+            # the package files list all directories, hence they are created after all other files
+            targets.append(("ros_package", [t[0] for t in targets], lambda results: (
+                main_export_robot_instance, "export_ros_package_files",
+                dict(outputdir=outputdir, ros_pkg_name=ros_pkg_name, mark_as_autogenerated=mark_as_autogenerated)
+            )))
+        results = _run_export_targets(targets, n_workers=n_workers)
+        register_xml_files(results)
+        if ros_pkg and ros_pkg_later:
             return ros_pkg_name
 
     def export_ros_package_files(self, outputdir, ros_pkg_name, author=None, maintainer=None, url=None, version=None, license=None, cmake=None, package_xml=None, mark_as_autogenerated=False):
@@ -1032,9 +1329,29 @@ class Robot(SMURFRobot):
 
     def remove_fixed(self):
         """Removes all fixed joints, see remove_joint
+        Each remaining link gets the composite inertial of the links that are attached to it by fixed joints.
         """
-        remove = [str(j) for j in self.joints if j.joint_type == "fixed"]
-        self.remove_joint(remove)
+        fixed = [j for j in self.joints if j.joint_type == "fixed"]
+        if len(fixed) == 0:
+            return
+        composites = self._get_composite_inertias(fixed_only=True)
+        removed_links = set([str(j.child) for j in fixed])
+        for joint in fixed:
+            parent = str(joint.parent)
+            if parent in removed_links or parent not in composites:
+                continue
+            link = self.get_link(parent)
+            mass, com, inertia = composites[parent]
+            if mass == 0:
+                continue
+            link.inertial = representation.Inertial(
+                mass=float(mass),
+                inertia=representation.Inertia.from_matrix(inertia),
+                origin=representation.Pose(xyz=com.tolist(), rpy=[0, 0, 0], relative_to=parent),
+                link=parent
+            )
+            link.inertial.link_with_robot(self)
+        self.remove_joint([str(j) for j in fixed], merge_inertial=False)
 
     def move_link_in_tree(self, link_name, new_parent_name):
         """
@@ -1058,8 +1375,9 @@ class Robot(SMURFRobot):
         T0_newp = self.get_transformation(new_parent_name)
         joint.origin = representation.Pose.from_matrix(inv(T0_newp).dot(T0_old), relative_to=new_parent_name)
         joint.origin.link_with_robot(self)
+        old_parent = joint.parent
         joint.parent = new_parent_name
-        self.regenerate_tree_maps()
+        self._tree_reparent_joint(joint, old_parent=old_parent)
 
     def define_submodel(self, name, start=None, stop=None, robotname=None, only_urdf=False, abstract_model=False,
                         remove_joints=None, remove_links=None, remove_fixed=False, no_submechanisms=False, include_unstopped_branches=False,
@@ -1108,10 +1426,19 @@ class Robot(SMURFRobot):
         if include_unstopped_branches or stop is None:
             _stop = self.get_leaves(start, stop=_stop)
         for leave in _stop:
-            linknames = linknames.union(self.get_chain(start, leave, joints=False))
+            if not self.is_ancestor(start, leave):
+                raise KeyError(f"{leave} is not in chain between {start}->{leave} or this is not a valid chain from the robot's root ({self.get_root()})")
+            # walk up until we reach a link of an already collected chain
+            link = str(leave)
+            while link not in linknames:
+                linknames.add(link)
+                if link == str(start):
+                    break
+                link = self.parent_map[link][1]
+        linkset = linknames
         linknames = list(linknames)
 
-        jointnames = [str(j) for j in self.get_joint(self.get_parent(linknames)) if j is not None and j.parent in linknames]
+        jointnames = [str(j) for j in self.get_joint(self.get_parent(linknames)) if j is not None and j.parent in linkset]
         assert len(linknames) == len(jointnames) + 1, f"n_links={len(linknames)} - 1 != n_joints={len(jointnames)}\n{start}\t{stop}\n{linknames}\n{jointnames}"
         #print(f"n_links={len(linknames)} - 1 != n_joints={len(jointnames)}\n{start}\t{stop}\n{linknames}\n{jointnames}")
 
@@ -1347,59 +1674,215 @@ class Robot(SMURFRobot):
 
     def correct_inertials(self, limit=0.0):
         """
-        Correct all inertials of the robot.
+        Correct all inertials of the robot: masses below the limit are set to the limit and the principal moments of
+        inertia of a link are shifted so that the smallest one is not below the limit. The inertia tensors of all links
+        are decomposed in one batch.
+
+        Args:
+            limit: the minimum mass and principal moment of inertia
+
+        Returns:
+            dict by name of the corrected links of dicts with the "mass" as (old, new) and/or the "inertia_shift" that
+            has been added to all principal moments of inertia
         """
+        links = []
         for link in self.links:
             # [TODO v2.1.0] check if the I is basically zero and then recreate the inertial using the collision
             if link.inertial:
-                M = self.get_inertial(link.name).to_mass_matrix()
-                origin = link.inertial.origin
-                if origin.relative_to is None:
-                    origin.relative_to = link
+                links.append(link)
+                if link.inertial.origin.relative_to is None:
+                    link.inertial.origin.relative_to = link
             else:
                 log.info(" Link {} has no inertial defined".format(link.name))
+        if len(links) == 0:
+            return {}
+
+        masses = np.array([link.inertial.mass for link in links], dtype=float)
+        inertias = np.array([link.inertial.inertia.to_matrix() for link in links], dtype=float)
+        # the eigenvalues are returned in ascending order
+        E, V = np.linalg.eigh(inertias)
+        shifts = np.where(E[:, 0] < limit, np.abs(E[:, 0] - limit), 0.0)
+        corrected = np.einsum("nij,nj,nkj->nik", V, E + shifts[:, np.newaxis], V)
+
+        report = {}
+        for i, link in enumerate(links):
+            correction = {}
+            if masses[i] < limit:
+                correction["mass"] = (float(masses[i]), limit)
+            if shifts[i] > 0:
+                correction["inertia_shift"] = float(shifts[i])
+            if len(correction) == 0:
                 continue
-            m = M[0, 0]
-            if m < limit:
+            M = link.inertial.to_mass_matrix()
+            if "mass" in correction:
                 M[:3, :3] = np.eye(3) * limit
-                log.info(" Corrected mass for link {}".format(link.name))
+            if "inertia_shift" in correction:
+                M[3:, 3:] = corrected[i]
+            link.inertial = representation.Inertial.from_mass_matrix(M, link.inertial.origin, link)
+            log.info(" Corrected inertial of link {}: {}".format(
+                link.name, ", ".join(["mass {} -> {}".format(*v) if k == "mass" else "principal moments +{}".format(v)
+                                      for k, v in correction.items()])))
+            report[link.name] = correction
+        log.info("Corrected the inertials of {} of {} links".format(len(report), len(links)))
+        return report
+
+    def _get_composite_inertias(self, fixed_only=False):
+        """
+        Returns the mass properties of the subtree of each link, which are computed in one bottom-up pass and cached
+        until the tree, an origin or an inertial is changed (see representation.get_edit_version()).
+        The returned dict is owned by the cache and must not be modified.
 
-            I = M[3:, 3:]
+        Args:
+            fixed_only: if True the subtrees only contain the links that are attached by fixed joints
 
-            if any([x < limit for x in np.linalg.eigvals(I)]):
-                E, V = np.linalg.eig(I)
-                diff = np.abs(np.min(E) - limit)
+        Returns:
+            dict of (mass, com (3, ), inertia about the com (3, 3)) by link name, com and inertia being expressed in
+            the frame of the link
+        """
+        cache = self._tree_cached("composite_inertias", lambda: {})
+        entry = cache.get(fixed_only, None)
+        if entry is not None and entry[0] == representation.get_edit_version():
+            return entry[1]
+        # breadth first, so that the children come after their parents
+        order = [str(self.get_root())]
+        for link_name in order:
+            order += [child for _, child in self.child_map.get(link_name, [])]
+        composites = {}
+        for link_name in reversed(order):
+            link = self.get_link(link_name)
+            representation.watch_edits(link, link.origin, link.inertial)
+            parts = []
+            if link.inertial is not None:
+                representation.watch_edits(link.inertial.inertia, link.inertial.origin)
+                T = self.get_transformation(str(link.inertial.origin.relative_to), start=link_name).dot(
+                    link.inertial.origin.to_matrix())
+                R = T[0:3, 0:3]
+                parts.append((link.inertial.mass, T[0:3, 3], R.dot(np.array(link.inertial.inertia.to_matrix())).dot(R.T)))
+            for joint_name, child in self.child_map.get(link_name, []):
+                joint = self.get_joint(joint_name)
+                representation.watch_edits(joint, joint.origin)
+                if fixed_only and joint.joint_type != "fixed":
+                    continue
+                mass, com, inertia = composites[child]
+                if mass == 0:
+                    continue
+                T = self.get_transformation(child, start=link_name)
+                R = T[0:3, 0:3]
+                parts.append((mass, R.dot(com) + T[0:3, 3], R.dot(inertia).dot(R.T)))
+            composites[link_name] = _combine_mass_properties(parts)
+        cache[fixed_only] = (representation.get_edit_version(), composites)
+        return composites
 
-                E = np.diag([e + diff for e in E])
-                I = np.matmul(V, np.matmul(E, np.linalg.inv(V)))
+    def compute_subtree_inertial(self, link_name=None):
+        """
+        Computes the composite inertial of all links in the subtree of the given link.
 
-                M[3:, 3:] = I
+        Args:
+            link_name: the root link of the subtree, defaults to the root of the robot
 
-            link.inertial = representation.Inertial.from_mass_matrix(M, origin, link)
-            log.debug(" Corrected inertia for link {}".format(link.name))
+        Returns:
+            representation.Inertial relative to the given link or None if the subtree has no mass
+        """
+        link_name = str(self.get_root()) if link_name is None else str(link_name)
+        assert self.get_link(link_name) is not None, f"There is no link with name {link_name}"
+        mass, com, inertia = self._get_composite_inertias()[link_name]
+        if mass == 0:
+            return None
+        return representation.Inertial(
+            mass=float(mass),
+            inertia=representation.Inertia.from_matrix(inertia),
+            origin=representation.Pose(xyz=com.tolist(), rpy=[0, 0, 0], relative_to=link_name),
+            link=link_name
+        )
 
     def compute_mass(self):
         """
         Compute the overall mass of the robot.
         """
-        m = 0.0
-        for link in self.links:
-            m += link.inertial.mass if link.inertial else 0.0
+        m = float(self._get_composite_inertias()[str(self.get_root())][0])
         log.info("{} has a total mass of {} kg.".format(self.name, m))
         return m
 
     def compute_com(self):
-        com = np.array([0.0, 0.0, 0.0])
-        mass = 0
-        for link in self.links:
-            T = self.get_transformation(link.name)
-            if link.inertial is not None:
-                T = T.dot(link.inertial.origin.to_matrix())
-                m = link.inertial.mass
-                mass += m
-                com += T[0:3, 3] * m
-        com /= mass
-        return com
+        root = str(self.get_root())
+        _, com, _ = self._get_composite_inertias()[root]
+        T = self.get_transformation(root)
+        return T[0:3, 0:3].dot(com) + T[0:3, 3]
+
+    def get_fk_joint_names(self):
+        """
+        Returns the names of the joints that are expected by get_forward_kinematics by default,
+        i.e. all revolute, continuous and prismatic joints in depth first order except the mimic joints, as their
+        positions are derived from the joints they mimic
+        """
+        return [str(j) for j in get_joints_depth_first(self, self.get_root())
+                if j.joint_type in ["revolute", "continuous", "prismatic"] and j.mimic is None]
+
+    def get_forward_kinematics(self, joint_positions, joint_names=None):
+        """
+        Computes the transformations from the root to all links for a batch of joint configurations.
+        Joints that are not given are kept at zero position, unless they mimic a given joint (directly or via other
+        mimic joints).
+        Args:
+            joint_positions: array of shape (B, n_joints) or (n_joints,) with the joint positions
+            joint_names: the joint names corresponding to the columns of joint_positions (default: get_fk_joint_names())
+        Returns:
+            tuple: (link_names, transformations) where transformations has the shape (B, n_links, 4, 4) and the links
+            are ordered as in link_names, i.e. the root first, followed by the child links in depth first joint order
+        """
+        if joint_names is None:
+            joint_names = self.get_fk_joint_names()
+        joint_positions = np.asarray(joint_positions, dtype=float)
+        single = joint_positions.ndim == 1
+        if single:
+            joint_positions = joint_positions[None, :]
+        assert joint_positions.ndim == 2 and joint_positions.shape[1] == len(joint_names), \
+            f"Expected joint positions of shape (B, {len(joint_names)}) got {joint_positions.shape}"
+        columns = {str(jn): i for i, jn in enumerate(joint_names)}
+
+        root = self.get_root()
+        joints = get_joints_depth_first(self, root)
+        link_names = [str(root)] + [str(j.child) for j in joints]
+        link_indices = {ln: i for i, ln in enumerate(link_names)}
+        batch_size = joint_positions.shape[0]
+        T = np.empty((batch_size, len(link_names), 4, 4))
+        T[:, 0] = self.get_transformation(root.name, end_type="link")
+        for joint in joints:
+            positions = self._get_fk_joint_positions(joint, joint_positions, columns)
+            if positions is not None and joint.joint_type not in ["revolute", "continuous", "prismatic"]:
+                raise ValueError(f"Forward kinematics for joint {joint.name} of type {joint.joint_type} is not supported")
+            # the zero pose transformations parent_link->joint and joint->child_link
+            parent2joint = self.get_transformation(joint.name, start=joint.parent, end_type="joint")
+            child = self.get_link(joint.child)
+            T_child = np.matmul(T[:, link_indices[str(joint.parent)]], parent2joint)
+            if positions is not None:
+                T_child = np.matmul(T_child, transform.joint_transformations(joint.joint_type, joint.axis, positions))
+            if child.origin is not None:
+                T_child = np.matmul(T_child, inv(self.get_transformation(joint.name, end_type="joint")).dot(
+                    self.get_transformation(child.name, end_type="link")))
+            T[:, link_indices[str(joint.child)]] = T_child
+        if single:
+            return link_names, T[0]
+        return link_names, T
+
+    def _get_fk_joint_positions(self, joint, joint_positions, columns):
+        """
+        Returns the positions of the joint for the batch of joint_positions, following its mimic relations until a
+        joint that is given in columns is found, or None if there is none
+        """
+        multiplier, offset = 1.0, 0.0
+        visited = set()
+        while joint is not None and str(joint) not in visited:
+            if str(joint) in columns:
+                return joint_positions[:, columns[str(joint)]] * multiplier + offset
+            if joint.mimic is None:
+                return None
+            visited.add(str(joint))
+            # q_joint = multiplier * q + offset with q = m * q_leader + o
+            offset += multiplier * (joint.mimic.offset if joint.mimic.offset is not None else 0.0)
+            multiplier *= joint.mimic.multiplier if joint.mimic.multiplier is not None else 1.0
+            joint = self.get_joint(str(joint.mimic.joint))
+        return None
 
     def transform_link_orientation(self, linkname, transformation, only_frame=True, transform_to=False):
         """
@@ -1629,6 +2112,95 @@ class Robot(SMURFRobot):
         # print(com)
         self.transform_inertial(link.name, translation=com, rotation=[0.0, 0.0, 0.0])
 
+    def estimate_inertials(self, density=None, total_mass=None, links=None, from_visuals=False, n_workers=None):
+        """
+        Estimates the inertials of the links from their collision (or visual) geometries and overwrites them.
+        The mass properties of all geometries are computed in one pass, the primitives analytically and the meshes with
+        batched volume integrals (see utils.inertia.calculateMeshMassProperties()). Each distinct mesh is loaded once.
+        Overlapping geometries of a link are counted twice.
+
+        Args:
+            density: the density of all geometries in kg/m^3
+            total_mass: alternatively to density, the mass that is distributed over the links by the volume of their
+                geometries
+            links: list of the links (or their names) to estimate, defaults to all links
+            from_visuals: if True the visuals are used instead of the collisions
+            n_workers: if > 1, the meshes are loaded and closed by that many worker processes
+
+        Returns:
+            dict of the estimated masses by link name
+        """
+        assert (density is None) != (total_mass is None), "Either density or total_mass has to be given"
+        if links is None:
+            links = self.links
+        links = [self.get_link(link) if type(link) is str else link for link in links]
+        assert all([type(link) is representation.Link for link in links])
+
+        geometries = [(link, geo) for link in links for geo in (link.visuals if from_visuals else link.collisions)]
+        # the keys are taken before loading the meshes as loading changes them
+        mesh_keys = [_get_volume_mesh_key(geo.geometry) if isinstance(geo.geometry, representation.Mesh) else None
+                     for _, geo in geometries]
+        meshes = {}
+        for (_, geo), key in zip(geometries, mesh_keys):
+            if key is not None:
+                meshes.setdefault(key, geo.geometry)
+        keys = list(meshes.keys())
+        if n_workers is not None and n_workers > 1 and len(keys) > 1 and not BPY_AVAILABLE:
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                volume_meshes = list(pool.map(_get_volume_mesh, [_get_mesh_worker_copy(meshes[k]) for k in keys]))
+        else:
+            volume_meshes = [_get_volume_mesh(meshes[k]) for k in keys]
+        volumes, coms, inertias = utils.inertia.calculateMeshMassProperties(volume_meshes)
+        mesh_properties = {k: (volumes[i], coms[i], inertias[i]) for i, k in enumerate(keys)}
+
+        def to_matrix(inertia):
+            ixx, ixy, ixz, iyy, iyz, izz = inertia
+            return np.array([[ixx, ixy, ixz], [ixy, iyy, iyz], [ixz, iyz, izz]])
+
+        # volume, com and inertia at unit density of each geometry in the frame of its link
+        link_properties = {}
+        for (link, geo), key in zip(geometries, mesh_keys):
+            geometry = geo.geometry
+            com = np.zeros(3)
+            if isinstance(geometry, representation.Mesh):
+                volume, com, inertia = mesh_properties[key]
+            elif isinstance(geometry, representation.Box):
+                volume = geometry.size[0] * geometry.size[1] * geometry.size[2]
+                inertia = to_matrix(utils.inertia.calculateBoxInertia(volume, geometry.size))
+            elif isinstance(geometry, representation.Sphere):
+                volume = 4 / 3 * np.pi * pow(geometry.radius, 3)
+                inertia = to_matrix(utils.inertia.calculateSphereInertia(volume, geometry.radius))
+            elif isinstance(geometry, representation.Cylinder):
+                volume = np.pi * geometry.length * pow(geometry.radius, 2)
+                inertia = to_matrix(utils.inertia.calculateCylinderInertia(volume, geometry.radius, geometry.length))
+            else:
+                raise TypeError("Geometry type not known!")
+            T = geo.origin.to_matrix()
+            R = T[0:3, 0:3]
+            link_properties.setdefault(link.name, []).append((volume, R.dot(com) + T[0:3, 3], R.dot(inertia).dot(R.T)))
+
+        if total_mass is not None:
+            overall_volume = sum([p[0] for props in link_properties.values() for p in props])
+            assert overall_volume > 0, "The geometries have no volume to distribute the total mass over"
+            density = total_mass / overall_volume
+
+        masses = {}
+        for link in links:
+            if link.name not in link_properties:
+                log.warning(f"Link {link.name} has no {'visuals' if from_visuals else 'collisions'}, keeping its inertial")
+                continue
+            volume, com, inertia = _combine_mass_properties(link_properties[link.name])
+            mass = float(density * volume)
+            link.inertial = representation.Inertial(
+                mass=mass,
+                inertia=representation.Inertia.from_matrix(density * inertia),
+                origin=representation.Pose(xyz=com.tolist(), rpy=[0, 0, 0], relative_to=link.name),
+                link=link.name
+            )
+            link.inertial.link_with_robot(self)
+            masses[link.name] = mass
+        return masses
+
     def move_joint_to_intersection(self, joint, other_joints):
         """
         Transforms the joint in such way that it's axis intersects with the two other joints
@@ -1723,7 +2295,7 @@ class Robot(SMURFRobot):
                     joint.axis = default_axis
                     result &= 4
 
-    def generate_collision_matrix(self, coll_override=None, no_coll_override=None):
+    def generate_collision_matrix(self, coll_override=None, no_coll_override=None, **kwargs):
         """
         Generates a matrix which collisions are allowed to happen/should be checked for and which not.
 
@@ -1736,11 +2308,31 @@ class Robot(SMURFRobot):
             c) Collisions with collisions in the parent's parent and above as long as the transformation between those
                links is only rotational
             d) Collisions where the bounding_boxes touch
+            d') If joint_configurations (B, n_joints) are given, collisions that collide in at least collision_ratio of
+               these configurations. If disable_never_colliding is True also the pairs that never collided in any of
+               these configurations. joint_names are the names of the joints in joint_configurations (see
+               get_forward_kinematics).
         Further (not yet implemented) :
             e) Collisions where the bounding_boxes are closer than a threshold
             f) Collisions that are impossible to collide
 
-        By this criteria we create the collision matrix
+        By this criteria we create the collision matrix.
+        For larger models, where most of the pairs have to be checked, see generate_collision_exclusions().
+        """
+        coll_names, exclusions = self.generate_collision_exclusions(coll_override=coll_override,
+                                                                    no_coll_override=no_coll_override, **kwargs)
+        rows, cols = exclusions.nonzero()
+        matrix = np.ones((len(coll_names), len(coll_names)))
+        matrix[rows, cols] = 0.0
+        return coll_names, matrix
+
+    def generate_collision_exclusions(self, coll_override=None, no_coll_override=None, joint_configurations=None,
+                                      joint_names=None, collision_ratio=1.0, disable_never_colliding=False):
+        """
+        Generates the pairs of collisions that must not be checked by the criteria of generate_collision_matrix().
+
+        Returns a list of the collision names, and a symmetric scipy.sparse.csr_matrix with 1 for each pair that must
+        not be checked, i.e. the inverse of the collision matrix without its diagonal.
         """
         if no_coll_override is None:
             no_coll_override = {}
@@ -1788,66 +2380,73 @@ class Robot(SMURFRobot):
                         no_coll_override[k] = temp
 
         n_colls = len(coll_names)
-        coll_matrix = np.ones((n_colls, n_colls))
-
-        def set_coll(i_, j_, val):
-            coll_matrix[i_, j_] = val
-            coll_matrix[j_, i_] = val
+        coll_indices = {cn: i for i, cn in enumerate(coll_names)}
+
+        # the pairs (i, j) with i < j of collisions that must not be checked are collected, so that the sparse matrix
+        # can be built without the dense one
+        no_coll = set()
+        never_colliding = None
+
+        def exclude(i, j):
+            if i != j:
+                no_coll.add((i, j) if i < j else (j, i))
+
+        # a), b) and c) are decided on link level: the ancestors are computed once per link
+        # adam and eve are the distant parents of the only rotational tree given in ._ancestors
+        colls_of_link = {}
+        for i, ln in enumerate(link_names):
+            colls_of_link.setdefault(ln, []).append(i)
+        for ln in colls_of_link:
+            ancestors, adam, _ = find_close_ancestor_links(self, ln)
+            for an in set([ln, adam] + ancestors):  # a), b) and c)
+                for i in colls_of_link.get(an, []):
+                    for j in colls_of_link[ln]:
+                        exclude(i, j)
 
         # get zero pose collisions d)
         zero_pose_colls = pgu.find_zero_pose_collisions(self)
         if zero_pose_colls is not None:  # d) All collisions that exist in the zero pose should not happen
             for c1, c2 in zero_pose_colls:
-                # print(c1, "and", c2, "would collide in zero pose, therefore the shall not collide.")
-                i = coll_names.index(c1)
-                j = coll_names.index(c2)
-                set_coll(i, j, 0)
-
-        # create coll_matrix
-        for i in range(n_colls):
-            for j in range(i):
-                # adam and eve are the distant parents of the only rotational tree given in ._ancestors
-                j_ancestors, adam, _ = find_close_ancestor_links(self, link_names[j])
-                i_ancestors, eve, _ = find_close_ancestor_links(self, link_names[i])
-                j_ancestors = [adam] + j_ancestors
-                i_ancestors = [eve] + i_ancestors
-                if (
-                        i == j or
-                        link_names[i] == link_names[j] or  # a)
-                        link_names[i] in j_ancestors or  # b) and c)
-                        link_names[j] in i_ancestors  # b) and c)
-                ):
-                    set_coll(i, j, 0)
-                # f)
-                # i_prior_to_j = link_names[i] in self.get_chain(self.get_root(), link_names[j], joints=False)
-                # j_prior_to_i = link_names[j] in self.get_chain(self.get_root(), link_names[i], joints=False)
-                # if i_prior_to_j and adam == i_ancestors[-1]:
-                #     jn = self.getParent(adam)
-                #     joint = self.getJoint(jn[0])
-                #     if np.linalg.norm(joint.origin.xyz) > 0.3:
-                #         for iln in i_ancestors[1:]:
-                #             for jln in j_ancestors[:-1]:
-                #                 print("No collision between", iln, jln)
-                #                 setColl(link_names.index(iln), link_names.index(jln), 0)
-                # elif j_prior_to_i and eve == j_ancestors[-1]:
-                #     jn = self.getParent(eve)
-                #     joint = self.getJoint(jn[0])
-                #     if np.linalg.norm(joint.origin.xyz) > 0.3:
-                #         for jln in j_ancestors[1:]:
-                #             for iln in i_ancestors[:-1]:
-                #                 print("No collision between", iln, jln)
-                #                 setColl(link_names.index(iln), link_names.index(jln), 0)
-
-                # override with user input
-                if ((coll_names[i] in no_coll_override.keys() and coll_names[j] in no_coll_override[coll_names[i]]) or
-                        (coll_names[j] in no_coll_override.keys() and coll_names[i] in no_coll_override[
-                            coll_names[j]])):
-                    set_coll(i, j, 0)
-                elif ((coll_names[i] in coll_override.keys() and coll_names[j] in coll_override[coll_names[i]]) or
-                      (coll_names[j] in coll_override.keys() and coll_names[i] in coll_override[coll_names[j]])):
-                    set_coll(i, j, 1)
-        # print(coll_matrix)
-        return coll_names, coll_matrix
+                exclude(coll_indices[c1], coll_indices[c2])
+
+        # d') data-driven from a batch of joint configurations
+        if joint_configurations is not None:
+            joint_configurations = np.asarray(joint_configurations, dtype=float)
+            n_configurations = 1 if joint_configurations.ndim == 1 else joint_configurations.shape[0]
+            counts = pgu.get_collision_scene(self).get_self_collisions(joint_configurations, joint_names=joint_names)
+            collided = set()
+            for (c1, c2), count in counts.items():
+                i, j = sorted([coll_indices[c1], coll_indices[c2]])
+                collided.add((i, j))
+                if count >= collision_ratio * n_configurations:
+                    exclude(i, j)
+            if disable_never_colliding or collision_ratio * n_configurations <= 0:
+                # most of the pairs never collide, so they are masked at once instead of being collected one by one
+                never_colliding = np.triu(np.ones((n_colls, n_colls), dtype=bool), k=1)
+                collided = np.array(sorted(collided), dtype=int).reshape(-1, 2)
+                never_colliding[collided[:, 0], collided[:, 1]] = False
+
+        # override with user input, no_coll_override takes precedence over coll_override
+        for k, vs in coll_override.items():
+            for v in vs:
+                if k in coll_indices and v in coll_indices:
+                    i, j = sorted([coll_indices[k], coll_indices[v]])
+                    no_coll.discard((i, j))
+                    if never_colliding is not None:
+                        never_colliding[i, j] = False
+        for k, vs in no_coll_override.items():
+            for v in vs:
+                if k in coll_indices and v in coll_indices:
+                    exclude(coll_indices[k], coll_indices[v])
+
+        pairs = np.array(sorted(no_coll), dtype=int).reshape(-1, 2)
+        if never_colliding is not None:
+            never_colliding[pairs[:, 0], pairs[:, 1]] = False
+            pairs = np.concatenate([pairs, np.argwhere(never_colliding)])
+        rows, cols = np.concatenate([pairs[:, 0], pairs[:, 1]]), np.concatenate([pairs[:, 1], pairs[:, 0]])
+        return coll_names, scipy.sparse.coo_matrix(
+            (np.ones(len(rows)), (rows, cols)), shape=(n_colls, n_colls)
+        ).tocsr()
 
     def set_self_collision(self, val=False, coll_override=None, no_coll_override=None, **kwargs):
         """If True, tries to avoid self collision with bitmasks which do not intersect.
@@ -2537,13 +3136,15 @@ class Robot(SMURFRobot):
         _, beyond = self.split_robot(link_to_cut)
         return beyond
 
-    def remove_joint(self, jointname, only_frame=True):
+    def remove_joint(self, jointname, only_frame=True, merge_inertial=True):
         """Remove the joint(s) from the mechanism and transforms all inertia, visuals and collisions
         to the corresponding parent of the joint.
         If only_frame is set to the physical information of the child link is removed as well
+        If merge_inertial is set to False the inertial of the child link is dropped, e.g. as the parent's inertial
+        already contains it (see remove_fixed)
         """
         if type(jointname) in [list, tuple, set]:
-            [self.remove_joint(j) for j in jointname]
+            [self.remove_joint(j, only_frame=only_frame, merge_inertial=merge_inertial) for j in jointname]
             return
         joint = self.get_joint(jointname)
         if joint is None:
@@ -2558,7 +3159,7 @@ class Robot(SMURFRobot):
                 # Get the transformation
                 C_T_P = self.get_transformation(start=parent.name, end=child.name)
                 # Correct inertial if child inertial is found
-                if child.inertial:
+                if child.inertial and merge_inertial:
                     IC_T_P = C_T_P.dot(child.inertial.origin.to_matrix())
                     M_c = child.inertial.to_mass_matrix()
                     if parent.inertial:
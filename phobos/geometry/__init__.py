@@ -1,6 +1,7 @@
 from .geometry import get_vertex_id, create_box, create_sphere, create_cylinder, \
-    get_reflection_matrix, improve_mesh, reduce_mesh
+    get_reflection_matrix, improve_mesh, reduce_mesh, fit_sphere_swept_hull, get_swept_hull_volume
 from .io import as_trimesh, export_mesh, import_mesh, import_mars_mesh
 from .robot import generate_kccd_optimizer_ready_collision, find_zero_pose_collisions, replace_geometry,  \
+    CollisionScene, get_collision_scene, \
     join_collisions, replace_collisions, replace_collision, reduce_mesh_collision, remove_collision, replace_visuals,  \
     replace_visual, remove_visual
@@ -4,6 +4,7 @@
 from copy import deepcopy
 
 import numpy as np
+from scipy.spatial import ConvexHull, QhullError
 
 # Lazy import trimesh - it's an optional dependency
 trimesh = None
@@ -187,4 +188,173 @@ def identical(mesh_a, mesh_b):
     except:
         # trimesh sometimes does utter sh** so we catch this here and assume false to be on the safe side
         trimesh_out = False
-    return out or trimesh_out
\ No newline at end of file
+    return out or trimesh_out
+
+def _project_onto_simplex(v):
+    """
+    Projects each row of v onto the probability simplex
+    """
+    n = v.shape[1]
+    u = -np.sort(-v, axis=1)
+    css = np.cumsum(u, axis=1) - 1
+    # the last index for which u - css / (index + 1) is positive
+    rho = n - 1 - np.argmax((u - css / np.arange(1, n + 1) > 0)[:, ::-1], axis=1)
+    theta = css[np.arange(len(v)), rho] / (rho + 1)
+    return np.maximum(v - theta[:, np.newaxis], 0)
+
+
+def _get_distances_to_convex_hull(vertices, points, iterations=100):
+    """
+    Returns upper bounds of the distances of the vertices to the convex hull of the points.
+    The closest point of the hull is approximated by projected gradient descent on its barycentric coordinates, as any
+    point of the hull gives an upper bound, the distances are never underestimated.
+    """
+    distances = np.linalg.norm(vertices[:, np.newaxis] - points[np.newaxis], axis=2)
+    nearest = np.min(distances, axis=1)
+    if len(points) == 1:
+        return nearest
+    gram = points.dot(points.T)
+    step = 1.0 / max(np.linalg.eigvalsh(gram)[-1], 1e-12)
+    target = vertices.dot(points.T)
+    weights = np.zeros((len(vertices), len(points)))
+    weights[np.arange(len(vertices)), np.argmin(distances, axis=1)] = 1.0
+    for _ in range(iterations):
+        weights = _project_onto_simplex(weights - step * (weights.dot(gram) - target))
+    return np.minimum(nearest, np.linalg.norm(vertices - weights.dot(points), axis=1))
+
+
+def _get_covering_radius(vertices, points, iterations=100, chunk_size=256):
+    """
+    Returns an upper bound of the largest distance of the vertices to the convex hull of the points.
+    The distances are estimated roughly first and only the vertices whose rough estimate exceeds the radius found so
+    far are refined.
+    """
+    rough = _get_distances_to_convex_hull(vertices, points, iterations=10)
+    order = np.argsort(-rough)
+    radius = 0.0
+    for chunk in range(0, len(order), chunk_size):
+        ids = order[chunk:chunk + chunk_size]
+        if rough[ids[0]] <= radius:
+            break
+        radius = max(radius, np.max(_get_distances_to_convex_hull(vertices[ids], points, iterations=iterations)))
+    return radius
+
+
+def get_swept_hull_volume(points, radius):
+    """
+    Returns the volume of the convex hull of the points dilated by the radius using the Steiner formula
+    V + A * r + M * r^2 + 4/3 * pi * r^3 with the volume V, the surface area A and the integral mean curvature M of the
+    hull, which is the sum of the edge lengths times the angles between the adjacent faces over two.
+    """
+    points = np.asarray(points, dtype=float)
+    points = points - np.mean(points, axis=0)
+    volume, area, mean_curvature = 0.0, 0.0, 0.0
+    _, singular_values, axes = np.linalg.svd(points, full_matrices=False)
+    rank = min(np.sum(singular_values > max(1e-9 * singular_values[0], 1e-12)), len(points) - 1)
+    if rank == 1:
+        extent = points.dot(axes[0])
+        mean_curvature = np.pi * (np.max(extent) - np.min(extent))
+    elif rank == 2:
+        hull = ConvexHull(points.dot(axes[0:2].T))
+        # in 2d the volume is the area and the area is the perimeter
+        area = 2 * hull.volume
+        mean_curvature = np.pi / 2 * hull.area
+    elif rank == 3:
+        hull = ConvexHull(points)
+        volume, area = hull.volume, hull.area
+        faces, neighbors = np.nonzero(hull.neighbors > np.arange(len(hull.simplices))[:, np.newaxis])
+        others = hull.neighbors[faces, neighbors]
+        # the edge shared with a neighbor is the one opposite of the vertex with the neighbor's index
+        edges = np.stack([hull.simplices[faces, (neighbors + 1) % 3], hull.simplices[faces, (neighbors + 2) % 3]], axis=1)
+        lengths = np.linalg.norm(points[edges[:, 0]] - points[edges[:, 1]], axis=1)
+        cosines = np.clip(np.einsum("ij,ij->i", hull.equations[faces, :3], hull.equations[others, :3]), -1.0, 1.0)
+        mean_curvature = np.sum(lengths * np.arccos(cosines)) / 2
+    return volume + area * radius + mean_curvature * radius ** 2 + 4 / 3 * np.pi * radius ** 3
+
+
+def _get_bounding_sphere(vertices, iterations=1000):
+    """
+    Returns the center and the radius of an approximately minimal sphere that covers the vertices (after Badoiu and
+    Clarkson)
+    """
+    point = np.mean(vertices, axis=0)
+    for i in range(1, iterations):
+        farthest = vertices[np.argmax(np.linalg.norm(vertices - point, axis=1))]
+        point = point + (farthest - point) / (i + 1)
+    return point, float(np.max(np.linalg.norm(vertices - point, axis=1)))
+
+
+def fit_sphere_swept_hull(vertices, n_points, shrink_steps=10):
+    """
+    Fits a sphere swept convex hull, i.e. the convex hull of n_points points dilated by a radius, that covers the given
+    vertices and hence their convex hull, as it is used by the KCCD to represent the bodies:
+        - one point: the bounding sphere (after Badoiu and Clarkson)
+        - more points: the candidate with the smallest volume (see get_swept_hull_volume()) of the bounding sphere,
+          the bounding capsule along the principal axis, the two most distant vertices moved towards each other and,
+          for more than two points, the most distant vertices of the convex hull moved towards its centroid and, for
+          at least eight points, the corners of the principal bounding box moved inwards. As the candidates for fewer
+          points are always included, the fit is never worse than the one with fewer points.
+
+    Args:
+        vertices: (N, 3) array of the vertices to cover
+        n_points: the number of points
+        shrink_steps: the number of factors that are tried when moving the points inwards
+
+    Returns:
+        tuple of the distinct points (at most n_points, 3) and the radius
+    """
+    vertices = np.unique(np.asarray(vertices, dtype=float).reshape(-1, 3), axis=0)
+    assert len(vertices) > 0 and n_points > 0
+    center = np.mean(vertices, axis=0)
+    vertices = vertices - center
+    try:
+        vertices = vertices[ConvexHull(vertices).vertices]
+    except (QhullError, ValueError):
+        # flat or too few vertices, all of them are kept
+        pass
+    if len(vertices) <= n_points:
+        return vertices + center, 0.0
+
+    sphere_center, sphere_radius = _get_bounding_sphere(vertices)
+    if n_points == 1:
+        return sphere_center[np.newaxis] + center, sphere_radius
+
+    axes = np.linalg.eigh(vertices.T.dot(vertices))[1][:, ::-1]
+    along = vertices.dot(axes[:, 0])
+    across = np.linalg.norm(vertices - np.outer(along, axes[:, 0]), axis=1)
+    # the shortest segment on the principal axis whose caps still cover the vertices
+    cap = np.sqrt(np.maximum(np.max(across) ** 2 - across ** 2, 0.0))
+    start, end = np.min(along + cap), np.max(along - cap)
+    # further points on the axis wouldn't change the capsule
+    candidates = [np.outer([start, end] if end - start > 1e-9 else [(start + end) / 2], axes[:, 0])]
+    # the segment between the two most distant vertices (approximated by two farthest point sweeps)
+    first = vertices[np.argmax(np.linalg.norm(vertices, axis=1))]
+    second = vertices[np.argmax(np.linalg.norm(vertices - first, axis=1))]
+    first = vertices[np.argmax(np.linalg.norm(vertices - second, axis=1))]
+    middle = (first + second) / 2
+    candidates += [np.array([middle + (first - middle) * (1 - factor), middle + (second - middle) * (1 - factor)])
+                   for factor in np.linspace(0.0, 1.0, shrink_steps + 1)[:-1]]
+    if n_points > 2:
+        selected = [np.argmax(np.linalg.norm(vertices, axis=1))]
+        distances = np.linalg.norm(vertices - vertices[selected[0]], axis=1)
+        for _ in range(n_points - 1):
+            selected.append(np.argmax(distances))
+            distances = np.minimum(distances, np.linalg.norm(vertices - vertices[selected[-1]], axis=1))
+        # the greedy selection of fewer points is a prefix of it, with these the fit isn't worse than with fewer points
+        candidates += [vertices[selected[:k]] * (1 - factor) for k in range(3, n_points + 1)
+                       for factor in np.linspace(0.0, 0.5, shrink_steps + 1)]
+    if n_points >= 8:
+        local = vertices.dot(axes)
+        box_center, extents = (np.max(local, axis=0) + np.min(local, axis=0)) / 2, (np.max(local, axis=0) - np.min(local, axis=0)) / 2
+        corners = np.array([[x, y, z] for x in [-1, 1] for y in [-1, 1] for z in [-1, 1]])
+        for inset in np.linspace(0.0, np.min(extents), shrink_steps + 1):
+            candidates.append((box_center + corners * (extents - inset)).dot(axes.T))
+
+    best = (get_swept_hull_volume(sphere_center[np.newaxis], sphere_radius), sphere_center[np.newaxis], sphere_radius)
+    for candidate in candidates:
+        radius = _get_covering_radius(vertices, candidate)
+        volume = get_swept_hull_volume(candidate, radius)
+        if volume < best[0]:
+            best = (volume, candidate, radius)
+    _, points, radius = best
+    return np.unique(points, axis=0) + center, float(radius)
@@ -1,9 +1,13 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import hashlib
 import json
 import os
-import struct
+import re
+import threading
+import traceback
+from collections import OrderedDict
 from copy import deepcopy
 
 import numpy as np
@@ -110,7 +114,7 @@ def trimesh_2_mesh_info_dict(mesh):
         mesh: trimesh.Trimesh
 
     Returns:
-        {"vertices": (n,3) single, "vertex_normals": (n,3) single, "faces": [n*[3*(n,3)]] intc, ["texture_coords": (n,2) single]}
+        {"vertices": (n,3) single, "vertex_normals": (n,3) single, "faces": (n,3,3) intc, ["texture_coords": (n,2) single]}
     """
     assert isinstance(mesh, trimesh.Trimesh) or mesh is None
     if mesh is None:
@@ -135,16 +139,10 @@ def trimesh_2_mesh_info_dict(mesh):
     out["vertex_normals"] = np.array(mesh.vertex_normals, dtype=np.single)
 
     # linking information for each triangle: vertex, uv, normal
-    out["faces"] = []
-    for face in mesh.faces:
-        values2 = []
-        assert len(face) == 3
-        for v_index in face:
-            assert v_index >= 0
-            assert v_index < N
-            values2.append(np.array([v_index ]*3 if write_uv else [v_index, -1, v_index], dtype=np.intc))
-        assert len(values2) == 3
-        out["faces"].append(values2)
+    faces = np.asarray(mesh.faces, dtype=np.intc)
+    assert faces.ndim == 2 and faces.shape[1] == 3
+    assert np.all(faces >= 0) and np.all(faces < N)
+    out["faces"] = np.stack([faces, faces if write_uv else np.full(faces.shape, -1, dtype=np.intc), faces], axis=2)
 
     return out
 
@@ -158,6 +156,10 @@ def mesh_info_dict_2_trimesh(vertices, faces, vertex_normals=None, texture_coord
     Returns:
         trimesh.Trimesh
     """
+    faces = np.asarray(faces)
+    if faces.ndim == 3:
+        # faces as given in the mesh info dict contain the vertex, texture coordinate and normal index of each corner
+        faces = faces[:, :, 0]
     mesh = trimesh.Trimesh(vertices=vertices, faces=faces, vertex_normals=vertex_normals)
     if texture_coords is not None:
         mesh.visual = trimesh.visual.TextureVisuals(uv=texture_coords)
@@ -173,6 +175,10 @@ def triangulate_faces_in_info_dict(faces, **mesh_info_dict):
     Returns:
         {"vertices": (n,3) single, "vertex_normals": (n,3) single, "faces": [n*[3*(n,3)]] intc, ["texture_coords": (n,2) single]}
     """
+    if isinstance(faces, np.ndarray) and faces.ndim == 3 and faces.shape[1] == 3:
+        # already triangulated
+        mesh_info_dict["faces"] = faces
+        return mesh_info_dict
     new_faces = []
     for face in faces:
         new_faces.append(face[0:3])
@@ -184,6 +190,40 @@ def triangulate_faces_in_info_dict(faces, **mesh_info_dict):
     return mesh_info_dict
 
 
+# bobj files consist of records of an int key followed by the values of the element
+_BOBJ_RECORDS = {
+    1: ("vertices", np.dtype([("key", np.intc), ("values", np.single, (3,))])),
+    2: ("texture_coords", np.dtype([("key", np.intc), ("values", np.single, (2,))])),
+    3: ("vertex_normals", np.dtype([("key", np.intc), ("values", np.single, (3,))])),
+    4: ("faces", np.dtype([("key", np.intc), ("values", np.intc, (3, 3))])),
+}
+
+
+def _write_bobj_records(out, key, values):
+    records = np.empty(len(values), dtype=_BOBJ_RECORDS[key][1])
+    records["key"] = key
+    records["values"] = values
+    out.write(records.tobytes())
+
+
+def _count_bobj_records(words, start, key):
+    """
+    Counts the consecutive records with the given key beginning at words[start].
+    """
+    step = _BOBJ_RECORDS[key][1].itemsize // words.itemsize
+    available = (len(words) - start) // step
+    n = 0
+    window = 1024
+    while n < available:
+        keys = words[start + n * step:start + min(n + window, available) * step:step]
+        mismatch = np.flatnonzero(keys != key)
+        if len(mismatch) > 0:
+            return n + int(mismatch[0])
+        n += len(keys)
+        window *= 2
+    return n
+
+
 def write_bobj(filepath, vertices=None, vertex_normals=None, faces=None, texture_coords=None, **mesh_info_dict):
     """
     Writes the mesh_info_dict to bobj format.
@@ -208,38 +248,28 @@ def write_bobj(filepath, vertices=None, vertex_normals=None, faces=None, texture
     assert isinstance(vertices, np.ndarray) and vertices.dtype == np.single and vertices.shape[1] == 3
     assert isinstance(vertex_normals, np.ndarray) and vertices.dtype == np.single and vertices.shape[1] == 3
     assert not write_uv or (isinstance(texture_coords, np.ndarray) and texture_coords.dtype == np.single and texture_coords.shape[1] == 2)
-    assert type(faces) == list and type(faces[0]) == list and isinstance(faces[0][0], np.ndarray) and faces[0][0].dtype == np.intc
+    assert (isinstance(faces, np.ndarray) and faces.dtype == np.intc and faces.shape[1:] == (3, 3)) or \
+        (type(faces) == list and type(faces[0]) == list and isinstance(faces[0][0], np.ndarray) and faces[0][0].dtype == np.intc)
     with open(filepath, "wb") as out:
         # vertices
-        N = vertices.shape[0]
-        assert N > 0
-        key = struct.unpack("f", struct.pack("i", 1))  # data type trick for writing an int in a float array
-        out.write(np.c_[np.array([key]*N, dtype=np.single), vertices].tobytes())
+        assert vertices.shape[0] > 0
+        _write_bobj_records(out, 1, vertices)
 
         if write_uv:
             # uv maps
             if texture_coords.shape[0] == vertices.shape[0]:
                 log.warning(f"UV coords of mesh {filepath} might not be accurate")
-            N = texture_coords.shape[0]
-            key = struct.unpack("f", struct.pack("i", 2))  # data type trick for writing an int in a float array
-            out.write(np.c_[np.array([key]*N, dtype=np.single), texture_coords].tobytes())
+            _write_bobj_records(out, 2, texture_coords)
 
         # vertex_normals
         if vertex_normals.shape[0] == vertices.shape[0]:
             log.warning(f"Vertex normals of mesh {filepath} might not be accurate")
-        N = vertex_normals.shape[0]
-        key = struct.unpack("f", struct.pack("i", 3))  # data type trick for writing an int in a float array
-        out.write(np.c_[np.array([key]*N, dtype=np.single), vertex_normals].tobytes())
+        _write_bobj_records(out, 3, vertex_normals)
 
         # faces
-        key = struct.unpack("i", struct.pack("i", 4))  # data type trick for writing an int in a float array
-        N = len(faces)
-        out_faces = []
-        for face in faces:
-            out_faces.append(np.concatenate(face))
-        out_faces = np.array(out_faces, dtype=np.intc)
-        out_faces = out_faces + np.ones(out_faces.shape, dtype=np.intc)
-        out.write(np.c_[np.array([key] * N, dtype=np.intc), np.array(out_faces, dtype=np.intc)].tobytes())
+        if not isinstance(faces, np.ndarray):
+            faces = np.array([np.concatenate(face) for face in faces], dtype=np.intc)
+        _write_bobj_records(out, 4, faces.reshape((-1, 3, 3)) + np.intc(1))
 
 
 def export_mesh(mesh, filepath, urdf_path=None, dae_mesh_color=None):
@@ -334,78 +364,419 @@ def import_mars_mesh(filepath, urdf_path=None):
     return m
 
 
-def parse_obj(filepath):
+# Process-wide cache of the meshes loaded from files, keyed by the real path and the state of the file.
+# The cached meshes and mesh info dicts are shared between all users and must not be changed, use copy_mesh_data()
+# before editing them.
+MESH_CACHE_MAX_BYTES = 512 * 1024 ** 2
+_mesh_cache = OrderedDict()
+_mesh_cache_bytes = 0
+_mesh_cache_lock = threading.RLock()
+
+
+def _get_nbytes(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    elif trimesh is not None and isinstance(obj, trimesh.Trimesh):
+        return obj.vertices.nbytes + obj.faces.nbytes
+    elif trimesh is not None and isinstance(obj, trimesh.Scene):
+        return sum([_get_nbytes(g) for g in obj.geometry.values()])
+    elif isinstance(obj, dict):
+        return sum([_get_nbytes(v) for v in obj.values()])
+    elif isinstance(obj, (list, tuple)):
+        return sum([_get_nbytes(v) for v in obj])
+    return 0
+
+
+def get_mesh_cache_key(filepath):
+    """
+    Returns the key under which the mesh at filepath is cached, which changes whenever the file changes.
+    """
+    stat = os.stat(filepath)
+    return os.path.realpath(filepath), stat.st_mtime_ns, stat.st_size
+
+
+_file_hashes = {}
+
+
+def get_file_hash(filepath):
+    """
+    Returns the sha256 hex digest of the file's content, which is cached as long as the file doesn't change.
+    """
+    key = get_mesh_cache_key(filepath)
+    if key not in _file_hashes:
+        h = hashlib.sha256()
+        with open(filepath, "rb") as f:
+            for block in iter(lambda: f.read(1024 ** 2), b""):
+                h.update(block)
+        _file_hashes[key] = h.hexdigest()
+    return _file_hashes[key]
+
+
+def clear_mesh_cache():
+    global _mesh_cache_bytes
+    with _mesh_cache_lock:
+        _mesh_cache.clear()
+        _mesh_cache_bytes = 0
+        _mesh_headers.clear()
+
+
+def set_mesh_cache_size(max_bytes):
+    """
+    Sets the maximum size of the mesh cache in bytes, 0 disables the cache.
+    """
+    global MESH_CACHE_MAX_BYTES
+    MESH_CACHE_MAX_BYTES = max_bytes
+    _evict_mesh_cache()
+
+
+def _evict_mesh_cache():
+    global _mesh_cache_bytes
+    with _mesh_cache_lock:
+        while _mesh_cache_bytes > MESH_CACHE_MAX_BYTES and len(_mesh_cache) > 0:
+            _, (_, _, nbytes) = _mesh_cache.popitem(last=False)
+            _mesh_cache_bytes -= nbytes
+
+
+def _load_mesh_file(filepath, input_type):
+    mesh_info = None
+    if input_type == "file_bobj":
+        mesh_info = parse_bobj(filepath)
+        mesh = mesh_info_dict_2_trimesh(**mesh_info)
+    else:
+        mesh = import_mesh(filepath)
+    if input_type in ["file_obj", "file_mars_obj"]:
+        if isinstance(mesh, trimesh.Trimesh):
+            try:
+                mesh_info = parse_obj(filepath)
+            except Exception as e:
+                traceback.print_exc()
+                log.warning(f"{filepath} can't parse obj for bobj conversion.")
+        else:
+            log.debug(f"{filepath} can't be converted to bobj")
+    elif input_type == "file_dae":
+        log.warning("mesh_info dict can currently not perfectly be parsed from dae")
+        mesh_info = trimesh_2_mesh_info_dict(as_trimesh(mesh))
+    return mesh, mesh_info
+
+
+def load_mesh_file(filepath, input_type):
+    """
+    Loads the mesh and its mesh info dict (None if not available for this input_type) from the given file.
+    The results are cached process-wide, so that a file that is referenced by several meshes is only parsed once.
+
+    Args:
+        filepath: the path of the mesh file
+        input_type: the input_type of the representation.Mesh e.g. "file_obj"
+
+    Returns:
+        (mesh, mesh_info) which are shared and therefore read-only
+    """
+    global _mesh_cache_bytes
+    key = get_mesh_cache_key(filepath) + (input_type,)
+    with _mesh_cache_lock:
+        if key in _mesh_cache:
+            _mesh_cache.move_to_end(key)
+            return _mesh_cache[key][:2]
+    mesh, mesh_info = _load_mesh_file(filepath, input_type)
+    if mesh_info is not None:
+        for v in mesh_info.values():
+            if isinstance(v, np.ndarray):
+                v.flags.writeable = False
+    nbytes = _get_nbytes(mesh) + _get_nbytes(mesh_info)
+    with _mesh_cache_lock:
+        if key not in _mesh_cache and nbytes <= MESH_CACHE_MAX_BYTES:
+            _mesh_cache[key] = (mesh, mesh_info, nbytes)
+            _mesh_cache_bytes += nbytes
+            _evict_mesh_cache()
+    return mesh, mesh_info
+
+
+def copy_mesh_data(mesh, mesh_info):
+    """
+    Returns editable copies of a (shared) mesh and mesh info dict.
+    """
+    if mesh is not None and hasattr(mesh, "copy"):
+        mesh = mesh.copy()
+    if mesh_info is not None:
+        mesh_info = {k: np.array(v) if isinstance(v, np.ndarray) else deepcopy(v) for k, v in mesh_info.items()}
+    return mesh, mesh_info
+
+
+OBJ_PARSE_CHUNK_SIZE = 16 * 1024 ** 2
+_OBJ_VALUE_KEYS = {
+    b"vn": ("vertex_normals", 3),
+    b"vt": ("texture_coords", 2),
+    b"vp": ("points", 3),
+    b"v": ("vertices", 3),
+}
+_SPACE, _NEWLINE, _SLASH = ord(" "), ord("\n"), ord("/")
+
+
+def _iter_obj_chunks(filepath, chunk_size):
+    """
+    Reads the file in chunks of about chunk_size bytes, which contain only complete lines.
+    """
+    with open(filepath, "rb") as f:
+        rest = b""
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                if rest:
+                    yield rest + b"\n"
+                return
+            data = rest + data
+            cut = data.rfind(b"\n") + 1
+            rest = data[cut:]
+            if cut > 0:
+                yield data[:cut]
+
+
+def _get_line_ids(buf):
+    """
+    Returns the index of the line for each byte of buf, which has to end with a newline.
+    """
+    ends = np.flatnonzero(buf == _NEWLINE)
+    return np.repeat(np.arange(len(ends), dtype=np.int32), np.diff(ends, prepend=-1))
+
+
+def _tokens_per_line(buf, line_ids, n_lines):
+    """
+    Counts the whitespace separated tokens of each line of buf.
+    """
+    is_sep = (buf == _SPACE) | (buf == _NEWLINE)
+    token_start = ~is_sep & np.r_[True, is_sep[:-1]]
+    return np.bincount(line_ids[token_start], minlength=n_lines)
+
+
+def _parse_obj_faces(buf, n_lines):
+    """
+    Parses the face lines in buf (without their "f" prefix).
+
+    Returns:
+        (F, 3, 3) intc array if all faces are triangles, otherwise [F*[n*(3,)]] like the line-wise parser
+    """
+    double_slash = np.flatnonzero((buf[:-1] == _SLASH) & (buf[1:] == _SLASH))
+    if len(double_slash) > 0:
+        buf = np.insert(buf, double_slash + 1, ord("0"))
+    line_ids = _get_line_ids(buf)
+    corners = _tokens_per_line(buf, line_ids, n_lines)
+    slashes = np.bincount(line_ids[buf == _SLASH], minlength=n_lines)
+    if np.all(corners == 3) and (np.all(slashes == 6) or np.all(slashes == 0)):
+        values = np.where(buf == _SLASH, _SPACE, buf).astype(np.uint8).tobytes()
+        indices = np.fromstring(values, sep=" ", dtype=np.intc)
+        indices = indices.reshape((n_lines, 3, -1)) - np.intc(1)
+        # corners without texture and normal indices are broadcasted as by the line-wise parser
+        return np.ascontiguousarray(np.broadcast_to(indices, (n_lines, 3, 3)))
+    lines = buf.tobytes().decode().splitlines()
+    return [[_parse_obj_corner(corner) for corner in line.strip().split(" ")] for line in lines]
+
+
+def _parse_obj_corner(corner):
+    """
+    Parses the zero based vertex, texture and normal index of a face corner, a missing normal index becomes -1.
+    """
+    indices = np.fromstring(corner.strip(), sep="/", dtype=np.intc)
+    if len(indices) == 2:
+        # v/vt
+        indices = np.r_[indices, np.intc(0)]
+    return indices - np.ones(3, dtype=np.intc)
+
+
+def _parse_obj_chunk(chunk, values, faces):
+    """
+    Parses the values and faces of a chunk of complete obj lines and appends them to values and faces.
+    If faces is None the face lines are only counted and values only receives the keys it contains.
+
+    Returns:
+        the number of lines found for each key name
+    """
+    n_found = {}
+    buf = np.frombuffer(chunk, dtype=np.uint8).copy()
+    buf[(buf == ord("\t")) | (buf == ord("\r"))] = _SPACE
+    ends = np.flatnonzero(buf == _NEWLINE)
+    starts = np.r_[0, ends[:-1] + 1]
+    padded = np.r_[buf, _NEWLINE, _NEWLINE]
+    first, second, third = padded[starts], padded[starts + 1], padded[starts + 2]
+    line_of_byte = _get_line_ids(buf)
+    for key, (name, shape) in list(_OBJ_VALUE_KEYS.items()) + [(b"f", ("faces", None))]:
+        if len(key) == 1:
+            selected = (first == key[0]) & ((second == _SPACE) | (second == _NEWLINE))
+        else:
+            selected = (first == key[0]) & (second == key[1]) & ((third == _SPACE) | (third == _NEWLINE))
+        n_lines = np.count_nonzero(selected)
+        n_found[name] = n_lines
+        if n_lines == 0 or (name == "faces" and faces is None) or (name != "faces" and name not in values):
+            continue
+        # blank the key, so that only the values remain
+        for i in range(len(key)):
+            buf[starts[selected] + i] = _SPACE
+        key_buf = buf[selected[line_of_byte]]
+        if name == "faces":
+            faces.append(_parse_obj_faces(key_buf, n_lines))
+            continue
+        data = np.fromstring(key_buf.tobytes(), sep=" ", dtype=np.single)
+        if data.size != n_lines * shape:
+            counts = _tokens_per_line(key_buf, _get_line_ids(key_buf), n_lines)
+            if np.all(counts == counts[0]) and counts[0] >= shape:
+                # additional values e.g. vertex colors are skipped
+                data = data.reshape((n_lines, counts[0]))[:, :shape]
+        values[name].append(data.reshape((-1, shape)))
+    return n_found
+
+
+def parse_obj(filepath, chunk_size=None):
+    """
+    Parses the mesh_info_dict from an obj file. The file is processed in chunks of complete lines and all values of
+    a chunk are converted at once.
+
+    Args:
+        filepath: the filepath of the obj file
+        chunk_size: the number of bytes to process at once (default: OBJ_PARSE_CHUNK_SIZE)
+
+    Returns:
+        {"vertices": (n,3) single, "vertex_normals": (n,3) single, "texture_coords": (n,2) single,
+         "points": (n,3) single, "faces": (n,3,3) intc for triangle meshes, otherwise [n*[n*(3,)]] intc}
+    """
     # [Todo v2.1.0] make this more stable
     assert os.path.isfile(filepath)
-    # deal with material sections
-    keys = ["vn", "vt", "vp", "v", "f"]  # , "l"]
-    info_names = {"vn": "vertex_normals", "vt": "texture_coords", "vp": "points", "v": "vertices", "f": "faces", "l": "lines"}
-    shapes = {
-        "vn": 3,
-        "vt": 2,
-        "vp": 3,
-        "v": 3,
-    }
-    s_info = {k: [] for k in keys}
-    with open(filepath, "r") as f:
-        for line in f.readlines():
-            for key in keys:
-                if line.startswith(key):
-                    s_info[key].append(line[len(key):].strip())
+    if chunk_size is None:
+        chunk_size = OBJ_PARSE_CHUNK_SIZE
+    values = {name: [] for name, _ in _OBJ_VALUE_KEYS.values()}
+    faces = []
+    for chunk in _iter_obj_chunks(filepath, chunk_size):
+        _parse_obj_chunk(chunk, values, faces)
     n_info = {
-        info_names[k]: np.fromstring("\n".join(s_info[k]), sep=" ", dtype=np.single).reshape((-1, shapes[k]))
-        for k in shapes.keys()
+        name: np.concatenate(values[name]) if len(values[name]) > 0 else np.zeros((0, shape), dtype=np.single)
+        for name, shape in _OBJ_VALUE_KEYS.values()
     }
-    for key in [k for k in keys if k not in shapes.keys()]:
-        if key == "f":
-            n_info[info_names[key]] = [[np.fromstring(corner.strip().replace("//", "/0/"), sep="/", dtype=np.intc) - np.ones(3, dtype=np.intc) for corner in line.strip().split(" ")] for line in s_info[key]]
-        else:  # key == "l"
-            n_info[info_names[key]] = [np.fromstring(line.strip(), sep=" ", dtype=np.intc) for line in s_info[key]]
+    if len(faces) == 0:
+        n_info["faces"] = []
+    elif all([isinstance(f, np.ndarray) for f in faces]):
+        n_info["faces"] = np.concatenate(faces)
+    else:
+        n_info["faces"] = [list(face) if isinstance(f, np.ndarray) else face for f in faces for face in f]
     return n_info
 
 
-def parse_bobj(filepath):
+def parse_bobj(filepath, mmap=False):
     """
     Parses the mesh_info_dict from bobj format.
 
     Args:
         filepath: the filepath where to write the file
+        mmap: if True the file is memory mapped instead of read, the returned vertices, normals and texture
+            coordinates are then read-only views on the file
 
     Returns:
-        {"vertices": (n,3) single, "vertex_normals": (n,3) single, "faces": [n*[3*(n,3)]] intc, ["texture_coords": (n,2) single]}
+        {"vertices": (n,3) single, "vertex_normals": (n,3) single, "faces": (n,3,3) intc, ["texture_coords": (n,2) single]}
     """
     assert os.path.isfile(filepath)
-    shapes = {
-        "vertex_normals": 3,
-        "texture_coords": 2,
-        "vertices": 3,
-        "faces": (3, 3)
-    }
-    info_names = ["vertices", "texture_coords", "vertex_normals", "faces"]
-    info_dict = {}
-    with open(filepath, "rb") as f:
-        chunk = f.read(4)
-        while chunk is not None and len(chunk) > 0:
-            i_key = struct.unpack("i", chunk)[0]
-            s_key = info_names[i_key-1]
-            if i_key-1 in range(3):
-                if s_key not in info_dict:
-                    info_dict[s_key] = np.frombuffer(f.read(shapes[s_key]*4), dtype=np.single)
-                else:
-                    info_dict[s_key] = np.vstack([info_dict[s_key], np.frombuffer(f.read(shapes[s_key]*4), dtype=np.single)])
-            elif i_key == 4:  # faces
-                if s_key not in info_dict:
-                    info_dict[s_key] = []
-                info_dict[s_key].append([np.frombuffer(f.read(shapes[s_key][0]*4), dtype=np.intc) - np.ones(3, dtype=np.intc) for _ in range(3)])
-            else:
-                raise IOError("Unknown bobj format!")
-            chunk = f.read(4)
-    for i_key in range(3):
-        if info_names[i_key] in info_dict:
-            info_dict[info_names[i_key]] = info_dict[info_names[i_key]].reshape((-1, shapes[info_names[i_key]]))
+    if mmap:
+        words = np.memmap(filepath, dtype=np.intc, mode="r")
+    else:
+        words = np.fromfile(filepath, dtype=np.intc)
+    blocks = {}
+    i = 0
+    while i < len(words):
+        key = int(words[i])
+        if key not in _BOBJ_RECORDS:
+            raise IOError("Unknown bobj format!")
+        name, dtype = _BOBJ_RECORDS[key]
+        n = _count_bobj_records(words, i, key)
+        if n == 0:
+            raise IOError("Unexpected end of bobj file!")
+        end = i + n * dtype.itemsize // words.itemsize
+        blocks.setdefault(name, []).append(words[i:end].view(dtype)["values"])
+        i = end
+    info_dict = {name: values[0] if len(values) == 1 else np.concatenate(values) for name, values in blocks.items()}
+    if "faces" in info_dict:
+        info_dict["faces"] = info_dict["faces"] - np.intc(1)
     return info_dict
 
 
+_STL_RECORD = np.dtype([("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)), ("attributes", "<u2")])
+_STL_ASCII_VERTEX = re.compile(rb"vertex\s+(\S+)\s+(\S+)\s+(\S+)")
+_mesh_headers = {}
+
+
+def _get_bounds(vertices):
+    if vertices is None or len(vertices) == 0:
+        return None
+    vertices = np.asarray(vertices).reshape((-1, 3))
+    return np.array([vertices.min(axis=0), vertices.max(axis=0)], dtype=np.float64)
+
+
+def _read_stl_header(filepath):
+    size = os.path.getsize(filepath)
+    with open(filepath, "rb") as f:
+        head = f.read(84)
+    n_faces = int(np.frombuffer(head[80:84], dtype="<u4")[0]) if len(head) == 84 else -1
+    if size == 84 + n_faces * _STL_RECORD.itemsize:
+        records = np.memmap(filepath, dtype=_STL_RECORD, mode="r", offset=84, shape=(n_faces,)) if n_faces > 0 else \
+            np.zeros(0, dtype=_STL_RECORD)
+        return _get_bounds(records["vertices"]), 3 * n_faces, n_faces
+    with open(filepath, "rb") as f:
+        vertices = np.array(_STL_ASCII_VERTEX.findall(f.read()), dtype=np.float64)
+    return _get_bounds(vertices), len(vertices), len(vertices) // 3
+
+
+def _read_obj_header(filepath):
+    values = {"vertices": []}
+    n_faces = 0
+    for chunk in _iter_obj_chunks(filepath, OBJ_PARSE_CHUNK_SIZE):
+        n_faces += _parse_obj_chunk(chunk, values, None).get("faces", 0)
+    vertices = np.concatenate(values["vertices"]) if len(values["vertices"]) > 0 else None
+    return _get_bounds(vertices), 0 if vertices is None else len(vertices), n_faces
+
+
+def _read_bobj_header(filepath):
+    mesh_info = parse_bobj(filepath, mmap=True)
+    return _get_bounds(mesh_info.get("vertices", None)), len(mesh_info.get("vertices", [])), \
+        len(mesh_info.get("faces", []))
+
+
+def read_mesh_header(filepath, input_type=None):
+    """
+    Reads the bounds, the vertex and face count and the hash of a mesh file without loading the mesh.
+    For stl files these are read from the binary records or the vertex lines, for obj files only the vertex lines
+    are parsed and the faces are counted, bobj files are memory mapped.
+    The header is cached as long as the file doesn't change.
+
+    Args:
+        filepath: the path of the mesh file
+        input_type: the input_type of the representation.Mesh e.g. "file_obj" (default: derived from the extension)
+
+    Returns:
+        {"bounds": (2,3) float or None, "n_vertices": int or None, "n_faces": int or None, "hash": str}
+        bounds, n_vertices and n_faces are None for formats whose header can't be read cheaply (e.g. dae).
+        n_vertices counts the vertices as stored in the file, i.e. three per face for stl files.
+    """
+    if input_type is None:
+        input_type = "file_" + os.path.splitext(filepath)[1][1:].lower()
+    key = get_mesh_cache_key(filepath) + (input_type,)
+    if key not in _mesh_headers:
+        bounds, n_vertices, n_faces = None, None, None
+        try:
+            if input_type == "file_stl":
+                bounds, n_vertices, n_faces = _read_stl_header(filepath)
+            elif input_type in ["file_obj", "file_mars_obj"]:
+                bounds, n_vertices, n_faces = _read_obj_header(filepath)
+            elif input_type == "file_bobj":
+                bounds, n_vertices, n_faces = _read_bobj_header(filepath)
+        except (IOError, ValueError) as e:
+            log.warning(f"Couldn't read the header of {filepath}: {e}")
+            bounds, n_vertices, n_faces = None, None, None
+        if bounds is not None:
+            bounds.setflags(write=False)
+        _mesh_headers[key] = {
+            "bounds": bounds,
+            "n_vertices": n_vertices,
+            "n_faces": n_faces,
+            "hash": get_file_hash(filepath)
+        }
+    return dict(_mesh_headers[key])
+
+
 def parse_dae(filepath):
     # [TODO v2.1.0]
     log.warning("mesh_info dict can currently not perfectly be parsed from dae")
@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import os
+import weakref
 
 import numpy as np
 
@@ -42,7 +43,8 @@ def generate_kccd_optimizer_ready_collision(robot, linkname, outputdir, join_fir
         out = []
         parent = robot.get_link(parent)
         for visual in parent.visuals:
-            m = io.as_trimesh(visual.geometry.load_mesh(), silent=True)
+            # the loaded mesh may be shared with other meshes, therefore we transform a copy
+            m = io.as_trimesh(visual.geometry.load_mesh(), silent=True).copy()
             m.apply_transform(visual.origin.to_matrix())
             m.apply_transform(transform)
             if not join_first:
@@ -84,28 +86,157 @@ def generate_kccd_optimizer_ready_collision(robot, linkname, outputdir, join_fir
         ))
 
 
-def find_zero_pose_collisions(robot):
-    coll_mgr = trimesh.collision.CollisionManager()
-    for link in robot.links:
-        T = robot.get_transformation(link.name)
-        for coll in link.collisions:
-            if isinstance(coll.geometry, representation.Mesh):
-                mesh = coll.geometry.load_mesh()
-                if not isinstance(mesh, trimesh.Trimesh) and not isinstance(mesh, trimesh.Scene):
-                    mesh = io.as_trimesh(mesh)
-                mesh = mesh.convex_hull
-            elif isinstance(coll.geometry, representation.Box):
-                mesh = trimesh.creation.box(coll.geometry.size)
-            elif isinstance(coll.geometry, representation.Sphere):
-                mesh = trimesh.creation.icosphere(4, coll.geometry.radius)
-            elif isinstance(coll.geometry, representation.Cylinder):
-                mesh = trimesh.creation.cylinder(coll.geometry.radius, coll.geometry.length)
+class CollisionScene(object):
+    """
+    Persistent broad-phase collision scene of the collisions of a robot.
+    The collision meshes (convex hulls and primitive meshes) are created once and cached by geometry, between poses
+    only the transformations of the collision objects are updated.
+    Use get_collision_scene(robot) to get the scene that is kept for a robot.
+    The scene references the robot and its collisions only weakly, as the collisions reference the robot themselves,
+    so that the scene doesn't keep the robot alive.
+    """
+
+    def __init__(self, robot):
+        self._robot = weakref.ref(robot)
+        self._manager = None
+        # id(geometry) -> (weakref to geometry, key, mesh) for meshes, key -> mesh for primitives
+        self._mesh_cache = {}
+        self._primitive_cache = {}
+        # collision name -> (link name, weakref to collision, key)
+        self._objects = {}
+
+    @property
+    def robot(self):
+        robot = self._robot()
+        assert robot is not None, "The robot of this collision scene doesn't exist anymore"
+        return robot
+
+    @staticmethod
+    def _get_primitive_key(geometry):
+        if isinstance(geometry, representation.Box):
+            return "box", tuple(geometry.size)
+        elif isinstance(geometry, representation.Sphere):
+            return "sphere", geometry.radius
+        elif isinstance(geometry, representation.Cylinder):
+            return "cylinder", geometry.radius, geometry.length
+        raise TypeError("Geometry type not known!")
+
+    def _get_collision_mesh(self, geometry):
+        """
+        Returns the key and the mesh (the convex hull for meshes) that is used for the collision checks of geometry.
+        """
+        if isinstance(geometry, representation.Mesh):
+            mesh = geometry.load_mesh()
+            key = (id(geometry), id(mesh), len(geometry._operations))
+            cached = self._mesh_cache.get(id(geometry), None)
+            if cached is not None and cached[0]() is geometry and cached[1] == key:
+                return key, cached[2]
+            if not isinstance(mesh, trimesh.Trimesh) and not isinstance(mesh, trimesh.Scene):
+                mesh = io.as_trimesh(mesh)
+            mesh = mesh.convex_hull
+            self._mesh_cache[id(geometry)] = (weakref.ref(geometry), key, mesh)
+            return key, mesh
+        key = self._get_primitive_key(geometry)
+        if key not in self._primitive_cache:
+            if key[0] == "box":
+                self._primitive_cache[key] = trimesh.creation.box(geometry.size)
+            elif key[0] == "sphere":
+                self._primitive_cache[key] = trimesh.creation.icosphere(4, geometry.radius)
             else:
-                raise TypeError("Geometry type not known!")
-            mesh.apply_transform(T.dot(coll.origin.to_matrix()))
-            coll_mgr.add_object(coll.name, mesh)
-    colls_exist, zero_pose_colls = coll_mgr.in_collision_internal(return_names=True)
-    return zero_pose_colls if colls_exist else None
+                self._primitive_cache[key] = trimesh.creation.cylinder(geometry.radius, geometry.length)
+        return key, self._primitive_cache[key]
+
+    def update(self):
+        """
+        Synchronizes the scene with the collisions of the robot.
+        Only collisions that were added, removed or whose geometry changed are (re-)added to the collision manager.
+        """
+        if self._manager is None:
+            self._manager = trimesh.collision.CollisionManager()
+        present = set()
+        for link in self.robot.links:
+            for coll in link.collisions:
+                key, mesh = self._get_collision_mesh(coll.geometry)
+                present.add(coll.name)
+                existing = self._objects.get(coll.name, None)
+                if existing is not None and existing[1]() is coll and existing[2] == key:
+                    if existing[0] != link.name:
+                        self._objects[coll.name] = (link.name, existing[1], key)
+                    continue
+                if existing is not None:
+                    self._manager.remove_object(coll.name)
+                self._manager.add_object(coll.name, mesh)
+                self._objects[coll.name] = (link.name, weakref.ref(coll), key)
+        for name in [n for n in self._objects if n not in present]:
+            self._manager.remove_object(name)
+            self._objects.pop(name)
+        used = set(o[2] for o in self._objects.values())
+        for key in [k for k, v in self._mesh_cache.items() if v[1] not in used]:
+            self._mesh_cache.pop(key)
+
+    def set_link_transformations(self, link_transformations):
+        """
+        Moves all collision objects to the given link poses.
+        Args:
+            link_transformations: dict that maps link names to their (4, 4) transformation
+        """
+        for name, (link_name, coll, _) in self._objects.items():
+            self._manager.set_transform(name, link_transformations[link_name].dot(coll().origin.to_matrix()))
+
+    def get_collisions(self):
+        """
+        Returns the set of pairs of collision names that are in collision in the current pose of the scene.
+        """
+        colls_exist, colls = self._manager.in_collision_internal(return_names=True)
+        return colls if colls_exist else set()
+
+    def get_zero_pose_collisions(self):
+        """
+        Returns the set of pairs of collision names that are in collision when all joints are in zero position.
+        """
+        self.update()
+        link_names = [link.name for link in self.robot.links]
+        self.set_link_transformations(
+            dict(zip(link_names, self.robot.get_transformations(link_names, end_type="link")))
+        )
+        return self.get_collisions()
+
+    def get_self_collisions(self, joint_positions, joint_names=None):
+        """
+        Evaluates the self collisions for a batch of joint configurations.
+        Args:
+            joint_positions: array of shape (B, n_joints) or (n_joints,) with the joint positions
+            joint_names: the joint names corresponding to the columns of joint_positions (default: get_fk_joint_names())
+        Returns:
+            dict: maps the pairs of collision names that collided to the number of configurations they collided in
+        """
+        self.update()
+        link_names, transformations = self.robot.get_forward_kinematics(joint_positions, joint_names=joint_names)
+        if transformations.ndim == 3:
+            transformations = transformations[None]
+        counts = {}
+        for T in transformations:
+            self.set_link_transformations(dict(zip(link_names, T)))
+            for pair in self.get_collisions():
+                counts[pair] = counts.get(pair, 0) + 1
+        return counts
+
+
+_collision_scenes = weakref.WeakKeyDictionary()
+
+
+def get_collision_scene(robot):
+    """
+    Returns the persistent CollisionScene of the robot, which is created on first use.
+    """
+    if robot not in _collision_scenes:
+        _collision_scenes[robot] = CollisionScene(robot)
+    return _collision_scenes[robot]
+
+
+def find_zero_pose_collisions(robot):
+    zero_pose_colls = get_collision_scene(robot).get_zero_pose_collisions()
+    return zero_pose_colls if len(zero_pose_colls) > 0 else None
 
 
 def replace_geometry(element, shape='box', oriented=False, scale=1.0, apply_primitives=False):
@@ -134,13 +265,20 @@ def replace_geometry(element, shape='box', oriented=False, scale=1.0, apply_prim
         element.geometry.scale = scale
         element.origin = representation.Pose.from_matrix(np.identity(4), relative_to=element.link)
     elif shape in ["sphere", "cylinder", "box"]:
-        mesh = io.as_trimesh(element.geometry.load_mesh(), silent=True)
-        if shape == 'sphere':
-            geo, transform = geometry.create_sphere(mesh, scale=scale)
-        elif shape == 'cylinder':
-            geo, transform = geometry.create_cylinder(mesh, scale=scale)
-        elif shape == 'box':
-            geo, transform = geometry.create_box(mesh, oriented=oriented, scale=scale)
+        if shape == 'box' and not oriented and element.geometry.lazy and element.geometry.mesh_object is None:
+            # the axis aligned box of a lazy mesh is taken from the header of its file without loading it
+            bounds = element.geometry.bounds * np.array(scale)
+            geo = representation.Box(size=(bounds[1] - bounds[0]).tolist(), origin=None)
+            transform = np.identity(4)
+            transform[0:3, 3] = np.average(bounds, axis=0)
+        else:
+            mesh = io.as_trimesh(element.geometry.load_mesh(), silent=True)
+            if shape == 'sphere':
+                geo, transform = geometry.create_sphere(mesh, scale=scale)
+            elif shape == 'cylinder':
+                geo, transform = geometry.create_cylinder(mesh, scale=scale)
+            elif shape == 'box':
+                geo, transform = geometry.create_box(mesh, oriented=oriented, scale=scale)
         new_origin = representation.Pose.from_matrix(np.array(element.origin.to_matrix()).dot(np.array(transform)), relative_to=element.link)
         if not apply_primitives:
             geo.origin = new_origin
@@ -174,7 +312,7 @@ def join_collisions(robot, linkname, collisionnames=None, name_id=None, only_ret
         if e.primitives:
             primitives += e.primitives
         if e.geometry is not None:
-            mesh = io.as_trimesh(e.geometry.load_mesh(), silent=True)
+            mesh = io.as_trimesh(e.geometry.load_mesh(), silent=True).copy()
             name = e.name
             if name.lower().startswith("collision_"):
                 name = name[len("collision_"):]
@@ -151,11 +151,12 @@ class Linkable(object):
             #             if isinstance(v, Linkable):
             #                 v.link_with_robot(robot, check_linkage_later=True)
         for var in self._class_variables:
-            if isinstance(getattr(self, var), Linkable):
-                # log.debug(f"Linking {var} of class {self.__class__} with id {id(getattr(self, var))}")
-                getattr(self, var).link_with_robot(robot, check_linkage_later=True)
-            elif isinstance(getattr(self, var), list):
-                for v in getattr(self, var):
+            value = getattr(self, var)
+            if isinstance(value, Linkable):
+                # log.debug(f"Linking {var} of class {self.__class__} with id {id(value)}")
+                value.link_with_robot(robot, check_linkage_later=True)
+            elif isinstance(value, list):
+                for v in value:
                     if isinstance(v, Linkable):
                         v.link_with_robot(robot, check_linkage_later=True)
         if not check_linkage_later:
@@ -175,10 +176,11 @@ class Linkable(object):
             self._attr_set_name(attribute, self._attr_get_name(attribute))
             assert type(getattr(self, "_"+attribute)) in [str, list, type(None)], attribute+" "+str(getattr(self, "_"+attribute))+str(type(getattr(self, "_"+attribute)))
         for var in self._class_variables:
-            if isinstance(getattr(self, var), Linkable):
-                getattr(self, var).unlink_from_robot(check_linkage_later=True)
-            elif isinstance(getattr(self, var), list):
-                for v in getattr(self, var):
+            value = getattr(self, var)
+            if isinstance(value, Linkable):
+                value.unlink_from_robot(check_linkage_later=True)
+            elif isinstance(value, list):
+                for v in value:
                     if isinstance(v, Linkable):
                         v.unlink_from_robot(check_linkage_later=True)
         if not check_linkage_later:
@@ -200,10 +202,11 @@ class Linkable(object):
             _class_attributes = [var for var in self._class_linkables if var == attribute]
         else:
             for var in self._class_variables:
-                if isinstance(getattr(self, var), Linkable):
-                    linked &= getattr(self, var).check_linkage()
-                elif isinstance(getattr(self, var), list):
-                    for v in getattr(self, var):
+                value = getattr(self, var)
+                if isinstance(value, Linkable):
+                    linked &= value.check_linkage()
+                elif isinstance(value, list):
+                    for v in value:
                         if isinstance(v, Linkable):
                             linked &= v.check_linkage()
                 assert linked, f"Variable {var} of {type(self)} {str(self) if self.stringable() else repr(self)} is not linked."
@@ -242,10 +245,11 @@ class Linkable(object):
             _class_attributes = [var for var in self._class_linkables if var == attribute]
         else:
             for var in self._class_variables:
-                if isinstance(getattr(self, var), Linkable):
-                    unlinked &= getattr(self, var).check_unlinkage()
-                elif isinstance(getattr(self, var), list):
-                    for v in getattr(self, var):
+                value = getattr(self, var)
+                if isinstance(value, Linkable):
+                    unlinked &= value.check_unlinkage()
+                elif isinstance(value, list):
+                    for v in value:
                         if isinstance(v, Linkable):
                             unlinked &= v.check_unlinkage()
         for attribute in _class_attributes:
@@ -370,6 +374,12 @@ class Representation(Linkable):
         except KeyError:
             raise LookupError(f"Class {self.__class__.__name__} has no xml format defined for dialect '{dialect}'")
 
+    def write_xml(self, f, dialect, **kwargs):
+        try:
+            return self.factory[dialect].write_xml(self, f, **kwargs)
+        except KeyError:
+            raise LookupError(f"Class {self.__class__.__name__} has no xml format defined for dialect '{dialect}'")
+
     def sort_string(self, dialect=None) -> str:
         prefix = type(self).__name__ if dialect is None else self.to_xml(dialect).tag
         if hasattr(self, "name"):
@@ -1,4 +1,5 @@
 import os
+import time
 from xml.etree import ElementTree as ET
 
 from .xmlrobot import XMLRobot
@@ -7,20 +8,89 @@ from ..common.commandline_logging import get_logger
 log = get_logger(__name__)
 
 
-def parse_xml(xml):
+def _iterparse_xml(xml_file, file_type, timings, **robot_kwargs):
+    """
+    Creates the robot while parsing the file: each child element of the robot is converted to its representation as
+    soon as it has been parsed and is removed from the tree afterwards.
+
+    Returns:
+        the XMLRobot or None if the file has to be parsed as a whole (e.g. sdf files with several models)
+    """
+    robot_xml = None
+    robot_depth = None
+    definition = None
+    root_tag = None
+    depth = 0
+    construct = 0.0
+    start = time.perf_counter()
+    for event, elem in ET.iterparse(xml_file, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            if depth == 1:
+                root_tag = elem.tag
+                if root_tag not in ["robot", "model", "sdf"] or (file_type == "urdf" and root_tag != "robot"):
+                    return None
+            if (depth == 1 and root_tag in ["robot", "model"]) or (depth == 2 and root_tag == "sdf" and elem.tag == "model"):
+                if robot_xml is not None:
+                    log.debug(f"Found multiple models in {xml_file}")
+                    return None
+                robot_xml = elem
+                robot_depth = depth
+                definition = XMLRobot.factory["urdf" if elem.tag == "robot" else "sdf"]
+                kwargs = definition.kwargs_from_xml_attributes(robot_xml, _xmlfile=xml_file, **robot_kwargs)
+            continue
+        if robot_xml is not None and depth == robot_depth + 1:
+            t = time.perf_counter()
+            definition.add_child_kwargs_from_xml(elem, robot_xml, kwargs)
+            construct += time.perf_counter() - t
+            robot_xml.remove(elem)
+        depth -= 1
+    if robot_xml is None:
+        return None
+    t = time.perf_counter()
+    robot = XMLRobot.create(**kwargs)
+    construct += time.perf_counter() - t
+    timings["parse"] = time.perf_counter() - start - construct
+    timings["construct"] = construct
+    return robot
+
+
+def parse_xml(xml, link_entities=True, timings=None):
+    """
+    Parses the robot from an urdf/sdf file, an xml string or an xml element.
+
+    Args:
+        xml: the path to the file, the xml string or an ElementTree/Element
+        link_entities: if False the entities of the returned robot are not linked with it, which is left to the
+            caller that does this in one pass e.g. after taking them over (see SMURFRobot)
+        timings: a dict that will be filled with the seconds needed for the phases "parse" and "construct"
+
+    Returns:
+        the XMLRobot or a list of XMLRobots for sdfs with several models
+    """
     xml_root = None
     file_type = None
     xml_file = None
+    if timings is None:
+        timings = {}
     log.debug(f"Parsing {xml}")
+    start = time.perf_counter()
     if type(xml) == str:
         if os.path.isfile(xml):
             xml_file = xml
-            with open(xml, "r") as f:
-                xml_string = f.read()
             if xml.upper().endswith("SDF"):
                 file_type = "sdf"
             elif xml.upper().endswith("URDF"):
                 file_type = "urdf"
+            try:
+                robot = _iterparse_xml(xml_file, file_type, timings, _defer_linkage=not link_entities)
+            except ET.ParseError as e:
+                log.error(f"Tried to parse:\n  {xml}")
+                raise IOError("Could not parse xml. See above for more info what was tried to parse! Error:" + e.msg)
+            if robot is not None:
+                return robot
+            with open(xml, "r") as f:
+                xml_string = f.read()
         else:
             xml_string = xml
         try:
@@ -34,18 +104,23 @@ def parse_xml(xml):
         xml_root = xml
     else:
         raise ValueError("Couldn't parse xml value of type" + repr(type(xml)))
+    timings["parse"] = time.perf_counter() - start
+    start = time.perf_counter()
     if file_type is None or file_type == "sdf":
         if xml_root.tag == "sdf":
             file_type = "sdf"
             if len(xml_root.findall("./model")) > 1:
                 log.warning("Multiple robots detected in this sdf!")
-                return [XMLRobot.from_xml(x, dialect=file_type, _xmlfile=xml_file) for x in xml_root.findall("./model")]
+                out = [XMLRobot.from_xml(x, dialect=file_type, _xmlfile=xml_file, _defer_linkage=not link_entities)
+                       for x in xml_root.findall("./model")]
+                timings["construct"] = time.perf_counter() - start
+                return out
             else:
                 xml_root = xml_root.findall("./model")[0]
         elif xml_root.tag == "model":
             file_type = "sdf"
         elif xml_root.tag == "robot":
             file_type = "urdf"
-    return XMLRobot.from_xml(xml_root, dialect=file_type, _xmlfile=xml_file)
-
-
+    out = XMLRobot.from_xml(xml_root, dialect=file_type, _xmlfile=xml_file, _defer_linkage=not link_entities)
+    timings["construct"] = time.perf_counter() - start
+    return out
@@ -1,3 +1,4 @@
+import hashlib
 import json
 import math
 import os
@@ -8,6 +9,7 @@ from xml.etree import ElementTree as ET
 import numpy
 import numpy as np
 import traceback
+from contextlib import contextmanager
 
 # Lazy import trimesh - it's an optional dependency
 trimesh = None
@@ -22,7 +24,7 @@ from .xml_factory import singular as _singular, plural as _plural
 from .yaml_reflection import to_yaml
 from ..common.defs import BPY_AVAILABLE
 from ..geometry import io as mesh_io
-from ..geometry.geometry import identical, reduce_mesh, get_reflection_matrix, improve_mesh, create_box
+from ..geometry.geometry import identical, reduce_mesh, get_reflection_matrix, improve_mesh
 from ..utils import misc, git, transform
 from ..utils.transform import inv
 from ..utils.xml import read_relative_filename
@@ -48,6 +50,28 @@ if BPY_AVAILABLE:
 from ..common.commandline_logging import get_logger
 log = get_logger(__name__)
 
+# whether meshes are created lazily by default (see lazy_mesh_loading())
+_lazy_meshes = False
+
+
+@contextmanager
+def lazy_mesh_loading(lazy=True):
+    """
+    Meshes created from files inside this context are lazy, i.e. they don't look up the git info of their input file
+    and answer Mesh.header and Mesh.extent from the file header until their geometry is loaded on first access.
+    """
+    global _lazy_meshes
+    previous = _lazy_meshes
+    _lazy_meshes = lazy
+    try:
+        yield
+    finally:
+        _lazy_meshes = previous
+
+
+# fingerprint -> path of the last file exported with this fingerprint by this process (see Mesh.provide_mesh_file)
+_exported_fingerprints = {}
+
 # Helper functions for trimesh type checking when trimesh might not be available
 def _is_trimesh(obj):
     """Check if obj is a trimesh.Trimesh instance, returns False if trimesh not available."""
@@ -62,6 +86,43 @@ def _is_trimesh_or_scene(obj):
     return trimesh is not None and (isinstance(obj, trimesh.Trimesh) or isinstance(obj, trimesh.Scene))
 
 
+# incremented on every edit of a watched origin or inertial (see _EditTracked)
+_edit_version = 0
+
+
+def get_edit_version():
+    """
+    Returns the number of edits of watched origins and inertials so far. As long as it is unchanged, none of the
+    watched instances has been edited and the values that have been computed from them are still valid.
+    """
+    return _edit_version
+
+
+def watch_edits(*instances):
+    """
+    Lets the edits of the given origins, inertials, links and joints increment the edit version from now on.
+    None is ignored.
+    """
+    for instance in instances:
+        if instance is not None:
+            instance._watched = True
+
+
+class _EditTracked(object):
+    """
+    Mixin for the representations whose values the robot caches. Once an instance is watched (see watch_edits()),
+    changing one of its _tracked_attributes increments the edit version.
+    """
+    _tracked_attributes = ()
+    _watched = False
+
+    def __setattr__(self, key, value):
+        if self._watched and key in self._tracked_attributes and self.__dict__.get(key, None) is not value:
+            global _edit_version
+            _edit_version += 1
+        super().__setattr__(key, value)
+
+
 def _joint_relative_origin_getter(instance):
     assert instance._related_robot_instance is not None
     assert instance.origin is not None
@@ -97,8 +158,12 @@ def _joint_relative_origin_setter(instance, value):
 __IMPORTS__ = [x for x in dir() if not x.startswith("__")]
 
 
-class Pose(Representation, SmurfBase):
-    _class_variables = ["xyz", "rpy", "relative_to"]
+class Pose(_EditTracked, Representation, SmurfBase):
+    # xyz and rpy are not scanned for linkables, as they are computed from the matrix on every access
+    _class_variables = ["relative_to"]
+    # Incremented on every change of the matrix, used by the robot to validate its cached transformations
+    _version = 0
+    _tracked_attributes = ("_version", "_matrix", "_relative_to")
 
     def __init__(self, xyz=None, rpy=None, vec=None, relative_to=None, **kwargs):
         Representation.__init__(self)
@@ -182,6 +247,7 @@ class Pose(Representation, SmurfBase):
             self._matrix[0:3, 0:3] = numpy.identity(3)
         else:
             raise ValueError("Can't parse rotation " + str(value))
+        self._version += 1
         # if we have an pi or pi/2, pi/4 approximation let's make pi or pi/2, pi/4 out of it
         # [TODO v2.1.0] re-establish this
         # for i in range(3):
@@ -219,6 +285,7 @@ class Pose(Representation, SmurfBase):
             if isinstance(value, dict):
                 value = [value['x'], value['y'], value['z']]
             self._matrix[0:3, 3] = np.array(value)
+        self._version += 1
 
     def from_vec(self, vec):
         assert len(vec) == 6, "Invalid length"
@@ -547,15 +614,19 @@ class Mesh(Representation, SmurfBase):
     _class_variables = ["material"]
 
     def __init__(self, filepath=None, posix_path=None, scale=None, mesh=None, meshname=None, material=None,
-                 mesh_orientation=None, fast_init=False, **kwargs):
+                 mesh_orientation=None, fast_init=False, lazy=None, **kwargs):
         filepath = misc.sys_path(filepath if posix_path is None else posix_path)
         SmurfBase.__init__(self, geometry_type="mesh", returns=["scale", "exported", "unique_name", "imported", "geometry_type"])
+        self._lazy = _lazy_meshes if lazy is None else lazy
+        self._imported = None
         self._operations = []
         self._scale = [1.0, 1.0, 1.0]
         if scale is not None and scale != self.scale:
             self.scale = scale
         self._changed = False
         self._info_in_sync = True
+        # whether mesh_object and _mesh_information are shared with the process-wide mesh cache
+        self._mesh_data_shared = False
         self.material = material
         if mesh is not None:
             if meshname is None or type(meshname) != str:
@@ -614,27 +685,64 @@ class Mesh(Representation, SmurfBase):
                 "forward": "Y" if not mars_mesh else "-Z"
             } if mesh_orientation is None else mesh_orientation
         self._exported = {}
-        if self.input_file is not None:
-            self.imported = {
-                "filepath": self.input_file
-            }
-            git_root = git.get_root(os.path.dirname(self.input_file))
-            if git_root is not None:
-                try:
-                    _, _, url = git.get_repo_data(git_root)
-                    self.imported = {
-                        "remote": url,
-                        "commit": git.revision(git_root),
-                        "filepath": os.path.relpath(self.input_file, git_root)
-                    }
-                except:
-                    pass
-        else:
+        if self.input_file is None:
             self.imported = "input file not known"
+        elif not self._lazy:
+            self.imported = self._get_imported_info()
         self.history = [f"Instantiated with filepath={filepath}->{self.input_file}, scale={scale}, mesh={mesh}, meshname={meshname}, "
                         f"material={material}, mesh_orientation={mesh_orientation}"]
         self.excludes += ["history", "input_type", "input_file", "original_mesh_name", "mesh_object"]
 
+    def _get_imported_info(self):
+        out = {
+            "filepath": self.input_file
+        }
+        git_root = git.get_root(os.path.dirname(self.input_file))
+        if git_root is not None:
+            try:
+                _, _, url = git.get_repo_data(git_root)
+                out = {
+                    "remote": url,
+                    "commit": git.revision(git_root),
+                    "filepath": os.path.relpath(self.input_file, git_root)
+                }
+            except:
+                pass
+        return out
+
+    @property
+    def imported(self):
+        if self._imported is None and self.input_file is not None:
+            self._imported = self._get_imported_info()
+        return self._imported
+
+    @imported.setter
+    def imported(self, value):
+        self._imported = value
+
+    @property
+    def lazy(self):
+        return self._lazy
+
+    @property
+    def header(self):
+        """
+        The bounds, the vertex and face count and the hash of the input file of this mesh.
+        As long as a lazy mesh hasn't been loaded, these are read from the file header (see mesh_io.read_mesh_header()),
+        otherwise they are taken from the loaded mesh.
+        """
+        out = {"bounds": None, "n_vertices": None, "n_faces": None, "hash": None}
+        if self.input_file is not None and os.path.isfile(self.input_file):
+            if self._mesh_object is None:
+                return mesh_io.read_mesh_header(self.input_file, self.input_type)
+            out["hash"] = mesh_io.get_file_hash(self.input_file)
+        mesh = mesh_io.as_trimesh(self._mesh_object, silent=True) if self._mesh_object is not None else None
+        if mesh is not None:
+            out["bounds"] = np.array(mesh.bounds, dtype=np.float64)
+            out["n_vertices"] = len(mesh.vertices)
+            out["n_faces"] = len(mesh.faces)
+        return out
+
     @property
     def mesh_object(self):
         return self._mesh_object
@@ -648,6 +756,7 @@ class Mesh(Representation, SmurfBase):
         self._info_in_sync = False
         self._mesh_object = value
         self._mesh_information = None
+        self._mesh_data_shared = False
 
     def stringable(self):
         # [TODO v2.1.0]
@@ -804,7 +913,8 @@ class Mesh(Representation, SmurfBase):
         self.load_mesh()
         mesh = mesh_io.as_trimesh(self.mesh_object, silent=True)
         if not mesh.is_volume:
-            mesh = improve_mesh(mesh)
+            # improve a copy, as the mesh object might be shared with other meshes via the mesh cache
+            mesh = improve_mesh(mesh.copy())
         if mesh.is_volume:
             return mesh.volume, mesh.center_mass
         else:
@@ -874,14 +984,8 @@ class Mesh(Representation, SmurfBase):
                 # with obj file import, blender only turns the object, not the vertices,
                 # leaving a rotation in the matrix_basis, which we here get rid of
                 bpy.ops.object.transform_apply(rotation=True)
-                if _is_trimesh(mesh_io.import_mesh(self.input_file)):
-                    try:
-                        self._mesh_information = mesh_io.parse_obj(self.input_file)
-                    except Exception as e:
-                        traceback.print_exc()
-                        log.warning(f"{self.input_file} can't parse obj for bobj conversion.")
-                else:
-                    log.debug(f"{self.input_file} can't be converted to bobj")
+                _, self._mesh_information = mesh_io.load_mesh_file(self.input_file, self.input_type)
+                self._mesh_data_shared = True
                 bpy.ops.object.delete()
             elif self.input_type == "file_dae":
                 bpy.ops.wm.collada_import(filepath=self.input_file, import_units=False)
@@ -943,28 +1047,19 @@ class Mesh(Representation, SmurfBase):
             self._mesh_object["input_file"] = self.input_file
             self.changed = True  # as we there might be unnoticed changes by blender
         elif self.mesh_object is None:
-            if self.input_type == "file_stl":
-                self._mesh_object = mesh_io.import_mesh(self.input_file)
-            elif self.input_type in ["file_obj", "file_mars_obj"]:
-                self._mesh_object = mesh_io.import_mesh(self.input_file)
-                if _is_trimesh(self.mesh_object):
-                    try:
-                        self._mesh_information = mesh_io.parse_obj(self.input_file)
-                    except Exception as e:
-                        traceback.print_exc()
-                        log.warning(f"{self.input_file} can't parse obj for bobj conversion.")
-                else:
-                    log.debug(f"{self.input_file} can't be converted to bobj")
-            elif self.input_type == "file_dae":
-                self._mesh_object = mesh_io.import_mesh(self.input_file)
-                self._mesh_information = mesh_io.parse_dae(self.input_file)
-            elif self.input_type == "file_bobj":
-                self._mesh_information = mesh_io.parse_bobj(self.input_file)
-                self._mesh_object = mesh_io.mesh_info_dict_2_trimesh(**self._mesh_information)
+            if self.input_type in ["file_stl", "file_obj", "file_mars_obj", "file_dae", "file_bobj"]:
+                mesh, mesh_information = mesh_io.load_mesh_file(self.input_file, self.input_type)
+                self._mesh_object = mesh
+                if mesh_information is not None:
+                    self._mesh_information = mesh_information
+                self._mesh_data_shared = True
         self.history.append(f"->loaded {'bpy-Mesh' if BPY_AVAILABLE else 'trimesh'} from {self.input_type} {self.input_file}")
         return self.mesh_object
 
-    def provide_mesh_file(self, targetpath, rel_mesh_pathes=None, format=None, throw_on_invalid_bobj=False, use_existing=False, apply_scale=False):
+    def get_export_path(self, targetpath, rel_mesh_pathes=None, format=None):
+        """
+        Returns the resolved format and the filepath provide_mesh_file() will export this mesh to.
+        """
         if format is None and self._related_robot_instance is not None:
             format = self._related_robot_instance.mesh_format
         if format in [None, "input_type"] and self.input_type.startswith("file"):
@@ -975,8 +1070,128 @@ class Mesh(Representation, SmurfBase):
         ext = format.lower().replace("_", ".")
         if rel_mesh_pathes is not None:
             targetpath = os.path.join(targetpath, rel_mesh_pathes[ext])
-        os.makedirs(targetpath, exist_ok=True)
-        targetpath = os.path.join(targetpath, self.unique_name+"."+ext)
+        return format, os.path.join(targetpath, self.unique_name+"."+ext)
+
+    def get_export_fingerprint(self, format):
+        """
+        Returns a hash of the input file's content, the operations applied to the mesh and the target format, or None
+        if the mesh doesn't originate from a file, has been overridden manually or changed in a way that isn't
+        recorded in its operations.
+        """
+        if self.input_file is None or not os.path.isfile(self.input_file) or "_manual_override" in self._operations:
+            return None
+        # blender meshes and meshes that have been changed by edits that aren't recorded as operations might differ
+        # from what the input file and the operations describe
+        if BPY_AVAILABLE or (self._changed and not self._changes_recorded()):
+            return None
+        description = json.dumps(
+            [self.input_type, format.lower(), list(self.scale), getattr(self, "mesh_orientation", None), self._operations],
+            default=lambda x: np.asarray(x).tolist() if isinstance(x, (np.ndarray, np.generic)) else str(x)
+        )
+        return hashlib.sha256((mesh_io.get_file_hash(self.input_file) + description).encode()).hexdigest()
+
+    # the operations of the methods that change the mesh data
+    _EDIT_OPERATIONS = ["apply_scale", "improve_mesh", "reduce_mesh", "to_convex_hull", "mirror", "to_trimesh_mesh",
+                        "transform"]
+
+    def _changes_recorded(self):
+        """
+        Whether the changes of this mesh are described by its operations, i.e. it has been changed by its methods only
+        """
+        return any([(list(op.keys())[0] if isinstance(op, dict) else op) in self._EDIT_OPERATIONS
+                    for op in self._operations])
+
+    @staticmethod
+    def _read_manifest(targetpath):
+        if not os.path.isfile(targetpath + "_manifest.json"):
+            return None
+        try:
+            with open(targetpath + "_manifest.json", "r") as f:
+                return json.load(f)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _write_manifest(targetpath, fingerprint, export_operation):
+        stat = os.stat(targetpath)
+        with open(targetpath + "_manifest.json", "w") as f:
+            json.dump({"fingerprint": fingerprint, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                       "export_operation": export_operation}, f)
+        _exported_fingerprints[fingerprint] = targetpath
+
+    @classmethod
+    def _get_export_manifest(cls, targetpath, fingerprint):
+        """
+        Returns the manifest of the file at targetpath if it has been exported with this fingerprint and not been
+        changed since then, otherwise None.
+        """
+        manifest = cls._read_manifest(targetpath)
+        if manifest is None or manifest.get("fingerprint") != fingerprint or not os.path.isfile(targetpath):
+            return None
+        stat = os.stat(targetpath)
+        if manifest.get("size") != stat.st_size or manifest.get("mtime_ns") != stat.st_mtime_ns:
+            return None
+        return manifest
+
+    @staticmethod
+    def _break_hardlink(targetpath):
+        # files that are hardlinked must not be written in place, as this would change the other file, too
+        if os.path.isfile(targetpath) and os.stat(targetpath).st_nlink > 1:
+            os.remove(targetpath)
+
+    def provide_mesh_file(self, targetpath, rel_mesh_pathes=None, format=None, throw_on_invalid_bobj=False, use_existing=False, apply_scale=False):
+        """
+        Provides the mesh file in the given format in targetpath (see get_export_path()).
+        Next to each exported file a manifest stores the fingerprint of the export (see get_export_fingerprint()).
+        If the file has already been exported with the same fingerprint this is a no-op, if an identical file has been
+        exported elsewhere before it will be hardlinked.
+        """
+        format, _targetpath = self.get_export_path(targetpath, rel_mesh_pathes=rel_mesh_pathes, format=format)
+        if use_existing:
+            return self._provide_mesh_file(targetpath, rel_mesh_pathes=rel_mesh_pathes, format=format, use_existing=True)
+        if apply_scale:
+            self.apply_scale()
+        fingerprint = self.get_export_fingerprint(format)
+        if fingerprint is not None:
+            # the export operation that produced the file is taken from its manifest, so that the annotation of the
+            # mesh doesn't depend on whether the file has been reused
+            export_operation = None
+            manifest = self._get_export_manifest(_targetpath, fingerprint)
+            source = _exported_fingerprints.get(fingerprint, None)
+            source_manifest = self._get_export_manifest(source, fingerprint) \
+                if manifest is None and source is not None and source != _targetpath else None
+            if manifest is not None:
+                export_operation = manifest.get("export_operation", "None")
+                self.history.append(f"->{_targetpath} is unchanged according to its manifest")
+            elif source_manifest is not None:
+                export_operation = source_manifest.get("export_operation", "None")
+                os.makedirs(os.path.dirname(_targetpath), exist_ok=True)
+                if os.path.isfile(_targetpath):
+                    os.remove(_targetpath)
+                try:
+                    os.link(source, _targetpath)
+                except OSError:
+                    shutil.copyfile(source, _targetpath)
+                self.history.append(f"->linked identical {source} to {_targetpath}")
+                self.write_history(_targetpath)
+                self._write_manifest(_targetpath, fingerprint, export_operation)
+            if export_operation is not None:
+                self._exported[format.lower()] = {
+                    "operations": self._operations,
+                    "filepath": _targetpath,
+                    "export_operation": export_operation
+                }
+                return
+        self._provide_mesh_file(targetpath, rel_mesh_pathes=rel_mesh_pathes, format=format,
+                                throw_on_invalid_bobj=throw_on_invalid_bobj)
+        exported = [e for e in self._exported.values() if e["filepath"] == _targetpath]
+        if fingerprint is not None and os.path.isfile(_targetpath) and len(exported) > 0:
+            self._write_manifest(_targetpath, fingerprint, exported[0]["export_operation"])
+
+    def _provide_mesh_file(self, targetpath, rel_mesh_pathes=None, format=None, throw_on_invalid_bobj=False, use_existing=False, apply_scale=False):
+        format, targetpath = self.get_export_path(targetpath, rel_mesh_pathes=rel_mesh_pathes, format=format)
+        ext = format.lower().replace("_", ".")
+        os.makedirs(os.path.dirname(targetpath), exist_ok=True)
         if use_existing:
             self._exported[format.lower()] = {
                 "operations": self._operations,
@@ -1004,6 +1219,7 @@ class Mesh(Representation, SmurfBase):
                 return
             else:
                 log.debug(f"Copying mesh {os.path.relpath(self.input_file, os.path.dirname(targetpath))} to {targetpath}...")
+                self._break_hardlink(targetpath)
                 shutil.copyfile(self.input_file, targetpath)
                 self._exported[format.lower()] = {
                     "operations": self._operations,
@@ -1060,6 +1276,7 @@ class Mesh(Representation, SmurfBase):
                 log.warn(f"Couldn't provide mesh {self.unique_name} to {targetpath}, because this mesh has been edited and thus the textures might have get mixed up.")
             return
         # export
+        self._break_hardlink(targetpath)
         log.debug(f"Writing {type(self.mesh_object)} to {targetpath}...")
         assert self.mesh_object is not None
         if format.lower() == "bobj" and self.input_type == "file_obj":
@@ -1217,9 +1434,39 @@ class Mesh(Representation, SmurfBase):
         else:
             raise TypeError(f"Can't multiply scale with {factor}, requires list(3) or float")
 
+    def __deepcopy__(self, memo):
+        """
+        Copies this mesh but shares the mesh object and the mesh information with the copy instead of copying them.
+        Both instances are marked as sharing their mesh data, hence the one that gets edited first copies it before
+        (see _unshare_mesh_data()). Thus duplicating a robot doesn't multiply the memory needed for its meshes.
+        """
+        out = self.__class__.__new__(self.__class__)
+        memo[id(self)] = out
+        shared = ["_mesh_object", "_mesh_information"]
+        for k, v in self.__dict__.items():
+            out.__dict__[k] = v if k in shared else deepcopy(v, memo)
+        if self.__dict__.get("_mesh_object") is not None or self.__dict__.get("_mesh_information") is not None:
+            self._mesh_data_shared = True
+            out._mesh_data_shared = True
+        return out
+
+    def _unshare_mesh_data(self):
+        """
+        Copies the mesh and the mesh info dict if they are shared with the mesh cache, before they are edited.
+        """
+        if not getattr(self, "_mesh_data_shared", False):
+            return
+        mesh, self._mesh_information = mesh_io.copy_mesh_data(
+            self._mesh_object if _is_trimesh_or_scene(self._mesh_object) else None, self._mesh_information
+        )
+        if mesh is not None:
+            self._mesh_object = mesh
+        self._mesh_data_shared = False
+
     # methods that make changes on the mesh
     def apply_scale(self):
         self.load_mesh()
+        self._unshare_mesh_data()
         if _is_trimesh_or_scene(self.mesh_object):
             self.mesh_object.apply_transform(np.diag(list(self.scale) + [1]))
         elif BPY_AVAILABLE and isinstance(self.mesh_object, bpy.types.Mesh):
@@ -1250,6 +1497,7 @@ class Mesh(Representation, SmurfBase):
     def improve_mesh(self):
         self.load_mesh()
         if _is_trimesh(self.mesh_object):
+            self._unshare_mesh_data()
             self._changed = True
             self._info_in_sync = False
             self._mesh_object = improve_mesh(self.mesh_object)
@@ -1265,6 +1513,7 @@ class Mesh(Representation, SmurfBase):
         if _is_trimesh(self.mesh_object):
             self._changed = True
             self._info_in_sync = False
+            # reduce_mesh() works on a copy, therefore the shared mesh stays untouched
             self._mesh_object = reduce_mesh(self.mesh_object, factor=factor, max_faces=max_faces, min_faces=min_faces)
             self._operations.append({"reduce_mesh": [factor]})
             self.set_unique_name(misc.edit_name_string(self.unique_name, suffix=f"_red{str(factor).replace('.',',')}"))
@@ -1279,6 +1528,7 @@ class Mesh(Representation, SmurfBase):
         if _is_trimesh_or_scene(self.mesh_object):
             self._mesh_object = self.mesh_object.convex_hull
             self._mesh_information = mesh_io.trimesh_2_mesh_info_dict(self.mesh_object)
+            self._mesh_data_shared = False
             self._operations.append("to_convex_hull")
             self._changed = True
             self._info_in_sync = False
@@ -1308,6 +1558,7 @@ class Mesh(Representation, SmurfBase):
         if name_replacements is None:
             name_replacements = {}
         if _is_trimesh_or_scene(self.mesh_object):
+            self._unshare_mesh_data()
             self._mesh_object = self.mesh_object.apply_transform(mirror_transform)
             self._operations.append({"mirror": [mirror_transform]})
             try:
@@ -1351,6 +1602,7 @@ class Mesh(Representation, SmurfBase):
         if transform is None or np.all(np.array(transform) == np.identity(4)):
             return
         if _is_trimesh_or_scene(self.mesh_object):
+            self._unshare_mesh_data()
             self._mesh_object = self.mesh_object.apply_transform(transform)
             self._operations.append({"transform": [transform]})
             try:
@@ -1406,10 +1658,23 @@ class Mesh(Representation, SmurfBase):
         return np.c_[faces, [-1]*faces.shape[0]].flatten()
 
     @property
-    def extent(self):
+    def bounds(self):
+        """
+        The axis aligned bounds (2, 3) of the mesh, which are taken from the file header as long as a lazy mesh hasn't
+        been loaded.
+        """
+        if self._lazy and self._mesh_object is None and not BPY_AVAILABLE:
+            # blender applies the axis conversion on import, so the bounds from the file only apply for trimesh
+            bounds = self.header["bounds"]
+            if bounds is not None:
+                return np.array(bounds)
         self.load_mesh()
-        mesh = mesh_io.as_trimesh(self.mesh_object)
-        return create_box(mesh)[0].extent
+        return np.array(mesh_io.as_trimesh(self.mesh_object).bounds)
+
+    @property
+    def extent(self):
+        bounds = self.bounds
+        return bounds[1] - bounds[0]
 
 class GeometryFactory(Representation):
     @classmethod
@@ -1598,8 +1863,9 @@ class Visual(Representation, SmurfBase):
         _joint_relative_origin_setter(self, value)
 
 
-class Inertia(Representation, SmurfBase):
+class Inertia(_EditTracked, Representation, SmurfBase):
     _class_variables = ['ixx', 'ixy', 'ixz', 'iyy', 'iyz', 'izz']
+    _tracked_attributes = _class_variables
 
     def __init__(self, ixx=1e-16, ixy=0.0, ixz=0.0, iyy=1e-16, iyz=0.0, izz=1e-16, **kwargs):
         super().__init__()
@@ -1640,8 +1906,9 @@ class Inertia(Representation, SmurfBase):
         return Inertia.from_matrix(I)
 
 
-class Inertial(Representation, SmurfBase):
+class Inertial(_EditTracked, Representation, SmurfBase):
     _class_variables = ["mass", "inertia", "origin", "link"]
+    _tracked_attributes = ("mass", "inertia", "origin")
 
     def __init__(self, mass=0.0, inertia=None, origin=None, link=None, **kwargs):
 
@@ -1781,8 +2048,9 @@ class KCCDHull(Representation, SmurfBase):
                     self.points.append(np.array([float(x) for x in line.split()[-3:]]))
 
 
-class Link(Representation, SmurfBase):
+class Link(_EditTracked, Representation, SmurfBase):
     _class_variables = ["name", "visuals", "collisions", "inertial", "kccd_hull", "origin"]
+    _tracked_attributes = ("inertial", "origin")
 
     def __init__(self, name=None, visuals=None, inertial=None, collisions=None, export_collisions=None, origin=None, origin_root=None,
                  noDataPackage=None, reducedDataPackage=None, is_human=None, kccd_hull=None, **kwargs):
@@ -1857,7 +2125,10 @@ class Link(Representation, SmurfBase):
     def sort_string(self, dialect=None) -> str:
         prefix = type(self).__name__ if dialect is None else self.to_xml(dialect).tag
         if self._related_robot_instance:
-            return prefix + str(self._related_robot_instance.links.index(self))
+            index = self._related_robot_instance.get_link_id(self.name)
+            if index is None or self._related_robot_instance.links[index] is not self:
+                index = self._related_robot_instance.links.index(self)
+            return prefix + str(index)
         else:
             return super().sort_string(dialect)
 
@@ -2018,7 +2289,7 @@ class ConstraintAxis(SmurfBase):
         return False
 
 
-class Joint(Representation, SmurfBase):
+class Joint(_EditTracked, Representation, SmurfBase):
     TYPES = ['revolute', 'continuous', 'prismatic', 'floating', 'planar', 'fixed']
     ADVANCED_TYPES = ['unknown', "revolute2", "screw", "ball", "universal"]
 
@@ -2029,6 +2300,7 @@ class Joint(Representation, SmurfBase):
     }
     _class_variables = ["name", "parent", "child", "joint_type", "axis", "limit", "dynamics", "motor", "origin",
                         "joint_dependencies"]
+    _tracked_attributes = ("origin", "joint_type")
 
     def __init__(self, name=None, parent=None, child=None, joint_type=None,
                  axis=None, axis2=None, origin=None, limit=None, limit2=None,
@@ -2159,7 +2431,10 @@ class Joint(Representation, SmurfBase):
     def sort_string(self, dialect=None) -> str:
         prefix = type(self).__name__ if dialect is None else self.to_xml(dialect).tag
         if self._related_robot_instance:
-            return prefix + str(self._related_robot_instance.joints.index(self))
+            index = self._related_robot_instance.get_joint_id(self.name)
+            if index is None or self._related_robot_instance.joints[index] is not self:
+                index = self._related_robot_instance.joints.index(self)
+            return prefix + str(index)
         else:
             return super().sort_string(dialect)
 
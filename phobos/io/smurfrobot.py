@@ -1,4 +1,5 @@
 import os
+import time
 from copy import deepcopy
 
 from .hyrodyn import Submechanism, Exoskeleton
@@ -16,7 +17,8 @@ log = get_logger(__name__)
 
 class SMURFRobot(XMLRobot):
     def __init__(self, name=None, xmlfile=None, submechanisms_file=None, smurffile=None, verify_meshes_on_import=True,
-                 inputfile=None, description=None, autogenerate_submechanisms=None, is_human=False, shallow=False, **kwargs):
+                 inputfile=None, description=None, autogenerate_submechanisms=None, is_human=False, shallow=False,
+                 lazy_meshes=False, **kwargs):
         self.smurf_annotation_keys = [
             'motors', 'sensors', 'materials', "joints", "links", 'collisions', 'visuals', 'poses',
             "submechanisms", "exoskeletons", "interfaces", "submodels"
@@ -95,23 +97,31 @@ class SMURFRobot(XMLRobot):
         self.smurffile = misc.sys_path(smurffile)
         self.submechanisms_file = misc.sys_path(submechanisms_file)
 
-        if self.smurffile is not None:
-            # Check the input file
-            self.read_smurffile(self.smurffile)
-
-        if self.xmlfile is not None:
-            # Fill everything with the xml information
-            base_robot = parse_xml(self.xmlfile)
-            assert type(base_robot) == XMLRobot, f"{type(base_robot)}"
-            for k, v in base_robot.__dict__.items():
-                if not getattr(self, k, None):
-                    setattr(self, k, v)
+        # seconds needed for each phase of the import
+        self.import_timings = {}
+        # lazy meshes are only loaded on first geometric access (see representation.lazy_mesh_loading())
+        with representation.lazy_mesh_loading(lazy_meshes):
+            if self.smurffile is not None:
+                # Check the input file
+                start = time.perf_counter()
+                self.read_smurffile(self.smurffile)
+                self.import_timings["smurf"] = time.perf_counter() - start
+
+            if self.xmlfile is not None:
+                # Fill everything with the xml information
+                # unless this is a shallow import, the entities are linked in one pass with this robot below
+                base_robot = parse_xml(self.xmlfile, link_entities=shallow, timings=self.import_timings)
+                assert type(base_robot) == XMLRobot, f"{type(base_robot)}"
+                for k, v in base_robot.__dict__.items():
+                    if not getattr(self, k, None):
+                        setattr(self, k, v)
 
         self.description = "" if description is None else description
 
         if self.submechanisms_file is not None:
             self.inputfiles.append(self.submechanisms_file)
 
+        start = time.perf_counter()
         for f in self.inputfiles:
             self._parse_annotations(f)
 
@@ -120,16 +130,24 @@ class SMURFRobot(XMLRobot):
 
             if is_human:
                 self.annotate_as_human()
+            self.import_timings["annotations"] = time.perf_counter() - start
 
-            if len(self.links) > 0 and len(self.joints) > 0:
+            start = time.perf_counter()
+            if len(self.links) > 0:
                 self.link_entities()
-                self.joints = self.get_joints_ordered_df()
+                if len(self.joints) > 0:
+                    self.joints = self.get_joints_ordered_df()
+            self.import_timings["link"] = time.perf_counter() - start
 
-            if verify_meshes_on_import:
+            # lazy meshes are verified when they are loaded on first access
+            if verify_meshes_on_import and not lazy_meshes:
+                start = time.perf_counter()
                 self.verify_meshes()
+                self.import_timings["verify_meshes"] = time.perf_counter() - start
 
         if self.name is None and self.xmlfile is not None:
             self.name, _ = os.path.splitext(self.xmlfile)
+        log.debug(f"Import timings of {self.name}: " + ", ".join([f"{k}={v:.3f}s" for k, v in self.import_timings.items()]))
 
     # helper methods
     def link_entities(self, check_linkage_later=False):
@@ -530,7 +548,11 @@ class SMURFRobot(XMLRobot):
         indep_joints = []
         for sm in self.submechanisms:
             indep_joints += sm.jointnames_independent
-        return tree.get_joints_depth_first(self, self.get_root(), independent_joints=None if ignore_indep else list(set(indep_joints)) if len(indep_joints) > 0 else None)
+        indep_joints = None if ignore_indep else list(set(indep_joints)) if len(indep_joints) > 0 else None
+        return list(self._tree_cached(
+            ("joints_df", tuple(sorted(indep_joints)) if indep_joints is not None else None),
+            lambda: tree.get_joints_depth_first(self, self.get_root(), independent_joints=indep_joints)
+        ))
 
     # submechanism related
     def create_submechanism(self, name, definition):
@@ -13,7 +13,7 @@ import numpy as np
 
 from ..common.defs import KINEMATIC_TYPES
 from .base import Representation, Linkable
-from ..utils.misc import to_pretty_xml_string, patch_dict, get_var, deserialize, is_int, is_float, plural, singular
+from ..utils.misc import to_pretty_xml_string, to_pretty_xml_element_string, patch_dict, get_var, deserialize, is_int, is_float, plural, singular
 from ..utils.resources import get_resources_path
 
 from ..common.commandline_logging import get_logger
@@ -50,6 +50,31 @@ def get_class(classname):
     return cls
 
 
+_SEQUENCE_TYPES = {list, tuple}
+_INT_TYPES = {int, np.intc, np.int64, bool}
+_FLOAT_TYPES = {float, np.float64}
+
+
+def _compile_getter(varname):
+    """
+    Returns a function that behaves like get_var(object, varname, None), but parses varname only once.
+    """
+    if varname.startswith("@"):
+        value = varname[1:]
+        return lambda object: value
+    if "|" in varname:
+        return lambda object: get_var(object, varname, None)
+    if "." in varname:
+        parts = varname.split(".")
+
+        def _getter(object):
+            for part in parts:
+                object = getattr(object, part, None)
+            return object
+        return _getter
+    return lambda object: getattr(object, varname, None)
+
+
 # instead of misc.serialize
 def serialize(entry, float_fmt=None, **kwargs) -> str:
     """
@@ -64,12 +89,14 @@ def serialize(entry, float_fmt=None, **kwargs) -> str:
     assert entry is not None
     if hasattr(entry, "tolist"):
         entry = entry.tolist()
-    if type(entry) in [list, tuple, np.array]:
-        entry = [serialize(v, float_fmt=float_fmt) for v in entry]
-        return " ".join(entry)
-    elif type(entry) in [int, np.intc, np.int64, bool]:
+    entry_type = type(entry)
+    if entry_type in _SEQUENCE_TYPES:
+        if float_fmt is not None and all([type(v) is float for v in entry]):
+            return " ".join([float_fmt % v for v in entry])
+        return " ".join([serialize(v, float_fmt=float_fmt) for v in entry])
+    elif entry_type in _INT_TYPES:
         return str(int(entry))
-    elif type(entry) in [float, np.float64]:
+    elif entry_type in _FLOAT_TYPES:
         return float_fmt % entry if float_fmt is not None else str(entry)
     elif isinstance(entry, Linkable):
         if entry._related_robot_instance is not None and kwargs.get("robot_instance", None) is not None and \
@@ -105,6 +132,118 @@ class XMLDefinition(object):
             if "tag" not in nest.keys():
                 nest["tag"] = tag
             self.xml_nested_children[tag] = XMLDefinition(dialect, **nest)
+        self._writer, self._streamer = self._compile_writer()
+
+    def _compile_writer(self):
+        """
+        Compiles this definition into functions that write an object to xml, so that the definition doesn't have to
+        be interpreted for every serialized object. Definitions that are only resolved by the object itself
+        (__DYNAMIC__ tags or sections given as varname) are not compiled.
+
+        Returns:
+            (writer, streamer) or (None, None) if the definition can't be compiled
+            writer: function(object, float_fmt_dict, kwargs) -> ET.Element or None
+            streamer: function(object, float_fmt_dict, kwargs) -> (attributes, iterator over the child elements), which
+                is None for definitions with a value
+        """
+        if self.xml_tag == "__DYNAMIC__" or any([type(section) == str for section in [
+                self.xml_attributes, self.xml_children, self.xml_attribute_children, self.xml_value_children]]):
+            return None, None
+        dialect = self.dialect
+        tag = self.xml_tag
+        attributes = [(attname, _compile_getter(varname)) for attname, varname in self.xml_attributes.items()]
+        children = [(_compile_getter(var["varname"]), var["class"], "_"+var["varname"])
+                    for var in self.xml_children.values()]
+        attribute_children = [(child_tag, [(attname, _compile_getter(varname)) for attname, varname in attribute_map.items()])
+                              for child_tag, attribute_map in self.xml_attribute_children.items()]
+        value_children = [(child_tag, _compile_getter(varname)) for child_tag, varname in self.xml_value_children.items()]
+        nested_children = list(self.xml_nested_children.values())
+        value = _compile_getter(self.xml_value) if self.xml_value is not None else None
+        Element = ET.Element
+
+        def is_written(child):
+            return child is not None and (not isinstance(child, Representation) or not child.is_empty())
+
+        def get_attributes(object, float_fmt_dict, default_fmt, kwargs):
+            attrib = {}
+            for attname, getter in attributes:
+                val = getter(object)
+                if val is not None:
+                    attrib[attname] = serialize(val, float_fmt=float_fmt_dict.get(attname, default_fmt), **kwargs)
+            return attrib
+
+        def iter_children(object, float_fmt_dict, default_fmt, kwargs):
+            # normal children
+            if children:
+                _children = []
+                for getter, cls, private_varname in children:
+                    obj = getter(object)
+                    if type(obj) == list:
+                        _children += [o for o in obj if is_written(o)]
+                    elif isinstance(obj, cls):
+                        _children.append(obj)
+                    elif hasattr(object, private_varname):
+                        _obj = getattr(object, private_varname)
+                        if is_written(_obj):
+                            _children.append(_obj)
+                for child in sorted(_children, key=lambda x: x.sort_string()):
+                    try:
+                        e = child.to_xml(dialect, float_fmt_dict=float_fmt_dict, **kwargs)
+                    except (KeyError, LookupError) as error:
+                        if dialect not in child.factory.keys():
+                            continue
+                        raise error
+                    if e is not None:
+                        yield e
+            # children that are created from a simple property and have only attributes
+            for child_tag, attribute_map in attribute_children:
+                fmt = float_fmt_dict.get(child_tag, default_fmt)
+                _attrib = {}
+                for attname, getter in attribute_map:
+                    val = getter(object)
+                    if val is not None:
+                        _attrib[attname] = serialize(val, float_fmt=fmt, **kwargs)
+                if len(_attrib) > 0:
+                    yield Element(child_tag, attrib=_attrib)
+            # children that have the a value as text
+            for child_tag, getter in value_children:
+                val = getter(object)
+                if val is None:
+                    continue
+                fmt = float_fmt_dict.get(child_tag, default_fmt)
+                if type(val) == list and all([not is_int(v) and not is_float(v) and type(v) == str for v in val]):
+                    for v in val:
+                        e = Element(child_tag)
+                        e.text = serialize(v, float_fmt=fmt, **kwargs)
+                        yield e
+                else:
+                    e = Element(child_tag)
+                    e.text = serialize(val, float_fmt=fmt, **kwargs)
+                    yield e
+            # children that are nested in another element
+            for nest in nested_children:
+                yield nest.to_xml(object, float_fmt_dict=float_fmt_dict, **kwargs)
+
+        def write(object, float_fmt_dict, kwargs):
+            default_fmt = float_fmt_dict.get("default", None)
+            out = Element(tag, attrib=get_attributes(object, float_fmt_dict, default_fmt, kwargs))
+            for e in iter_children(object, float_fmt_dict, default_fmt, kwargs):
+                out.append(e)
+            # value
+            if value is not None:
+                assert len(out) == 0
+                val = value(object)
+                out.text = serialize(val, float_fmt=float_fmt_dict.get(tag, default_fmt), **kwargs)
+                if val is None:
+                    return
+            return out
+
+        def stream(object, float_fmt_dict, kwargs):
+            default_fmt = float_fmt_dict.get("default", None)
+            return (get_attributes(object, float_fmt_dict, default_fmt, kwargs),
+                    iter_children(object, float_fmt_dict, default_fmt, kwargs))
+
+        return write, stream if value is None else None
 
     def to_xml(self, object, float_fmt_dict=None, **kwargs):
         """
@@ -117,14 +256,16 @@ class XMLDefinition(object):
         Returns:
             An XML object
         """
+        if float_fmt_dict is None:
+            float_fmt_dict = {}
+        if self._writer is not None:
+            return self._writer(object, float_fmt_dict, kwargs)
         _xml_tag = self.xml_tag
         if self.xml_tag == "__DYNAMIC__":
             _xml_tag = object.xml_tag
             if QName:
                 _xml_tag == QName(**_xml_tag.split(":"))
         # attributes
-        if float_fmt_dict is None:
-            float_fmt_dict = {}
         attrib = {}
         _xml_attributes = self.xml_attributes
         if type(self.xml_attributes) == str:
@@ -253,8 +394,16 @@ class XMLDefinition(object):
         return out
 
     def kwargs_from_xml(self, xml: ET.Element, **kwargs):
-        _xmlfile = kwargs.get("_xmlfile", None)
-        _smurffile = kwargs.get("_smurffile", None)
+        kwargs = self.kwargs_from_xml_attributes(xml, **kwargs)
+        for child in xml:
+            self.add_child_kwargs_from_xml(child, xml, kwargs)
+        return kwargs
+
+    def kwargs_from_xml_attributes(self, xml: ET.Element, **kwargs):
+        """
+        Returns the kwargs that are defined by the value and the attributes of the given element, i.e. without its
+        children (see add_child_kwargs_from_xml()).
+        """
         # value
         if self.xml_value is not None and xml.text is not None:
             kwargs[self.xml_value] = deserialize(xml.text, key=xml.tag)
@@ -262,40 +411,47 @@ class XMLDefinition(object):
         for attname, varname in self.xml_attributes.items():
             if attname in xml.attrib:
                 kwargs[varname] = deserialize(xml.attrib[attname], key=attname)
-        for child in xml:
-            if self.xml_value is not None:
-                # value
-                kwargs[self.xml_value] = deserialize(
-                    child.text, key=child.tag
-                )
-            if child.tag in self.xml_children.keys():
-                # normal children
-                if self.xml_children[child.tag]["varname"] not in kwargs:
-                    kwargs[self.xml_children[child.tag]["varname"]] = []
-                kwargs[self.xml_children[child.tag]["varname"]] += [
-                    self.xml_children[child.tag]["class"].from_xml(
-                        child, self.dialect, _parent_xml=xml, _xmlfile=_xmlfile, _smurffile=_smurffile)]
-            if child.tag in self.xml_attribute_children.keys():
-                # children that are created from a simple property and have only attributes
-                for attname, varname in self.xml_attribute_children[child.tag].items():
-                    if attname in child.attrib.keys():
-                        kwargs[varname] = deserialize(child.attrib[attname], key=attname)
-            if child.tag in self.xml_value_children.keys():
-                # children that have the a value as text
-                kwargs[self.xml_value_children[child.tag]] = deserialize(child.text, key=child.tag)
-            if child.tag in self.xml_nested_children.keys():
-                # children that are nested in another element
-                _kwargs = self.xml_nested_children[child.tag].kwargs_from_xml(child,
-                                                                              _xmlfile=_xmlfile,
-                                                                              _smurffile=_smurffile)
-                for k, v in _kwargs.items():
-                    if k in kwargs.keys() and v != kwargs[k]:
-                        raise IndexError(
-                            f"Key {k} of nested xml node {child.tag} already defined in conflict ({v}<>{kwargs[k]}) by superior node with keys: {str(kwargs.keys())}")
-                    else:
-                        kwargs[k] = v
         return kwargs
 
+    def add_child_kwargs_from_xml(self, child: ET.Element, xml: ET.Element, kwargs):
+        """
+        Adds the kwargs defined by the child element of xml to the given kwargs. This way the children can be
+        processed as soon as they have been parsed.
+        """
+        _xmlfile = kwargs.get("_xmlfile", None)
+        _smurffile = kwargs.get("_smurffile", None)
+        if self.xml_value is not None:
+            # value
+            kwargs[self.xml_value] = deserialize(
+                child.text, key=child.tag
+            )
+        if child.tag in self.xml_children.keys():
+            # normal children
+            if self.xml_children[child.tag]["varname"] not in kwargs:
+                kwargs[self.xml_children[child.tag]["varname"]] = []
+            kwargs[self.xml_children[child.tag]["varname"]] += [
+                self.xml_children[child.tag]["class"].from_xml(
+                    child, self.dialect, _parent_xml=xml, _xmlfile=_xmlfile, _smurffile=_smurffile)]
+        if child.tag in self.xml_attribute_children.keys():
+            # children that are created from a simple property and have only attributes
+            for attname, varname in self.xml_attribute_children[child.tag].items():
+                if attname in child.attrib.keys():
+                    kwargs[varname] = deserialize(child.attrib[attname], key=attname)
+        if child.tag in self.xml_value_children.keys():
+            # children that have the a value as text
+            kwargs[self.xml_value_children[child.tag]] = deserialize(child.text, key=child.tag)
+        if child.tag in self.xml_nested_children.keys():
+            # children that are nested in another element
+            _kwargs = self.xml_nested_children[child.tag].kwargs_from_xml(child,
+                                                                          _xmlfile=_xmlfile,
+                                                                          _smurffile=_smurffile)
+            for k, v in _kwargs.items():
+                if k in kwargs.keys() and v != kwargs[k]:
+                    raise IndexError(
+                        f"Key {k} of nested xml node {child.tag} already defined in conflict ({v}<>{kwargs[k]}) by superior node with keys: {str(kwargs.keys())}")
+                else:
+                    kwargs[k] = v
+
 
 class XMLFactory(XMLDefinition):
     def __init__(self, dialect, classname):
@@ -335,6 +491,31 @@ class XMLFactory(XMLDefinition):
             return to_pretty_xml_string(self.to_xml(object, float_fmt_dict=float_fmt_dict, **kwargs))
         return None
 
+    def write_xml(self, object, f, float_fmt_dict=None, **kwargs):
+        """
+        Writes the same string as to_xml_string() to the file handle f, but builds and writes only one child element
+        at a time instead of building the whole tree first.
+        """
+        if not self.available_in_dialect:
+            return
+        if float_fmt_dict is None:
+            float_fmt_dict = {}
+        if self._streamer is None:
+            f.write(to_pretty_xml_string(self.to_xml(object, float_fmt_dict=float_fmt_dict, **kwargs)))
+            return
+        attrib, elements = self._streamer(object, float_fmt_dict, kwargs)
+        # the element without children is written as '<tag .../>\n'
+        empty_element = to_pretty_xml_element_string(ET.Element(self.xml_tag, attrib=attrib))
+        first = next(elements, None)
+        if first is None:
+            f.write(empty_element.rstrip("\n"))
+            return
+        f.write(empty_element[:-len("/>\n")] + ">\n")
+        f.write(to_pretty_xml_element_string(first, indent="  "))
+        for e in elements:
+            f.write(to_pretty_xml_element_string(e, indent="  "))
+        f.write(f"</{self.xml_tag}>")
+
     def from_xml_string(self, classtype, xml_string: str):
         if self.available_in_dialect:
             return self.from_xml(classtype, ET.fromstring(xml_string))
@@ -367,10 +548,15 @@ def class_factory(cls, only=None):
             def _to_string(obj, _dialect=refl, **kwargs):
                 return obj.to_xml_string(dialect=_dialect, robot_instance=obj._related_robot_instance, **kwargs)
 
+            def _write(obj, f, _dialect=refl, **kwargs):
+                return obj.write_xml(f, dialect=_dialect, robot_instance=obj._related_robot_instance, **kwargs)
+
             setattr(cls, f"to_{refl}", _to_xml)
             setattr(cls, f"to_{refl}_string", _to_string)
+            setattr(cls, f"write_{refl}", _write)
             del _to_xml
             del _to_string
+            del _write
 
     if cls.__class__ == type and issubclass(cls, Linkable):
         # creates the setters and getters for all linked attributes
@@ -23,6 +23,19 @@ class XMLRobot(Representation):
     _related_world_instance = None
     _related_entity_instance = None
 
+    # The aggregates that are stored as plain lists on the robot and can be looked up by name via the aggregate index
+    _INDEXED_AGGREGATES = ["joints", "links", "sensors", "motors", "materials"]
+    # Maps the aggregate type to (list, length, {name: index}), see _get_aggregate_index
+    _aggregate_index = None
+    # Maps id(link/joint) to its cached transformation from the root, see _get_root_transformation
+    _transformation_cache = None
+    _transformation_cache_root = None
+    # Incremented on every structural change of the kinematic tree, see _tree_cached
+    _tree_version = 0
+    _tree_cache = None
+    _joints = None
+    _joints_need_sorting = False
+
     def __init__(self, name=None, version=None, links: List[representation.Link] = None,
                  frames: List[representation.Link] = None,
                  physical_links: List[representation.Link] = None,
@@ -31,8 +44,10 @@ class XMLRobot(Representation):
                  referenced_materials: List[representation.Material] = None,
                  transmissions: List[representation.Transmission] = None,
                  sensors=None, motors=None, plugins=None, root=None,
-                 is_human=False, urdf_version=None, xmlfile=None, _xmlfile=None):
+                 is_human=False, urdf_version=None, xmlfile=None, _xmlfile=None, _defer_linkage=False):
         self._related_robot_instance = self
+        self._aggregate_index = {}
+        self._transformation_cache = {}
         super().__init__()
         self.joints = []
         self.links = []
@@ -89,8 +104,9 @@ class XMLRobot(Representation):
 
         self.regenerate_tree_maps()
         if self.links:
-            # link everything
-            self.link_entities()
+            # link everything, unless the owner of this robot does this in one pass later on (see parser.parse_xml())
+            if not _defer_linkage:
+                self.link_entities()
             if root is not None:
                 assert root in [str(l) for l in self.links], "root specified in xml is no link in the robot"
                 assert root == str(self.get_root()), "root specified in xml is not root of the robot"
@@ -105,6 +121,37 @@ class XMLRobot(Representation):
     def __str__(self):
         return self.name
 
+    @property
+    def joints(self):
+        """The joints of the robot in depth first order"""
+        if self._joints_need_sorting:
+            self._sort_joints()
+        return self._joints
+
+    @joints.setter
+    def joints(self, joints):
+        self._joints = joints
+        self._joints_need_sorting = False
+
+    def _sort_joints(self):
+        """
+        Brings the joints into depth first order. As long as the tree is not valid (e.g. while editing or after renaming
+        joints or links directly) the order is kept and the sorting is tried again on the next access.
+        """
+        if len(self._joints) == 0:
+            return
+        roots = self.get_roots()
+        if len(roots) != 1:
+            log.debug(f"Keeping the order of the joints of {self.name} as it has {len(roots)} roots instead of one")
+            return
+        joints = self.get_joints_ordered_df()
+        if len(joints) != len(self._joints):
+            log.debug(f"Keeping the order of the joints of {self.name} as only {len(joints)} of its "
+                      f"{len(self._joints)} joints are reachable from the root")
+            return
+        self._joints_need_sorting = False
+        self._joints = joints
+
     def link_with_world(self, world, entity):
         self._related_world_instance = world
         self._related_entity_instance = entity
@@ -182,6 +229,7 @@ class XMLRobot(Representation):
             link.is_human = True
 
     def link_entities(self, check_linkage_later=False):
+        self._invalidate_transformations()
         root = self.get_root()
         for link in self.links:
             for child_entity in ([link.inertial] if link.inertial is not None else []) + link.visuals + link.collisions:
@@ -229,8 +277,15 @@ class XMLRobot(Representation):
         return out
 
     def duplicate(self):
+        """
+        Returns a deep copy of this robot. The loaded mesh data is shared between both robots until one of them edits
+        it (see Mesh.__deepcopy__()) and the caches are not copied as they are rebuilt on demand.
+        """
         self.unlink_entities()
-        out = deepcopy(self)
+        memo = {id(self._transformation_cache): {}}
+        if self._tree_cache is not None:
+            memo[id(self._tree_cache)] = None
+        out = deepcopy(self, memo)
         self.link_entities()
         out.link_entities()
         return out
@@ -273,6 +328,8 @@ class XMLRobot(Representation):
         other_targettypes = list(other_targettypes) + [o+"s" if not o.endswith("s") else o for o in other_targettypes]
         index = None  # gives the index of joint or link for parent/child maps
         renamed = False
+        self._tree_version += 1
+        obj_type = targettype if targettype.endswith("s") else targettype + "s"
         if targettype in ['link', "links"]:
             index = 1
             obj = self.get_link(target)
@@ -313,72 +370,131 @@ class XMLRobot(Representation):
                 obj.set_unique_name(new_name)
                 renamed = True
         if renamed:
+            self._index_renamed_aggregate(obj_type, target, new_name)
+            self._invalidate_transformations()
             return {target: new_name}
         return {}
 
     def regenerate_tree_maps(self):
         """
-        Regenerates the child and parent maps
+        Regenerates the child and parent maps and the name index of the aggregates.
+        Only needed after editing the names or the parent/child of joints directly, the methods of the robot keep the
+        maps up to date themselves.
         """
+        self._invalidate_aggregate_index()
+        self._invalidate_transformations()
+        self._tree_version += 1
         self.child_map = {}
         self.parent_map = {}
         # the link entries
-        for j in self.joints:
+        for j in self._joints:
             self.parent_map[j.child] = (j.name, j.parent)
             if j.parent in self.child_map.keys():
                 self.child_map[j.parent].append((j.name, j.child))
             else:
                 self.child_map[j.parent] = [(j.name, j.child)]
-        if self.joints:
-            self.joints = self.get_joints_ordered_df()
+        self._joints_need_sorting = len(self._joints) > 0
+
+    def _tree_insert_joint(self, joint):
+        """
+        Adds the given joint to the parent and child maps
+        """
+        self.parent_map[str(joint.child)] = (joint.name, joint.parent)
+        if joint.parent in self.child_map:
+            assert joint.name not in [j for j, l in self.child_map[joint.parent]], str(joint.to_yaml())
+            assert joint.child not in [l for j, l in self.child_map[joint.parent]], str(joint.to_yaml())
+            self.child_map[joint.parent].append((joint.name, joint.child))
+        else:
+            self.child_map[joint.parent] = [(joint.name, joint.child)]
+        self._tree_version += 1
+        self._invalidate_transformations()
+
+    def _tree_remove_joint(self, joint, parent=None):
+        """
+        Removes the given joint from the parent and child maps
+        :param joint: the joint instance
+        :param parent: the name of the parent link, if it has already been changed on the joint
+        """
+        parent = str(joint.parent) if parent is None else str(parent)
+        self.parent_map.pop(str(joint.child), None)
+        if parent in self.child_map:
+            self.child_map[parent] = [(j, l) for j, l in self.child_map[parent] if j != joint.name]
+            if len(self.child_map[parent]) == 0:
+                self.child_map.pop(parent)
+        self._tree_version += 1
+        self._invalidate_transformations()
+
+    def _tree_reparent_joint(self, joint, old_parent):
+        """
+        Updates the parent and child maps after the parent of the given joint has been changed
+        :param joint: the joint instance whose parent has been changed
+        :param old_parent: the name of the former parent link
+        """
+        self._tree_remove_joint(joint, parent=old_parent)
+        self._tree_insert_joint(joint)
+        self._joints_need_sorting = True
+
+    def _tree_cached(self, key, compute):
+        """
+        Returns the value of compute() which is cached until the kinematic tree is changed
+        """
+        if self._tree_cache is None or self._tree_cache[0] != self._tree_version:
+            self._tree_cache = (self._tree_version, {})
+        if key not in self._tree_cache[1]:
+            self._tree_cache[1][key] = compute()
+        return self._tree_cache[1][key]
 
     def add_aggregate(self, typeName, elem, silent=False):
         assert elem is not None
         if type(elem) in (list, tuple):
             return [self.add_aggregate(typeName, e) for e in elem]
         if typeName in 'joints':
-            if elem.name in [str(j) for j in self.joints]:
-                if id(self.get_aggregate("joint", elem.name)) != id(elem):
+            existing = self.get_aggregate("joint", elem.name)
+            if existing is not None:
+                if id(existing) != id(elem):
                     raise AssertionError(f"Robot has already a joint with name {elem.name}")
                 else:
                     return
-            self.parent_map[str(elem.child)] = (elem.name, elem.parent)
-            # self.parent_map[str(elem.name)] = (elem.name, elem.parent)
-            if elem.parent in self.child_map:
-                assert elem.name not in [j for j, l in self.child_map[elem.parent]], str(elem.to_yaml())
-                assert elem.child not in [l for j, l in self.child_map[elem.parent]], str(elem.to_yaml())
-                self.child_map[elem.parent].append((elem.name, elem.child))
-            else:
-                self.child_map[elem.parent] = [(elem.name, elem.child)]
-            if elem not in self.joints:
-                self.joints += [elem]
+            self._tree_insert_joint(elem)
+            self._joints += [elem]
+            self._index_appended_aggregate("joints")
         elif typeName in 'links':
-            if elem not in self.links:
-                if elem in [str(l) for l in self.links]:
+            existing = self.get_aggregate("link", str(elem))
+            if existing is not elem:
+                if existing is not None:
                     counter = 1
-                    while str(elem) + f"_{counter}" in [str(l) for l in self.links]:
+                    while self.get_aggregate("link", str(elem) + f"_{counter}") is not None:
                         counter += 1
                     if not silent:
                         log.debug(f"Renamed {typeName} {str(elem)} to {str(elem)}_{counter}")
                     elem.set_unique_name(str(elem) + f"_{counter}")
                 self.links += [elem]
+                self._index_appended_aggregate("links")
+                self._tree_version += 1
         else:
             if not typeName.endswith("s"):
                 typeName += "s"
-            # Collect all instances which have the same name
-            instances = []
             # Original list
             objects = getattr(self, typeName)
-            object_names = [str(obj) for obj in objects]
+            if typeName in self._INDEXED_AGGREGATES:
+                def name_exists(name):
+                    return self.get_aggregate(typeName, name) is not None
+            else:
+                object_names = set([str(obj) for obj in objects])
+
+                def name_exists(name):
+                    return name in object_names
             counter = 1
-            if elem.stringable() and str(elem) in object_names:
-                while str(elem) + f"_{counter}" in object_names:
+            if elem.stringable() and name_exists(str(elem)):
+                while name_exists(str(elem) + f"_{counter}"):
                     counter += 1
                 if not silent:
                     log.debug(f"Renamed {typeName} {str(elem)} to {str(elem)}_{counter}")
                 elem.set_unique_name(str(elem) + f"_{counter}")
             objects += [elem]
             setattr(self, typeName, objects)
+            if typeName in self._INDEXED_AGGREGATES:
+                self._index_appended_aggregate(typeName)
 
     def remove_aggregate(self, typeName, elem):
         """
@@ -410,6 +526,7 @@ class XMLRobot(Representation):
                     raise NotImplementedError("Deleting the root link, when is not yet possible!")
 
             assert child is not None, "This means the corresponding link has already been deleted"
+            self._invalidate_transformations()
             parent = self.get_link(joint.parent)
             if child.name in self.child_map.keys():
                 next_joints = [names[0] for names in self.child_map[child.name]]
@@ -419,21 +536,21 @@ class XMLRobot(Representation):
             # Get the transformation
             C_T_P = self.get_transformation(start=parent.name, end=child.name)
             # reparent the following joints
-            new_joints = []
-            for j in self.joints:
-                if str(j) != str(joint):
-                    if j.name in next_joints:
-                        _parent = self.get_parent(parent)
-                        if _parent is None:
-                            _parent = parent
-                        j.origin = representation.Pose.from_matrix(C_T_P.dot(j.origin.to_matrix()), relative_to=_parent)
-                        j.parent = parent.name
-                    new_joints += [j]
+            for jn in next_joints:
+                j = self.get_joint(jn)
+                _parent = self.get_parent(parent)
+                if _parent is None:
+                    _parent = parent
+                j.origin = representation.Pose.from_matrix(C_T_P.dot(j.origin.to_matrix()), relative_to=_parent)
+                j.parent = parent.name
+                self._tree_reparent_joint(j, old_parent=child.name)
             # remove the joint and links
-            self.joints = new_joints
+            self._tree_remove_joint(joint)
+            self._joints = [j for j in self._joints if str(j) != str(joint)]
+            self._index_removed_aggregate("joints", str(joint))
+            self._joints_need_sorting = len(self._joints) > 0
             self.links = [l for l in self.links if str(l) != str(child)]
-            assert str(joint) not in [str(nj) for nj in self.joints]
-            self.regenerate_tree_maps()
+            self._index_removed_aggregate("links", str(child))
             # check the consequences # Todo Has this to be moved to robot remove_joint?
             new_sensors = []
             for sensor in self.sensors:
@@ -464,6 +581,8 @@ class XMLRobot(Representation):
             # Original list
             objects = getattr(self, typeName)
             setattr(self, typeName, [o for o in objects if o is not elem])
+            if typeName in self._INDEXED_AGGREGATES:
+                self._index_removed_aggregate(typeName, str(elem))
 
     def add_link(self, link):
         if not isinstance(link, representation.Link):
@@ -498,13 +617,18 @@ class XMLRobot(Representation):
 
     def get_chain(self, root, tip, joints=True, links=True, fixed=True):
         assert root is not None
+        assert self.get_link(root, verbose=True) is not None
+        assert self.get_link(tip, verbose=True) is not None
+        tables = self._get_tree_tables()
+        if tables is not None:
+            r, t = tables["index"].get(str(root), None), tables["index"].get(str(tip), None)
+            if r is None or t is None or not r <= t < tables["tout"][r]:
+                raise KeyError(f"{tip} is not in chain between {root}->{tip} or this is not a valid chain from the robot's root ({self.get_root()})")
         chain = []
         if links:
             chain.append(str(tip))
         link = str(tip)
         while str(link) != str(root):
-            assert self.get_link(root, verbose=True) is not None
-            assert self.get_link(link, verbose=True) is not None
             try:
                 (joint, parent) = self.parent_map[link]
             except KeyError:
@@ -523,6 +647,15 @@ class XMLRobot(Representation):
         return str(self.get_root())
 
     def get_root(self):
+        root = self._tree_cache[1].get("root", None) \
+            if self._tree_cache is not None and self._tree_cache[0] == self._tree_version else None
+        if root is not None:
+            return root
+        root = self._find_root()
+        self._tree_cached("root", lambda: root)
+        return root
+
+    def _find_root(self):
         root = None
         for link in self.links:
             if link.name not in self.parent_map:
@@ -542,12 +675,115 @@ class XMLRobot(Representation):
         Returns:
             list: the rooty links
         """
+        return list(self._tree_cached("roots", self._find_roots))
+
+    def _find_roots(self):
         roots = []
         for link in self.links:
             if link.name not in self.parent_map:
                 roots.append(link)
         return roots
 
+    def _get_aggregate_index(self, targettype):
+        """
+        Returns the name->index map of the given aggregate list.
+        The map is rebuilt if the list has been replaced or its length changed since it has been indexed, otherwise
+        add_aggregate, remove_aggregate and rename keep it up to date. Aggregates that have been renamed directly
+        (e.g. link.name = ...) are only found again after regenerate_tree_maps().
+        :param targettype: the plural name of the aggregate list, one of _INDEXED_AGGREGATES
+        :return: dict name->index
+        """
+        if self._aggregate_index is None:
+            self._aggregate_index = {}
+        objects = self._get_aggregate_list(targettype)
+        cached = self._aggregate_index.get(targettype, None)
+        if cached is None or cached[0] is not objects or cached[1] != len(objects):
+            cached = self._build_aggregate_index(targettype)
+        return cached[2]
+
+    def _build_aggregate_index(self, targettype):
+        """
+        Indexes the given aggregate list from scratch
+        :return: the index entry (list, length, dict name->index)
+        """
+        objects = self._get_aggregate_list(targettype)
+        names = {}
+        for i, obj in enumerate(objects):
+            # keep the first occurrence as the linear search did
+            names.setdefault(str(obj), i)
+        self._aggregate_index[targettype] = (objects, len(objects), names)
+        return self._aggregate_index[targettype]
+
+    def _get_aggregate_list(self, targettype):
+        # the joints are accessed without sorting them as the order doesn't matter for the index
+        return self._joints if targettype == "joints" else getattr(self, targettype)
+
+    def _index_appended_aggregate(self, targettype):
+        """
+        Adds the last element of the given aggregate list to a still valid index instead of rebuilding it
+        """
+        if not self._aggregate_index or targettype not in self._aggregate_index:
+            return
+        objects = self._get_aggregate_list(targettype)
+        cached_objects, cached_length, names = self._aggregate_index[targettype]
+        if cached_objects is objects and cached_length == len(objects) - 1:
+            names.setdefault(str(objects[-1]), len(objects) - 1)
+            self._aggregate_index[targettype] = (objects, len(objects), names)
+
+    def _index_renamed_aggregate(self, targettype, old_name, new_name):
+        """
+        Moves the index entry of a renamed aggregate to its new name instead of rebuilding the index
+        """
+        if not self._aggregate_index or targettype not in self._aggregate_index:
+            return
+        names = self._aggregate_index[targettype][2]
+        index = names.pop(old_name, None)
+        if index is not None:
+            names.setdefault(new_name, index)
+
+    def _index_removed_aggregate(self, targettype, name):
+        """
+        Carries a still valid index over to the list that replaced the old one without the given aggregate
+        """
+        if not self._aggregate_index or targettype not in self._aggregate_index:
+            return
+        objects = self._get_aggregate_list(targettype)
+        _, cached_length, names = self._aggregate_index[targettype]
+        removed = names.pop(name, None)
+        if removed is None or cached_length != len(objects) + 1:
+            self._invalidate_aggregate_index(targettype)
+            return
+        for other, index in names.items():
+            if index > removed:
+                names[other] = index - 1
+        self._aggregate_index[targettype] = (objects, len(objects), names)
+
+    def _invalidate_aggregate_index(self, targettype=None):
+        """
+        Drops the name index of the given aggregate type or of all types if None is given
+        """
+        if self._aggregate_index is None:
+            return
+        if targettype is None:
+            self._aggregate_index = {}
+        else:
+            self._aggregate_index.pop(targettype, None)
+
+    def _lookup_aggregate(self, targettype, name):
+        """
+        Looks up the aggregate with the given name via the index
+        :return: (index, instance) or (None, None) if not found
+        """
+        objects = self._get_aggregate_list(targettype)
+        index = self._get_aggregate_index(targettype).get(name, None)
+        if index is not None and str(objects[index]) != name:
+            # the list has been reordered in place, reindex once
+            self._build_aggregate_index(targettype)
+            index = self._get_aggregate_index(targettype).get(name, None)
+        if index is None:
+            return None, None
+        return index, objects[index]
+
     def get_aggregate(self, targettype, target, verbose=False):
         """
         Returns the id of the given instance
@@ -557,9 +793,15 @@ class XMLRobot(Representation):
         """
         if type(target) == list:
             return [self.get_aggregate(targettype, str(t)) for t in target]
-        names = []
         if not targettype.endswith("s"):
             targettype += "s"
+        if targettype in self._INDEXED_AGGREGATES:
+            _, obj = self._lookup_aggregate(targettype, str(target))
+            if obj is None and verbose:
+                log.warning(f"Robot {self.name} has no {targettype} with name {target}, "
+                            f"only these: {repr([str(o) for o in getattr(self, targettype)])}")
+            return obj
+        names = []
         for obj in getattr(self, targettype):
             names.append(str(obj))
             if str(obj) == str(target):
@@ -710,6 +952,11 @@ class XMLRobot(Representation):
         :param target: the name of the searched instance
         :return: the id or None if not found
         """
+        if targettype in self._INDEXED_AGGREGATES and type(target) == str:
+            # make sure pending sorting is done, so that the index refers to the current order
+            getattr(self, targettype)
+            index, _ = self._lookup_aggregate(targettype, target)
+            return index
         for i, obj in enumerate(getattr(self, targettype)):
             if obj.name == target:
                 return i
@@ -748,6 +995,9 @@ class XMLRobot(Representation):
         """
         Returns the depth of the given link in the robots kinematic tree
         """
+        tables = self._get_tree_tables()
+        if tables is not None and str(linkname) in tables["index"]:
+            return tables["depth"][tables["index"][str(linkname)]]
         parent = self.get_parent(linkname)
         level = 0
         while parent is not None:
@@ -756,9 +1006,99 @@ class XMLRobot(Representation):
             level += 1
         return level
 
+    def _get_tree_tables(self):
+        """
+        Returns the ancestor tables of the kinematic tree, which are cached until the tree is changed:
+            - order: the link names in pre-order, so that the subtree of a link is order[tin:tout]
+            - index: link name -> position in order (= tin)
+            - tout: the end of the subtree interval per link
+            - depth: the depth per link
+            - up: binary lifting table, up[k][i] is the index of the 2^k-th ancestor of link i
+        Returns None if the robot has not exactly one root.
+        """
+        if len(self._tree_cached("roots", self._find_roots)) != 1:
+            return None
+        return self._tree_cached("tables", self._generate_tree_tables)
+
+    def _generate_tree_tables(self):
+        root = str(self.get_root())
+        order = []
+        parent = []
+        depth = []
+        tout = []
+        # iterative depth first traversal, an entry with index >= 0 closes the interval of that link
+        stack = [(root, 0, 0)]
+        while stack:
+            link, parent_index, closing = stack.pop()
+            if closing:
+                tout[parent_index] = len(order)
+                continue
+            index = len(order)
+            order.append(link)
+            parent.append(parent_index)
+            depth.append(depth[parent_index] + 1 if index > 0 else 0)
+            tout.append(None)
+            stack.append((link, index, 1))
+            for _, child in reversed(self.child_map.get(link, [])):
+                stack.append((child, index, 0))
+        up = [parent]
+        for _ in range(max(depth).bit_length() if len(depth) > 0 else 0):
+            up.append([up[-1][a] for a in up[-1]])
+        return {
+            "order": order,
+            "index": {ln: i for i, ln in enumerate(order)},
+            "tout": tout,
+            "depth": depth,
+            "up": up
+        }
+
+    def is_ancestor(self, ancestor, link):
+        """
+        Returns whether ancestor is an ancestor of link or the link itself
+        """
+        tables = self._get_tree_tables()
+        if tables is None:
+            link = str(link)
+            while link != str(ancestor):
+                if link not in self.parent_map:
+                    return False
+                link = self.parent_map[link][1]
+            return True
+        a, l = tables["index"].get(str(ancestor), None), tables["index"].get(str(link), None)
+        if a is None or l is None:
+            return False
+        return a <= l < tables["tout"][a]
+
+    def get_lowest_common_ancestor(self, link_a, link_b):
+        """
+        Returns the name of the deepest link that is an ancestor (or the link itself) of both given links
+        """
+        tables = self._get_tree_tables()
+        assert tables is not None, "The robot has not exactly one root"
+        index, tout, up = tables["index"], tables["tout"], tables["up"]
+        a, b = index[str(link_a)], index[str(link_b)]
+        if a <= b < tout[a]:
+            return tables["order"][a]
+        if b <= a < tout[b]:
+            return tables["order"][b]
+        for k in reversed(range(len(up))):
+            candidate = up[k][a]
+            if not (candidate <= b < tout[candidate]):
+                a = candidate
+        return tables["order"][up[0][a]]
+
+    def get_subtree_links(self, start):
+        """
+        Returns the names of the given link and all links below it in pre-order
+        """
+        tables = self._get_tree_tables()
+        assert tables is not None, "The robot has not exactly one root"
+        i = tables["index"][str(start)]
+        return tables["order"][i:tables["tout"][i]]
+
     def get_joints_ordered_df(self, **kwargs):
         """Returns the joints in depth first order"""
-        return get_joints_depth_first(self, self.get_root())
+        return list(self._tree_cached("joints_df", lambda: get_joints_depth_first(self, self.get_root())))
 
     def get_links_ordered_df(self, ignore_indep=False):
         """Returns the joints in depth first order"""
@@ -774,6 +1114,8 @@ class XMLRobot(Representation):
         """
         if isinstance(material_name, representation.Material):
             return material_name
+        if type(material_name) == str:
+            return self.get_aggregate("materials", material_name)
         for mat in self.materials:
             if mat.name == material_name:
                 return mat
@@ -846,6 +1188,18 @@ class XMLRobot(Representation):
             return all_leaves
         else:
             assert self.get_link(start, verbose=True) is not None
+        tables = self._get_tree_tables()
+        if tables is not None:
+            index, tout = tables["index"], tables["tout"]
+            s = index[str(start)]
+            leaves = [leave for leave in all_leaves if s <= index[leave] < tout[s]]
+            if stop is not None:
+                # reduce to only those stops that are in the tree with "start" as root
+                stop = [str(st) for st in stop if str(st) in index and s < index[str(st)] < tout[s]]
+                # remove leaves of branches that are stopped and add the stops therefore
+                stopped = [(index[st], tout[index[st]]) for st in stop]
+                leaves = [leave for leave in leaves if not any([a <= index[leave] < b for a, b in stopped])] + stop
+            return leaves
         chains_to_leave = {str(leave): [str(link) for link in self.get_chain(self.get_root(), leave, joints=False)] for leave in all_leaves}
         # reduce to valid chains regarding the start
         if str(start) != str(self.get_root()):
@@ -858,59 +1212,147 @@ class XMLRobot(Representation):
             leaves = [l for l in leaves if not any([s in chains_to_leave[l] for s in stop])] + stop
         return leaves
 
-    def get_transformation(self, end, start=None, end_type=None):
+    def _invalidate_transformations(self):
         """
-        Returns the transformation from start to end
-        :param end: the end link of the transformation
-        :param start: the start link of the transformation (default is root)
-        :return: the transformation matrix
+        Drops all cached transformations. Called on every structural change of the tree.
+        Changes of the origins themselves are detected by _get_root_transformation.
         """
-        assert end is not None
-        if start is None:
-            start = self.get_root()
-            root2start = np.identity(4)
-        else:
-            root2start = self.get_transformation(start)
+        self._transformation_cache = {}
+        self._transformation_cache_root = None
 
-        if start == end:
-            return np.identity(4)
-        frame = None
-        l_frame = self.get_link(end)
-        j_frame = self.get_joint(end)
+    def _get_transformation_frame(self, end, end_type=None):
+        l_frame = self.get_link(end) if end_type in [None, "link"] else None
+        j_frame = self.get_joint(end) if end_type == "joint" or (end_type is None and l_frame is None) else None
         if end_type == "link" and l_frame is not None:
-            frame = l_frame
+            return l_frame
         elif end_type == "link":
             raise AssertionError(f"There is no link with name {end}")
         elif end_type == "joint" and j_frame is not None:
-            frame = j_frame
+            return j_frame
         elif end_type == "joint":
             raise AssertionError(f"There is no link with name {end}")
         elif end_type is None and l_frame is not None:
-            frame = l_frame
+            return l_frame
         elif end_type is None and j_frame is not None:
-            frame = j_frame
+            return j_frame
         elif end_type is None:
             raise AssertionError(f"There is neither a joint nor a link with name {end}")
+        raise KeyError("Unknown end_type given to get_transformation")
+
+    def _is_cached_transformation_valid(self, frame):
+        """
+        Checks whether the cached root transformation of frame and of all frames it depends on are still valid,
+        i.e. neither an origin has been replaced nor has it been changed since the transformation has been cached and
+        the predecessors' transformations are still the ones it has been computed from.
+        This is O(1) as long as no watched origin has been edited since the entry has been validated, otherwise the
+        chain of entries is checked once.
+        """
+        first = self._transformation_cache.get(id(frame), None)
+        if first is None or first[0] is not frame:
+            return False
+        edit_version = representation.get_edit_version()
+        if first[6] == edit_version:
+            return True
+        entry = first
+        while entry is not None:
+            _frame, origin, version, relative_to, parent_frame, parent_entry, _, _ = entry
+            if _frame is not frame or frame.origin is not origin:
+                return False
+            if origin is not None and (origin._version != version or str(origin.relative_to) != relative_to):
+                return False
+            if parent_frame is None:
+                first[6] = edit_version
+                return True
+            entry = self._transformation_cache.get(id(parent_frame), None)
+            if entry is not parent_entry:
+                return False
+            frame = parent_frame
+        return False
+
+    def _get_root_transformation(self, frame):
+        """
+        Returns the (cached) transformation from the root to the given link or joint instance.
+        The returned array is owned by the cache and must not be modified.
+        """
+        if self._transformation_cache is None:
+            self._transformation_cache = {}
+        if self._is_cached_transformation_valid(frame):
+            return self._transformation_cache[id(frame)][-1]
+        if self._transformation_cache_root is None:
+            self._transformation_cache_root = str(self.get_root())
+        origin = frame.origin
+        if isinstance(frame, representation.Link) and origin is None:
+            parent = self.get_parent(frame)
+            parent_frame = self.get_joint(parent) if parent is not None else None
+            T = np.identity(4) if parent_frame is None else self._get_root_transformation(parent_frame)
+        elif self._transformation_cache_root == str(origin.relative_to):
+            parent_frame = None
+            T = np.array(origin.to_matrix())
+        else:
+            parent_frame = self._get_transformation_frame(origin.relative_to)
+            T = self._get_root_transformation(parent_frame).dot(origin.to_matrix())
+        representation.watch_edits(frame, origin)
+        self._transformation_cache[id(frame)] = [
+            frame, origin, origin._version if origin is not None else None,
+            str(origin.relative_to) if origin is not None else None,
+            parent_frame, self._transformation_cache[id(parent_frame)] if parent_frame is not None else None,
+            representation.get_edit_version(), T
+        ]
+        return T
+
+    def get_transformation(self, end, start=None, end_type=None):
+        """
+        Returns the transformation from start to end.
+        The transformations from the root are cached and only recomputed for the frames whose origin (or one of its
+        predecessors' origin) has changed.
+        :param end: the end link of the transformation
+        :param start: the start link of the transformation (default is root)
+        :return: the transformation matrix
+        """
+        assert end is not None
+        if start is None:
+            start = self.get_root() if self._transformation_cache_root is None else self._transformation_cache_root
+            root2start = None
         else:
-            raise KeyError("Unknown end_type given to get_transformation")
+            root2start = self.get_transformation(start)
+
+        if start == end:
+            return np.identity(4)
+        frame = self._get_transformation_frame(end, end_type=end_type)
 
         if isinstance(frame, representation.Link) and frame.origin is None:
             parent = self.get_parent(frame)
             if parent is None:
                 # end == root
-                return inv(root2start)
+                return inv(root2start) if root2start is not None else np.identity(4)
             else:
                 return self.get_transformation(end=parent, start=start, end_type="joint")
         elif str(start) == str(frame.origin.relative_to):
             return frame.origin.to_matrix()
         else:
             try:
-                root2end = self.get_transformation(frame.origin.relative_to).dot(frame.origin.to_matrix())
+                root2end = self._get_root_transformation(frame)
             except RecursionError:
                 raise ReferenceError(f"The transformation of root to {end} can not be determined. "
                                      f"No valid relative_to chain to root.")
+            if root2start is None:
+                return np.array(root2end)
             return inv(root2start).dot(root2end)
 
+    def get_transformations(self, ends, start=None, end_type=None):
+        """
+        Returns the transformations from start to each of the given ends
+        :param ends: list of the end links/joints of the transformations
+        :param start: the start link of the transformations (default is root)
+        :return: numpy array of shape (N, 4, 4)
+        """
+        if len(ends) == 0:
+            return np.zeros((0, 4, 4))
+        root2ends = np.stack([self.get_transformation(end, end_type=end_type) for end in ends])
+        if start is None:
+            return root2ends
+        return np.matmul(inv(self.get_transformation(start)), root2ends)
+
     def global_origin(self, stop):
         """ Get the global pose of the link.
         """
@@ -1,3 +1,5 @@
+import math
+
 import numpy
 
 # Lazy import trimesh - it's an optional dependency
@@ -8,8 +10,6 @@ try:
 except ImportError:
     pass  # trimesh is optional
 
-from .transform import angle_between_vectors
-
 
 def calculateBoxInertia(mass, size):
     """Returns upper diagonal of inertia tensor of a box as tuple.
@@ -96,7 +96,7 @@ def calculateEllipsoidInertia(mass, size):
     return ixx, ixy, ixz, iyy, iyz, izz
 
 
-def calculateMeshInertia(mass, data, scale=None):
+def calculateMeshInertia(mass, data, scale=None, float64_accumulation=False):
     """Calculates and returns the inertia tensor of arbitrary mesh objects.
 
     Implemented after the general idea of 'Finding the Inertia Tensor of a 3D Solid Body,
@@ -113,15 +113,14 @@ def calculateMeshInertia(mass, data, scale=None):
       data(bpy.types.BlendData): mesh data of the object
       mass(float): mass of the object
       scale(list): scale vector
+      float64_accumulation(bool): if True the volume and the inertia are summed up over the triangles with
+        math.fsum() in float64, which is exactly rounded, otherwise numpy's pairwise summation is used
     Returns:
       6: inertia tensor
     """
     if scale is None:
         scale = [1.0, 1.0, 1.0]
     scale = numpy.asarray(scale)
-    tetrahedra = []
-    mesh_volume = 0
-    origin = numpy.array((0.0, 0.0, 0.0))
     vertices = None
     faces = None
     triangle_normals = None
@@ -149,219 +148,125 @@ def calculateMeshInertia(mass, data, scale=None):
             raise TypeError("Invalid mesh type " + repr(type(data)))
 
     if vertices is None:
-        vertices = numpy.asarray([numpy.asarray(scale * v) for v in data.vertices])
+        vertices = numpy.asarray(data.vertices) * scale
     if faces is None:
         faces = data.faces
     if triangle_normals is None:
         triangle_normals = data.face_normals
+    return calculatePolygonInertia(mass, vertices, faces, triangle_normals, float64_accumulation=float64_accumulation)
 
-    quads = []
-    triangles = []
-    for face in faces:
-        if len(face) == 4:
-            if trimesh is not None:
-                tris = trimesh.geometry.triangulate_quads(quads)
-                triangles += tris
-            else:
-                # Fallback: split quad into two triangles
+
+def calculatePolygonInertia(mass, vertices, faces, face_normals, float64_accumulation=False):
+    """Calculates and returns the inertia tensor of a closed polygon mesh (see calculateMeshInertia()).
+
+    Args:
+      mass(float): mass of the object
+      vertices(N, 3): the scaled vertices
+      faces: (F, 3) triangles or list of triangles and quads, the quads are split into two triangles
+      face_normals(F, 3): the normal of each face
+      float64_accumulation(bool): see calculateMeshInertia()
+    Returns:
+      6: inertia tensor
+    """
+    vertices = numpy.asarray(vertices)
+    triangle_normals = face_normals
+    faces_array = faces if isinstance(faces, numpy.ndarray) and faces.ndim == 2 else None
+    triangle_normals = numpy.asarray(triangle_normals)
+    if faces_array is None or faces_array.shape[1] != 3:
+        # split the quads into two triangles which keep the normal of their quad
+        triangles = []
+        normal_indices = []
+        for i, face in enumerate(faces):
+            if len(face) == 4:
                 triangles += [[face[0], face[1], face[2]], [face[0], face[2], face[3]]]
-        else:
-            triangles += [face]
+                normal_indices += [i, i]
+            else:
+                triangles += [face]
+                normal_indices += [i]
+        faces_array = numpy.asarray(triangles, dtype=int).reshape(-1, 3)
+        triangle_normals = triangle_normals[normal_indices]
 
     com = numpy.mean(vertices, axis=0)
     vertices = vertices - com[numpy.newaxis]
 
-    mesh_volume = 0.0
-    signs = []
-    abs_det_Js = []
-    Js = []
+    # (F, 3, 3) array of the triangles' vertices, the fourth vertex of each tetrahedron is the origin (= com)
+    verts = vertices[faces_array]
+    triangle_centers = numpy.mean(verts, axis=1)
+    with numpy.errstate(invalid="ignore", divide="ignore"):
+        normal_angles = numpy.arccos(numpy.einsum("ij,ij->i", triangle_centers, triangle_normals) / (
+            numpy.linalg.norm(triangle_centers, axis=1) * numpy.linalg.norm(triangle_normals, axis=1)))
+    signs = numpy.where(normal_angles > numpy.pi / 2.0, -1.0, 1.0).astype(vertices.dtype)
+    # the determinant of the tetrahedron's jacobian is the triple product of the triangle's vertices
+    det_Js = numpy.einsum("ij,ij->i", verts[:, 0], numpy.cross(verts[:, 1], verts[:, 2]))
+    signed_dets = signs * det_Js
+
+    # second moments of the tetrahedra: M_kl = sum_i v_ik * v_il + (sum_i v_ik) * (sum_i v_il)
+    vertex_sums = numpy.sum(verts, axis=1)
+    moments = numpy.einsum("fik,fil->fkl", verts, verts) + vertex_sums[:, :, numpy.newaxis] * vertex_sums[:, numpy.newaxis, :]
+    if float64_accumulation:
+        mesh_volume = math.fsum(signed_dets) / 6.0
+        covariance = numpy.array([[math.fsum(signed_dets * moments[:, k, l]) for l in range(3)] for k in range(3)])
+    else:
+        mesh_volume = numpy.sum(signed_dets) / 6.0
+        covariance = numpy.einsum("f,fkl->kl", signed_dets, moments)
 
-    for triangle_idx in range(len(triangles)):
-        verts = vertices[triangles[triangle_idx]]
-        triangle_normal = triangle_normals[triangle_idx]
-        triangle_center = numpy.mean(verts, axis=0)
-        normal_angle = angle_between_vectors(triangle_center, triangle_normal)
-        sign = -1.0 if normal_angle > numpy.pi / 2.0 else 1.0
-
-        J = numpy.array([
-            [verts[0, 0], verts[0, 1], verts[0, 2], 1.0],
-            [verts[1, 0], verts[1, 1], verts[1, 2], 1.0],
-            [verts[2, 0], verts[2, 1], verts[2, 2], 1.0],
-            [0.0, 0.0, 0.0, 1.0],
-        ])
+    density = mass / mesh_volume
+    covariance = density * covariance / 120
 
-        abs_det_J = numpy.linalg.det(J)
+    I = numpy.trace(covariance) * numpy.identity(3) - covariance
+    return I[0][0], I[0][1], I[0][2], I[1][1], I[1][2], I[2][2]
 
-        signs.append(sign)
-        abs_det_Js.append(abs_det_J)
-        Js.append(J)
 
-        volume = sign * abs_det_J / 6.0
-        mesh_volume += volume
+def calculateMeshMassProperties(meshes):
+    """Returns the volume, the center of mass and the inertia tensor at unit density of each of the given meshes.
 
-    signs = numpy.array(signs)
-    abs_det_Js = numpy.array(abs_det_Js)
-    Js = numpy.array(Js)
+    The volume integrals of all triangles of all meshes are evaluated in one batch. Each triangle spans a
+    tetrahedron with the mean of its mesh's vertices, which is signed by the triangle's winding, hence the
+    meshes have to be closed and consistently wound (e.g. trimesh.Trimesh.is_volume).
 
-    density = mass / mesh_volume
+    Args:
+      meshes(list): list of (vertices, faces) tuples with vertices(N, 3) and triangles(F, 3)
 
-    A = (signs
-         * density
-         * abs_det_Js
-         * (Js[:, 0, 1] ** 2
-            + Js[:, 0, 1] * Js[:, 1, 1]
-            + Js[:, 1, 1] ** 2
-            + Js[:, 0, 1] * Js[:, 2, 1]
-            + Js[:, 1, 1] * Js[:, 2, 1]
-            + Js[:, 2, 1] ** 2
-            + Js[:, 0, 1] * Js[:, 3, 1]
-            + Js[:, 1, 1] * Js[:, 3, 1]
-            + Js[:, 2, 1] * Js[:, 3, 1]
-            + Js[:, 3, 1] ** 2
-            + Js[:, 0, 2] ** 2
-            + Js[:, 0, 2] * Js[:, 1, 2]
-            + Js[:, 1, 2] ** 2
-            + Js[:, 0, 2] * Js[:, 2, 2]
-            + Js[:, 1, 2] * Js[:, 2, 2]
-            + Js[:, 2, 2] ** 2
-            + Js[:, 0, 2] * Js[:, 3, 2]
-            + Js[:, 1, 2] * Js[:, 3, 2]
-            + Js[:, 2, 2] * Js[:, 3, 2]
-            + Js[:, 3, 2] ** 2
-            )
-         / 60
-         )
-
-    B = (signs
-         * density
-         * abs_det_Js
-         * (
-                 Js[:, 0, 0] ** 2
-                 + Js[:, 0, 0] * Js[:, 1, 0]
-                 + Js[:, 1, 0] ** 2
-                 + Js[:, 0, 0] * Js[:, 2, 0]
-                 + Js[:, 1, 0] * Js[:, 2, 0]
-                 + Js[:, 2, 0] ** 2
-                 + Js[:, 0, 0] * Js[:, 3, 0]
-                 + Js[:, 1, 0] * Js[:, 3, 0]
-                 + Js[:, 2, 0] * Js[:, 3, 0]
-                 + Js[:, 3, 0] ** 2
-                 + Js[:, 0, 2] ** 2
-                 + Js[:, 0, 2] * Js[:, 1, 2]
-                 + Js[:, 1, 2] ** 2
-                 + Js[:, 0, 2] * Js[:, 2, 2]
-                 + Js[:, 1, 2] * Js[:, 2, 2]
-                 + Js[:, 2, 2] ** 2
-                 + Js[:, 0, 2] * Js[:, 3, 2]
-                 + Js[:, 1, 2] * Js[:, 3, 2]
-                 + Js[:, 2, 2] * Js[:, 3, 2]
-                 + Js[:, 3, 2] ** 2
-         )
-         / 60
-         )
-
-    C = (signs
-         * density
-         * abs_det_Js
-         * (
-                 Js[:, 0, 0] ** 2
-                 + Js[:, 0, 0] * Js[:, 1, 0]
-                 + Js[:, 1, 0] ** 2
-                 + Js[:, 0, 0] * Js[:, 2, 0]
-                 + Js[:, 1, 0] * Js[:, 2, 0]
-                 + Js[:, 2, 0] ** 2
-                 + Js[:, 0, 0] * Js[:, 3, 0]
-                 + Js[:, 1, 0] * Js[:, 3, 0]
-                 + Js[:, 2, 0] * Js[:, 3, 0]
-                 + Js[:, 3, 0] ** 2
-                 + Js[:, 0, 1] ** 2
-                 + Js[:, 0, 1] * Js[:, 1, 1]
-                 + Js[:, 1, 1] ** 2
-                 + Js[:, 0, 1] * Js[:, 2, 1]
-                 + Js[:, 1, 1] * Js[:, 2, 1]
-                 + Js[:, 2, 1] ** 2
-                 + Js[:, 0, 1] * Js[:, 3, 1]
-                 + Js[:, 1, 1] * Js[:, 3, 1]
-                 + Js[:, 2, 1] * Js[:, 3, 1]
-                 + Js[:, 3, 1] ** 2
-         )
-         / 60
-         )
-
-    A_bar = (signs
-             * density
-             * abs_det_Js
-             * (2 * Js[:, 0, 1] * Js[:, 0, 2]
-                + Js[:, 1, 1] * Js[:, 0, 2]
-                + Js[:, 2, 1] * Js[:, 0, 2]
-                + Js[:, 3, 1] * Js[:, 0, 2]
-                + Js[:, 0, 1] * Js[:, 1, 2]
-                + 2 * Js[:, 1, 1] * Js[:, 1, 2]
-                + Js[:, 2, 1] * Js[:, 1, 2]
-                + Js[:, 3, 1] * Js[:, 1, 2]
-                + Js[:, 0, 1] * Js[:, 2, 2]
-                + Js[:, 1, 1] * Js[:, 2, 2]
-                + 2 * Js[:, 2, 1] * Js[:, 2, 2]
-                + Js[:, 3, 1] * Js[:, 2, 2]
-                + Js[:, 0, 1] * Js[:, 3, 2]
-                + Js[:, 1, 1] * Js[:, 3, 2]
-                + Js[:, 2, 1] * Js[:, 3, 2]
-                + 2 * Js[:, 3, 1] * Js[:, 3, 2]
-                )
-             / 120
-             )
-
-    B_bar = (signs
-             * density
-             * abs_det_Js
-             * (2 * Js[:, 0, 0] * Js[:, 0, 2]
-                + Js[:, 1, 0] * Js[:, 0, 2]
-                + Js[:, 2, 0] * Js[:, 0, 2]
-                + Js[:, 3, 0] * Js[:, 0, 2]
-                + Js[:, 0, 0] * Js[:, 1, 2]
-                + 2 * Js[:, 1, 0] * Js[:, 1, 2]
-                + Js[:, 2, 0] * Js[:, 1, 2]
-                + Js[:, 3, 0] * Js[:, 1, 2]
-                + Js[:, 0, 0] * Js[:, 2, 2]
-                + Js[:, 1, 0] * Js[:, 2, 2]
-                + 2 * Js[:, 2, 0] * Js[:, 2, 2]
-                + Js[:, 3, 0] * Js[:, 2, 2]
-                + Js[:, 0, 0] * Js[:, 3, 2]
-                + Js[:, 1, 0] * Js[:, 3, 2]
-                + Js[:, 2, 0] * Js[:, 3, 2]
-                + 2 * Js[:, 3, 0] * Js[:, 3, 2]
-                )
-             / 120
-             )
-
-    C_bar = (signs
-             * density
-             * abs_det_Js
-             * (2 * Js[:, 0, 0] * Js[:, 0, 1]
-                + Js[:, 1, 0] * Js[:, 0, 1]
-                + Js[:, 2, 0] * Js[:, 0, 1]
-                + Js[:, 3, 0] * Js[:, 0, 1]
-                + Js[:, 0, 0] * Js[:, 1, 1]
-                + 2 * Js[:, 1, 0] * Js[:, 1, 1]
-                + Js[:, 2, 0] * Js[:, 1, 1]
-                + Js[:, 3, 0] * Js[:, 1, 1]
-                + Js[:, 0, 0] * Js[:, 2, 1]
-                + Js[:, 1, 0] * Js[:, 2, 1]
-                + 2 * Js[:, 2, 0] * Js[:, 2, 1]
-                + Js[:, 3, 0] * Js[:, 2, 1]
-                + Js[:, 0, 0] * Js[:, 3, 1]
-                + Js[:, 1, 0] * Js[:, 3, 1]
-                + Js[:, 2, 0] * Js[:, 3, 1]
-                + 2 * Js[:, 3, 0] * Js[:, 3, 1]
-                )
-             / 120
-             )
-
-    a_bar = -numpy.sum(A_bar)
-    b_bar = -numpy.sum(B_bar)
-    c_bar = -numpy.sum(C_bar)
-
-    I = numpy.array([[numpy.sum(A), c_bar, b_bar],
-                     [c_bar, numpy.sum(B), a_bar],
-                     [b_bar, a_bar, numpy.sum(C)]])
-    return I[0][0], I[0][1], I[0][2], I[1][1], I[1][2], I[2][2]
\ No newline at end of file
+    Returns:
+      : tuple of the volumes (M,), the centers of mass (M, 3) and the inertia tensors about them (M, 3, 3)
+    """
+    n_meshes = len(meshes)
+    if n_meshes == 0:
+        return numpy.zeros(0), numpy.zeros((0, 3)), numpy.zeros((0, 3, 3))
+    references = numpy.zeros((n_meshes, 3))
+    verts = []
+    mesh_ids = []
+    for i, (vertices, faces) in enumerate(meshes):
+        vertices = numpy.asarray(vertices, dtype=numpy.float64)
+        references[i] = numpy.mean(vertices, axis=0)
+        faces = numpy.asarray(faces, dtype=int).reshape(-1, 3)
+        verts.append((vertices - references[i])[faces])
+        mesh_ids.append(numpy.full(len(faces), i))
+    # (F, 3, 3) array of the triangles' vertices of all meshes, the fourth vertex of each tetrahedron is the reference
+    verts = numpy.concatenate(verts)
+    mesh_ids = numpy.concatenate(mesh_ids)
+
+    dets = numpy.einsum("ij,ij->i", verts[:, 0], numpy.cross(verts[:, 1], verts[:, 2]))
+    vertex_sums = numpy.sum(verts, axis=1)
+    moments = numpy.einsum("fik,fil->fkl", verts, verts) + vertex_sums[:, :, numpy.newaxis] * vertex_sums[:, numpy.newaxis, :]
+
+    def sum_per_mesh(values):
+        values = values.reshape(len(mesh_ids), -1)
+        return numpy.stack([numpy.bincount(mesh_ids, weights=values[:, k], minlength=n_meshes)
+                            for k in range(values.shape[1])], axis=1)
+
+    volumes = sum_per_mesh(dets)[:, 0] / 6.0
+    first_moments = sum_per_mesh(dets[:, numpy.newaxis] * vertex_sums) / 24.0
+    covariances = sum_per_mesh(dets[:, numpy.newaxis, numpy.newaxis] * moments).reshape(n_meshes, 3, 3) / 120.0
+
+    # meshes that are wound inwards have a negative volume
+    signs = numpy.sign(volumes)
+    volumes = signs * volumes
+    first_moments = signs[:, numpy.newaxis] * first_moments
+    covariances = signs[:, numpy.newaxis, numpy.newaxis] * covariances
+
+    coms = first_moments / volumes[:, numpy.newaxis]
+    # move the covariances from the reference to the center of mass
+    covariances -= volumes[:, numpy.newaxis, numpy.newaxis] * coms[:, :, numpy.newaxis] * coms[:, numpy.newaxis, :]
+    inertias = numpy.trace(covariances, axis1=1, axis2=2)[:, numpy.newaxis, numpy.newaxis] * numpy.identity(3) - covariances
+    return volumes, coms + references, inertias
@@ -28,6 +28,50 @@ def abspath(in_path, base=os.getcwd()):
     return os.path.normpath(os.path.expanduser(os.path.expandvars(out)))
 
 
+def _escape_pretty_xml(data):
+    return data.replace("&", "&amp;").replace("<", "&lt;").replace("\"", "&quot;").replace(">", "&gt;")
+
+
+def _write_pretty_xml(xml, out, indent, addindent):
+    if not isinstance(xml.tag, str):
+        # comments and processing instructions
+        out.append(f"{indent}<!--{xml.text}-->\n")
+        return
+    out.append(indent + "<" + xml.tag)
+    for name, value in xml.attrib.items():
+        out.append(f' {name}="{_escape_pretty_xml(value)}"')
+    nodes = [xml.text] if xml.text else []
+    for child in xml:
+        nodes.append(child)
+        if child.tail:
+            nodes.append(child.tail)
+    if len(nodes) == 0:
+        out.append("/>\n")
+    elif len(nodes) == 1 and type(nodes[0]) == str:
+        out.append(">" + _escape_pretty_xml(nodes[0]) + "</" + xml.tag + ">\n")
+    else:
+        out.append(">\n")
+        for node in nodes:
+            if type(node) == str:
+                out.append(_escape_pretty_xml(indent + addindent + node + "\n"))
+            else:
+                _write_pretty_xml(node, out, indent + addindent, addindent)
+        out.append(indent + "</" + xml.tag + ">\n")
+
+
+def to_pretty_xml_element_string(xml, indent="", addindent="  "):
+    """
+    Pretty prints the given element the same way to_pretty_xml_string() does, but without the round trip through
+    minidom and starting at the given indentation. This is used to write large xml files element by element.
+
+    Returns:
+        the pretty xml string of the element, ending with a newline
+    """
+    out = []
+    _write_pretty_xml(xml, out, indent, addindent)
+    return "".join(out)
+
+
 def to_pretty_xml_string(xml):
     if type(xml) == str:
         xml_string = xml
@@ -175,17 +219,22 @@ def deserialize(string: str, key=None):
     string = string.strip()
     if " " in string and not key in ["uri", "url", "file", "filepath", "filename"]:
         _list = string.split()
-        if all([is_int(v) for v in _list]):
+        # converting the whole list at once is the same as checking each value with is_int()/is_float() first
+        try:
             return [int(v) for v in _list]
-        elif all([is_float(v) for v in _list]):
+        except ValueError:
+            pass
+        try:
             return [float(v) for v in _list]
-        else:
+        except ValueError:
             return _list
-    elif is_int(string):
+    try:
         return int(string)
-    elif is_float(string):
+    except ValueError:
+        pass
+    try:
         return float(string)
-    else:
+    except ValueError:
         return string
 
 
@@ -107,6 +107,35 @@ def inv(T):
     return np.linalg.inv(T)
 
 
+def axis_angle_to_matrices(axis, angles):
+    """
+    Returns the rotation matrices of shape (B, 3, 3) for rotating around the given axis by each of the B angles
+    """
+    x, y, z = np.array(axis, dtype=float) / np.linalg.norm(axis)
+    K = np.array([[0, -z, y], [z, 0, -x], [-y, x, 0]])
+    angles = np.asarray(angles, dtype=float)
+    return np.identity(3)[None, :, :] + np.sin(angles)[:, None, None] * K[None, :, :] + \
+        (1 - np.cos(angles))[:, None, None] * K.dot(K)[None, :, :]
+
+
+def joint_transformations(joint_type, axis, positions):
+    """
+    Returns the homogeneous transformations of shape (B, 4, 4) a joint of the given type applies for each of the B
+    joint positions. As in URDF the axis defaults to [1, 0, 0] if it is None.
+    """
+    if axis is None:
+        axis = [1, 0, 0]
+    positions = np.asarray(positions, dtype=float)
+    T = np.tile(np.identity(4), (len(positions), 1, 1))
+    if joint_type in ["revolute", "continuous"]:
+        T[:, 0:3, 0:3] = axis_angle_to_matrices(axis, positions)
+    elif joint_type == "prismatic":
+        T[:, 0:3, 3] = positions[:, None] * (np.array(axis, dtype=float) / np.linalg.norm(axis))[None, :]
+    elif joint_type != "fixed":
+        raise ValueError(f"Joint type {joint_type} is not supported")
+    return T
+
+
 def get_adjoint(T: np.ndarray):
     R = T[0:3, 0:3]
     P = skew_symmetric(T[0:3, 3])
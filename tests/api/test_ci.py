@@ -0,0 +1,124 @@
+import os
+import shutil
+import unittest
+
+from phobos.ci.base_model import BaseModel
+from phobos.ci.pipeline import Pipeline
+from phobos.utils import git
+
+
+class DummyModel(object):
+    def __init__(self, configkey, derived_from=None, input_file=None, root=None):
+        self.configkey = configkey
+        self.modelname = configkey
+        self.input_models = {d: {"derived_base": d + ".yml"} for d in (derived_from or [])}
+        self.config_hash = configkey
+        self.input_file = input_file
+        if root is not None:
+            self.exportdir = os.path.join(root, "temp", configkey, "export")
+            self.tempdir = os.path.join(root, "temp", configkey)
+        self.n_processed = 0
+        self.processed_meshes = set()
+
+    def get_input_files(self):
+        return [self.input_file] if self.input_file is not None else []
+
+    def process(self):
+        self.n_processed += 1
+
+    def export(self):
+        os.makedirs(self.exportdir, exist_ok=True)
+        with open(os.path.join(self.exportdir, self.modelname + ".urdf"), "w") as f:
+            f.write(str(self.n_processed))
+
+
+class DummyPipeline(Pipeline):
+    def __init__(self, n_workers=1, root=None):
+        self.n_workers = n_workers
+        self.root = root
+        self.cache_dir = "cache"
+        self.temp_dir = os.path.join(root, "temp") if root is not None else None
+        self.models = []
+        self._fingerprints = {}
+
+    def run(self, model):
+        if model.configkey == "unpicklable":
+            return "Good", lambda: None
+        if model.configkey == "crashing":
+            os._exit(1)
+        return "Good", {model.configkey}
+
+
+class TestRunModels(unittest.TestCase):
+    def run_models(self, n_workers, models):
+        pipeline = DummyPipeline(n_workers)
+        results = []
+        pipeline._run_models(models, pipeline.run, lambda model, result: results.append((model.configkey, result)),
+                             get_dependencies=pipeline._get_model_dependencies,
+                             get_failure_result=lambda state: (state, set()))
+        return results
+
+    def test_order_and_dependencies(self):
+        models = [DummyModel("a"), DummyModel("b", ["a"]), DummyModel("c"), DummyModel("d", ["b", "c"])]
+        for n_workers in [1, 2]:
+            self.assertEqual(self.run_models(n_workers, models), [(m.configkey, ("Good", {m.configkey})) for m in models])
+
+    def test_worker_failures(self):
+        models = [DummyModel("a"), DummyModel("unpicklable", ["a"]), DummyModel("b", ["unpicklable"]),
+                  DummyModel("crashing", ["b"]), DummyModel("c", ["crashing"])]
+        results = dict(self.run_models(2, models))
+        self.assertEqual(list(results.keys()), [m.configkey for m in models])
+        self.assertEqual(results["a"], ("Good", {"a"}))
+        self.assertEqual(results["b"], ("Good", {"b"}))
+        for configkey in ["unpicklable", "crashing", "c"]:
+            state, meshes = results[configkey]
+            self.assertFalse(state.upper().startswith("GOOD"))
+            self.assertEqual(meshes, set())
+
+
+class TestModelCache(unittest.TestCase):
+    def setUp(self):
+        self.root = os.path.abspath("test_data/.temp/ci_cache")
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.root)
+        self.input_file = os.path.join(self.root, "input.urdf")
+        with open(self.input_file, "w") as f:
+            f.write("<robot/>")
+
+    def process(self, derived=False):
+        # each run of the pipeline computes the fingerprints anew
+        pipeline = DummyPipeline(root=self.root)
+        pipeline.models = [DummyModel("base", input_file=self.input_file, root=self.root)]
+        if derived:
+            pipeline.models.append(DummyModel("derived", derived_from=["base"], root=self.root))
+        return pipeline, [pipeline._process_model(model) for model in pipeline.models]
+
+    def test_unchanged_models_are_restored(self):
+        _, results = self.process()
+        self.assertEqual(results[0][0], "Good")
+        pipeline, results = self.process()
+        self.assertEqual(results[0][0], "Good (unchanged)")
+        self.assertEqual(pipeline.models[0].n_processed, 0)
+        self.assertTrue(os.path.isfile(os.path.join(pipeline.models[0].exportdir, "base.urdf")))
+
+    def test_changed_inputs_invalidate_the_cache(self):
+        self.process(derived=True)
+        _, results = self.process(derived=True)
+        self.assertEqual([r[0] for r in results], ["Good (unchanged)", "Good (unchanged)"])
+        with open(self.input_file, "w") as f:
+            f.write("<robot name='changed'/>")
+        _, results = self.process(derived=True)
+        # the derived model depends on the changed model
+        self.assertEqual([r[0] for r in results], ["Good", "Good"])
+
+    def test_deploy_target_branch(self):
+        commit_branch = os.environ.pop("CI_COMMIT_BRANCH", None)
+        try:
+            self.assertEqual(BaseModel.get_deploy_target_branch(False), git.GIT_SUCCESS_BRANCH)
+            self.assertEqual(BaseModel.get_deploy_target_branch(True), git.GIT_FAILURE_BRANCH)
+            os.environ["CI_COMMIT_BRANCH"] = "feature/test"
+            self.assertEqual(BaseModel.get_deploy_target_branch(True), "feature/test")
+        finally:
+            os.environ.pop("CI_COMMIT_BRANCH", None)
+            if commit_branch is not None:
+                os.environ["CI_COMMIT_BRANCH"] = commit_branch
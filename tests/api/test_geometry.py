@@ -0,0 +1,160 @@
+import os
+import unittest
+
+import numpy as np
+import trimesh
+
+from phobos.geometry import fit_sphere_swept_hull, get_swept_hull_volume
+from phobos.geometry import io as mesh_io
+from phobos.utils.inertia import calculateMeshInertia, calculatePolygonInertia
+
+
+class TestSphereSweptHull(unittest.TestCase):
+    def test_sphere(self):
+        mesh = trimesh.creation.icosphere(3, radius=0.5)
+        points, radius = fit_sphere_swept_hull(mesh.vertices, 1)
+        self.assertEqual(points.shape, (1, 3))
+        self.assertTrue(np.allclose(points[0], 0.0, atol=1e-2))
+        self.assertAlmostEqual(radius, 0.5, places=2)
+        self.assertTrue(np.all(np.linalg.norm(mesh.vertices - points[0], axis=1) <= radius + 1e-9))
+
+    def test_capsule(self):
+        mesh = trimesh.creation.capsule(height=1.0, radius=0.1)
+        points, radius = fit_sphere_swept_hull(mesh.vertices, 2)
+        self.assertEqual(points.shape, (2, 3))
+        self.assertAlmostEqual(radius, 0.1, places=2)
+        self.assertAlmostEqual(np.linalg.norm(points[0] - points[1]), 1.0, places=2)
+        # the distances of the vertices to the segment
+        direction = (points[1] - points[0]) / np.linalg.norm(points[1] - points[0])
+        along = np.clip((mesh.vertices - points[0]).dot(direction), 0.0, np.linalg.norm(points[1] - points[0]))
+        distances = np.linalg.norm(mesh.vertices - (points[0] + along[:, None] * direction), axis=1)
+        self.assertTrue(np.all(distances <= radius + 1e-9))
+
+    def test_box(self):
+        mesh = trimesh.creation.box([1.0, 0.3, 0.2])
+        points, radius = fit_sphere_swept_hull(mesh.vertices, 8)
+        self.assertEqual(len(points), 8)
+        self.assertAlmostEqual(radius, 0.0)
+        self.assertAlmostEqual(get_swept_hull_volume(points, radius), mesh.volume)
+
+    def test_more_points_are_never_worse(self):
+        mesh = trimesh.creation.cone(0.2, 0.6)
+        volumes = []
+        for n_points in range(1, 6):
+            points, radius = fit_sphere_swept_hull(mesh.vertices, n_points)
+            self.assertLessEqual(len(points), n_points)
+            volumes.append(get_swept_hull_volume(points, radius))
+        self.assertTrue(np.all(np.diff(volumes) <= 1e-9), volumes)
+        self.assertGreaterEqual(volumes[-1], mesh.volume)
+
+
+class TestObjParsing(unittest.TestCase):
+    def test_mixed_face_styles(self):
+        # v/vt/vn quad, v//vn, plain and v/vt triangles
+        expected_faces = [
+            [[0, 0, 0], [3, 3, 0], [2, 2, 0], [1, 1, 0]],
+            [[0, -1, 1], [1, -1, 1], [4, -1, 1]],
+            [[1, 1, 1], [2, 2, 2], [4, 4, 4]],
+            [[2, 2, -1], [3, 3, -1], [4, 0, -1]]
+        ]
+        for chunk_size in [None, 16, 64]:
+            mesh_info = mesh_io.parse_obj("test_data/mesh_io/mixed_faces.obj", chunk_size=chunk_size)
+            self.assertTrue(np.array_equal(mesh_info["vertices"], [[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+                                                                   [0.5, 0.5, 1]]))
+            self.assertTrue(np.array_equal(mesh_info["texture_coords"], [[0, 0], [1, 0], [1, 1], [0, 1]]))
+            self.assertTrue(np.array_equal(mesh_info["vertex_normals"], [[0, 0, -1], [0, -1, 0.5], [1, 0, 0.5]]))
+            self.assertEqual(mesh_info["points"].shape, (0, 3))
+            self.assertEqual([[corner.tolist() for corner in face] for face in mesh_info["faces"]], expected_faces)
+
+    def test_triangles_are_parsed_to_an_array(self):
+        os.makedirs("test_data/.temp", exist_ok=True)
+        filepath = "test_data/.temp/triangles.obj"
+        with open(filepath, "w") as f:
+            f.write("v 0 0 0\nv 1 0 0\nv 0 1 0\nv 0 0 1\nf 1 3 2\nf 1 2 4\nf 1 4 3\nf 2 3 4\n")
+        for chunk_size in [None, 8]:
+            faces = mesh_io.parse_obj(filepath, chunk_size=chunk_size)["faces"]
+            self.assertIsInstance(faces, np.ndarray)
+            self.assertEqual(faces.dtype, np.intc)
+            self.assertTrue(np.array_equal(faces[:, :, 0], [[0, 2, 1], [0, 1, 3], [0, 3, 2], [1, 2, 3]]))
+
+
+class TestBobj(unittest.TestCase):
+    def setUp(self):
+        os.makedirs("test_data/.temp", exist_ok=True)
+        self.mesh_info = {
+            "vertices": np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=np.single),
+            "vertex_normals": np.array([[0, 0, -1], [0, -1, 0], [-1, 0, 0], [1, 1, 1]], dtype=np.single),
+            "texture_coords": np.array([[0, 0], [1, 0], [0, 1], [0.5, 0.5]], dtype=np.single),
+            "faces": np.array([[[0, 0, 0], [2, 2, 0], [1, 1, 0]],
+                               [[0, 0, 1], [1, 1, 1], [3, 3, 1]],
+                               [[0, 0, 2], [3, 3, 2], [2, 2, 2]],
+                               [[1, 1, 3], [2, 2, 3], [3, 3, 3]]], dtype=np.intc)
+        }
+
+    def test_round_trip(self):
+        filepath = "test_data/.temp/tetrahedron.bobj"
+        mesh_io.write_bobj(filepath, **self.mesh_info)
+        for mmap in [False, True]:
+            parsed = mesh_io.parse_bobj(filepath, mmap=mmap)
+            self.assertEqual(sorted(parsed.keys()), sorted(self.mesh_info.keys()))
+            for name, values in self.mesh_info.items():
+                self.assertEqual(parsed[name].dtype, values.dtype)
+                self.assertTrue(np.array_equal(parsed[name], values), name)
+
+    def test_matches_fixture(self):
+        filepath = "test_data/.temp/tetrahedron.bobj"
+        # faces given as lists of corners are written the same way
+        mesh_info = dict(self.mesh_info, faces=[list(face) for face in self.mesh_info["faces"]])
+        for info in [self.mesh_info, mesh_info]:
+            mesh_io.write_bobj(filepath, **info)
+            with open(filepath, "rb") as f, open("test_data/mesh_io/tetrahedron.bobj", "rb") as fixture:
+                self.assertEqual(f.read(), fixture.read())
+
+
+class TestMeshInertia(unittest.TestCase):
+    def get_expected(self, mass, mesh):
+        I = mass / mesh.volume * mesh.moment_inertia
+        return I[0, 0], I[0, 1], I[0, 2], I[1, 1], I[1, 2], I[2, 2]
+
+    def test_translated_box(self):
+        box = trimesh.creation.box([0.4, 0.2, 0.1])
+        box.apply_transform(trimesh.transformations.euler_matrix(0.3, 0.2, 0.1))
+        box.apply_translation([1.0, -2.0, 3.0])
+        expected = self.get_expected(2.0, box)
+        self.assertTrue(np.allclose(calculateMeshInertia(2.0, box), expected))
+        self.assertTrue(np.allclose(calculateMeshInertia(2.0, box, float64_accumulation=True), expected))
+
+    def test_scale(self):
+        box = trimesh.creation.box([0.4, 0.2, 0.1])
+        scaled = trimesh.creation.box([0.8, 0.2, 0.3])
+        self.assertTrue(np.allclose(calculateMeshInertia(2.0, box, scale=[2.0, 1.0, 3.0]),
+                                    self.get_expected(2.0, scaled)))
+
+    def test_float64_accumulation(self):
+        mesh = trimesh.creation.icosphere(4, radius=0.5)
+        # trimesh loses precision for meshes far from the origin, so the expected values are taken before moving it
+        expected = self.get_expected(1.0, mesh)
+        mesh.apply_translation([1e5, 0.0, 0.0])
+        for float64_accumulation in [False, True]:
+            self.assertTrue(np.allclose(calculateMeshInertia(1.0, mesh, float64_accumulation=float64_accumulation),
+                                        expected, rtol=0.0, atol=1e-12))
+
+    def test_quads(self):
+        box = trimesh.creation.box([0.4, 0.2, 0.1])
+        box.apply_translation([0.5, 0.5, 0.5])
+        # the box of trimesh as quads: the triangles of each side share the normal and their diagonal
+        quads = []
+        normals = []
+        for normal in np.unique(box.face_normals.round(6), axis=0):
+            triangles = box.faces[np.all(box.face_normals.round(6) == normal, axis=1)]
+            first, second = triangles
+            shared = [v for v in first if v in second]
+            start = [v for v in first if v not in shared][0]
+            other = [v for v in second if v not in shared][0]
+            # keep the winding of the first triangle
+            i = list(first).index(start)
+            quads.append([start, first[(i + 1) % 3], other, first[(i + 2) % 3]])
+            normals.append(normal)
+        self.assertEqual(len(quads), 6)
+        self.assertTrue(np.allclose(calculatePolygonInertia(2.0, box.vertices, quads, normals),
+                                    self.get_expected(2.0, box)))
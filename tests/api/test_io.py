@@ -1,6 +1,10 @@
 import unittest
 import difflib
 import os
+import shutil
+
+import numpy as np
+import trimesh
 
 import phobos
 # phobos.commandline_logging.setup_logger_level("DEBUG")
@@ -67,3 +71,205 @@ class TestConversion(unittest.TestCase):
             print("".join(differ.compare(ground_truth, export)))
         self.assertEqual(ground_truth, export)
 
+
+
+class TestFastImport(unittest.TestCase):
+    def setUp(self):
+        os.makedirs("test_data/.temp", exist_ok=True)
+        self.urdf_file = "test_data/example_mechanism/urdf/example_mechanism.urdf"
+        self.sdf_file = "test_data/.temp/fast_import.sdf"
+        with open(self.sdf_file, "w") as f:
+            f.write(phobos.io.parser.parse_xml(self.urdf_file).to_sdf_string())
+
+    def test_iterparse_equals_parse_xml(self):
+        for xml_file in [self.urdf_file, self.sdf_file]:
+            timings = {}
+            robot = phobos.io.parser.parse_xml(xml_file, timings=timings)
+            self.assertEqual(set(timings.keys()), {"parse", "construct"})
+            # an xml string is parsed as a whole
+            with open(xml_file, "r") as f:
+                expected = phobos.io.parser.parse_xml(f.read())
+            self.assertEqual(robot.to_urdf_string(), expected.to_urdf_string())
+            self.assertEqual(robot.to_sdf_string(), expected.to_sdf_string())
+
+    def test_smurf_import_timings(self):
+        robot = phobos.core.Robot(inputfile="test_data/example_mechanism/smurf/example_mechanism.smurf")
+        self.assertTrue({"smurf", "parse", "construct", "annotations", "link", "verify_meshes"}.issubset(
+            robot.import_timings.keys()))
+        expected = phobos.io.parser.parse_xml(self.urdf_file)
+        self.assertEqual(sorted(str(link) for link in robot.links), sorted(str(link) for link in expected.links))
+        self.assertEqual(sorted(str(joint) for joint in robot.joints), sorted(str(joint) for joint in expected.joints))
+
+
+class TestMeshExport(unittest.TestCase):
+    def setUp(self):
+        self.outputdir = os.path.abspath("test_data/.temp/mesh_export")
+        shutil.rmtree(self.outputdir, ignore_errors=True)
+
+    def _export(self, name, format):
+        mesh = phobos.io.representation.Mesh(filepath="test_data/example_mechanism/meshes/stl/Cone.stl",
+                                              meshname=name)
+        mesh.provide_mesh_file(self.outputdir, format=format)
+        return mesh._exported[format]["export_operation"]
+
+    def test_reexport_keeps_export_operation(self):
+        # the second mesh reuses the file of the first one, but both have to be annotated the same way on every run
+        for _ in range(2):
+            self.assertEqual(self._export("Cone", "stl"), "copy")
+            self.assertEqual(self._export("Cone", "stl"), "copy")
+        operation = self._export("Cone", "obj")
+        self.assertEqual(self._export("Cone", "obj"), operation)
+        self.assertEqual(self._export("ConeCopy", "obj"), operation)
+        self.assertTrue(os.path.isfile(os.path.join(self.outputdir, "ConeCopy.obj")))
+
+    def test_manifest_is_invalidated_by_changes(self):
+        mesh = phobos.io.representation.Mesh(filepath="test_data/example_mechanism/meshes/stl/Cone.stl")
+        scaled_mesh = phobos.io.representation.Mesh(filepath="test_data/example_mechanism/meshes/stl/Cone.stl",
+                                                     scale=[2.0, 2.0, 2.0])
+        self.assertNotEqual(mesh.get_export_fingerprint("obj"), scaled_mesh.get_export_fingerprint("obj"))
+        self._export("Cone", "obj")
+        targetpath = os.path.join(self.outputdir, "Cone.obj")
+        manifest = phobos.io.representation.Mesh._read_manifest(targetpath)
+        self.assertIsNotNone(manifest)
+        with open(targetpath, "a") as f:
+            f.write("\n")
+        self.assertIsNone(phobos.io.representation.Mesh._get_export_manifest(targetpath, manifest["fingerprint"]))
+
+    def test_unrecorded_changes_are_not_fingerprinted(self):
+        mesh = phobos.io.representation.Mesh(filepath="test_data/example_mechanism/meshes/stl/Cone.stl")
+        self.assertIsNotNone(mesh.get_export_fingerprint("obj"))
+        mesh._changed = True
+        self.assertIsNone(mesh.get_export_fingerprint("obj"))
+
+
+class TestParallelMeshExport(unittest.TestCase):
+    def create_robot(self):
+        robot = phobos.core.Robot(name="meshes")
+        cone = os.path.abspath("test_data/example_mechanism/meshes/stl/Cone.stl")
+        for i in range(3):
+            robot.add_aggregate("link", phobos.io.representation.Link(
+                name=f"link{i}",
+                visuals=[phobos.io.representation.Visual(name=f"link{i}_visual",
+                                                          geometry=phobos.io.representation.Mesh(filepath=cone))],
+                collisions=[phobos.io.representation.Collision(name=f"link{i}_collision",
+                                                                geometry=phobos.io.representation.Mesh(filepath=cone))]
+            ))
+        for i in range(1, 3):
+            robot.add_aggregate("joint", phobos.io.representation.Joint(
+                name=f"joint{i}", parent=f"link{i-1}", child=f"link{i}", joint_type="fixed",
+                origin=phobos.io.representation.Pose(xyz=[0, 0, 0.2])
+            ))
+        robot.link_entities()
+        robot.regenerate_tree_maps()
+        return robot
+
+    def test_workers_export_the_same_meshes(self):
+        exported = []
+        for n_workers in [None, 2]:
+            robot = self.create_robot()
+            outputdir = os.path.abspath(f"test_data/.temp/parallel_mesh_export_{n_workers}")
+            shutil.rmtree(outputdir, ignore_errors=True)
+            robot._export_meshes([(os.path.join(outputdir, "stl"), "stl"), (os.path.join(outputdir, "obj"), "obj")],
+                                 n_workers=n_workers)
+            files = {}
+            for directory, _, filenames in os.walk(outputdir):
+                for filename in filenames:
+                    with open(os.path.join(directory, filename), "rb") as f:
+                        files[os.path.relpath(os.path.join(directory, filename), outputdir)] = f.read()
+            filepaths = [{k: os.path.relpath(v["filepath"], outputdir) for k, v in vc.geometry._exported.items()}
+                         for vc in robot.visuals + robot.collisions]
+            exported.append((files, filepaths))
+        self.assertEqual(sorted(exported[0][0].keys()), sorted(exported[1][0].keys()))
+        # the histories and manifests tell how the file was provided, the meshes themselves have to be identical
+        for filename in [os.path.join("stl", "Cone.stl"), os.path.join("obj", "Cone.obj")]:
+            self.assertEqual(exported[0][0][filename], exported[1][0][filename])
+        self.assertEqual(exported[0][1], exported[1][1])
+        self.assertEqual(exported[1][1], [{"stl": os.path.join("stl", "Cone.stl"), "obj": os.path.join("obj", "Cone.obj")}] * 6)
+
+
+class TestMeshCache(unittest.TestCase):
+    def setUp(self):
+        phobos.geometry.io.clear_mesh_cache()
+        os.makedirs("test_data/.temp", exist_ok=True)
+        # a box without its top face, hence not watertight
+        box = trimesh.creation.box([1.0, 1.0, 1.0])
+        box.update_faces(box.face_normals[:, 2] < 0.5)
+        self.open_box = os.path.abspath("test_data/.temp/open_box.stl")
+        box.export(self.open_box)
+
+    def test_loaded_mesh_is_shared(self):
+        a = phobos.io.representation.Mesh(filepath="test_data/example_mechanism/meshes/stl/Cone.stl")
+        b = phobos.io.representation.Mesh(filepath="test_data/example_mechanism/meshes/stl/Cone.stl")
+        self.assertIs(a.load_mesh(), b.load_mesh())
+
+    def test_edits_are_copied_on_write(self):
+        a = phobos.io.representation.Mesh(filepath="test_data/example_mechanism/meshes/stl/Cone.stl", scale=[2.0, 2.0, 2.0])
+        b = phobos.io.representation.Mesh(filepath="test_data/example_mechanism/meshes/stl/Cone.stl")
+        vertices = b.load_mesh().vertices.copy()
+        a.load_mesh()
+        a.apply_scale()
+        self.assertIsNot(a.mesh_object, b.mesh_object)
+        self.assertTrue(np.allclose(b.mesh_object.vertices, vertices))
+        self.assertTrue(np.allclose(a.mesh_object.vertices, 2 * vertices))
+
+    def test_approx_volume_and_com_keeps_shared_mesh(self):
+        a = phobos.io.representation.Mesh(filepath=self.open_box)
+        b = phobos.io.representation.Mesh(filepath=self.open_box)
+        n_faces = len(b.load_mesh().faces)
+        volume, com = a.approx_volume_and_com()
+        self.assertGreater(volume, 0.0)
+        self.assertEqual(len(b.mesh_object.faces), n_faces)
+        self.assertIs(a.mesh_object, b.mesh_object)
+
+    def test_duplicate_edits_are_copied_on_write(self):
+        robot = phobos.core.Robot(name="duplicate")
+        robot.add_aggregate("link", phobos.io.representation.Link(name="link", visuals=[phobos.io.representation.Visual(
+            name="visual", geometry=phobos.io.representation.Mesh(
+                filepath="test_data/example_mechanism/meshes/stl/Cone.stl", scale=[2.0, 2.0, 2.0]
+            )
+        )]))
+        robot.link_entities()
+        original = robot.visuals[0].geometry
+        vertices = original.load_mesh().vertices.copy()
+        duplicate = robot.duplicate()
+        copy = duplicate.visuals[0].geometry
+        self.assertIsNot(copy, original)
+        self.assertIs(copy.mesh_object, original.mesh_object)
+        self.assertTrue(original._mesh_data_shared and copy._mesh_data_shared)
+        copy.apply_scale()
+        self.assertIsNot(copy.mesh_object, original.mesh_object)
+        self.assertTrue(np.allclose(copy.mesh_object.vertices, 2 * vertices))
+        self.assertTrue(np.allclose(original.mesh_object.vertices, vertices))
+        self.assertEqual(original.scale, [2.0, 2.0, 2.0])
+        self.assertNotIn("apply_scale", original._operations)
+        # the original still shares its data with the mesh cache, so its own edits are copied on write as well
+        original.apply_scale()
+        self.assertTrue(np.allclose(original.mesh_object.vertices, 2 * vertices))
+        self.assertTrue(np.allclose(phobos.io.representation.Mesh(
+            filepath="test_data/example_mechanism/meshes/stl/Cone.stl").load_mesh().vertices, vertices))
+
+
+class TestLazyMeshes(unittest.TestCase):
+    def setUp(self):
+        phobos.geometry.io.clear_mesh_cache()
+
+    def test_bounds_from_header(self):
+        for filepath in ["test_data/example_mechanism/meshes/stl/Cone.stl",
+                         "test_data/example_mechanism/meshes/obj/Cone.obj"]:
+            lazy = phobos.io.representation.Mesh(filepath=filepath, lazy=True)
+            loaded = phobos.io.representation.Mesh(filepath=filepath)
+            self.assertTrue(np.allclose(lazy.bounds, loaded.load_mesh().bounds))
+            self.assertTrue(np.allclose(lazy.extent, loaded.extent))
+            self.assertIsNone(lazy.mesh_object)
+
+    def test_bounding_box_without_loading(self):
+        boxes = []
+        for lazy in [True, False]:
+            collision = phobos.io.representation.Collision(
+                name="collision", link="link", origin=phobos.io.representation.Pose(xyz=[0, 0, 0.1]),
+                geometry=phobos.io.representation.Mesh(filepath="test_data/example_mechanism/meshes/stl/Cone.stl",
+                                                       lazy=lazy))
+            phobos.geometry.replace_geometry(collision, shape="box", scale=2.0, apply_primitives=True)
+            boxes.append(collision)
+        self.assertTrue(np.allclose(boxes[0].geometry.size, boxes[1].geometry.size))
+        self.assertTrue(np.allclose(boxes[0].origin.to_matrix(), boxes[1].origin.to_matrix()))
@@ -0,0 +1,456 @@
+import gc
+import io
+import os
+import shutil
+import unittest
+from unittest import mock
+
+import numpy as np
+import scipy.sparse
+
+import phobos
+from phobos.geometry import robot as robot_geometry
+from phobos.io import representation, xmlrobot
+from phobos.io.xmlrobot import XMLRobot
+
+
+def create_chain_robot(n_links=4):
+    robot = phobos.core.Robot(name="chain")
+    for i in range(n_links):
+        robot.add_aggregate("link", representation.Link(name=f"link{i}", collisions=[representation.Collision(
+            name=f"link{i}_collision", geometry=representation.Box(size=[0.1, 0.1, 0.3]),
+            origin=representation.Pose(xyz=[0, 0, 0.1])
+        )]))
+    for i in range(1, n_links):
+        robot.add_aggregate("joint", representation.Joint(
+            name=f"joint{i}", parent=f"link{i-1}", child=f"link{i}", joint_type="revolute", axis=[0, 0, 1],
+            origin=representation.Pose(xyz=[0.1, 0, 0.2], rpy=[0, 0.1, 0]),
+            limit=representation.JointLimit(lower=-1, upper=1, effort=1, velocity=1)
+        ))
+    robot.link_entities()
+    robot.regenerate_tree_maps()
+    return robot
+
+
+class TestAggregateIndex(unittest.TestCase):
+    def test_lookup_after_direct_rename(self):
+        robot = create_chain_robot()
+        link = robot.links[0]
+        self.assertIs(robot.get_link("link0"), link)
+        link.name += "_X"
+        robot.regenerate_tree_maps()
+        self.assertIs(robot.get_link("link0_X"), link)
+        self.assertIsNone(robot.get_link("link0"))
+
+    def test_rename_after_direct_rename(self):
+        robot = create_chain_robot()
+        robot.links[0].name += "_X"
+        robot.get_joint("joint1").name += "_X"
+        robot.regenerate_tree_maps()
+        robot.rename("links", robot.links, suffix="_Y")
+        robot.rename("joints", robot.joints, suffix="_Y")
+        self.assertEqual(sorted(str(link) for link in robot.links),
+                         ["link0_X_Y", "link1_Y", "link2_Y", "link3_Y"])
+        self.assertEqual(sorted(str(joint) for joint in robot.joints), ["joint1_X_Y", "joint2_Y", "joint3_Y"])
+        self.assertIsNotNone(robot.get_link("link0_X_Y"))
+        self.assertIsNone(robot.get_link("link0_X"))
+
+    def test_index_is_updated_incrementally(self):
+        with mock.patch.object(XMLRobot, "_build_aggregate_index", autospec=True,
+                               side_effect=XMLRobot._build_aggregate_index) as build:
+            robot = create_chain_robot(200)
+            robot.rename("links", robot.links, suffix="_Y")
+            robot.remove_aggregate("joint", "joint100")
+            # a constant number of rebuilds instead of one per added, renamed or removed aggregate
+            self.assertLess(build.call_count, 20)
+        self.assertEqual(len(robot.links), 199)
+        self.assertIsNone(robot.get_link("link100_Y"))
+        for i in [0, 99, 101, 199]:
+            self.assertIs(robot.get_link(f"link{i}_Y"), robot.links[i if i < 100 else i - 1])
+
+
+class TestTreeQueries(unittest.TestCase):
+    def setUp(self):
+        # root -> passive_a -> end_effector, root -> passive_b -> prismatic
+        self.robot = phobos.core.Robot(inputfile="test_data/example_mechanism/urdf/example_mechanism.urdf")
+
+    def get_ancestors(self, link):
+        # the links from the given one up to the root by walking the parent map
+        ancestors = [str(link)]
+        while ancestors[-1] in self.robot.parent_map:
+            ancestors.append(self.robot.parent_map[ancestors[-1]][1])
+        return ancestors
+
+    def assert_consistent(self):
+        links = [str(link) for link in self.robot.links]
+        tables = self.robot._get_tree_tables()
+        self.assertEqual(sorted(tables["order"]), sorted(links))
+        self.assertEqual(tables["order"][0], str(self.robot.get_root()))
+        for a in links:
+            self.assertEqual(self.robot.get_link_level(a), len(self.get_ancestors(a)) - 1)
+            self.assertEqual(self.robot.get_subtree_links(a), [l for l in tables["order"] if a in self.get_ancestors(l)])
+            for b in links:
+                self.assertEqual(self.robot.is_ancestor(a, b), a in self.get_ancestors(b))
+                lca = [l for l in self.get_ancestors(a) if l in self.get_ancestors(b)][0]
+                self.assertEqual(self.robot.get_lowest_common_ancestor(a, b), lca)
+
+    def test_queries(self):
+        self.assert_consistent()
+        self.assertEqual(self.robot.get_lowest_common_ancestor("end_effector", "prismatic"), "root")
+        self.assertEqual(self.robot.get_lowest_common_ancestor("end_effector", "passive_a"), "passive_a")
+        self.assertTrue(self.robot.is_ancestor("root", "prismatic"))
+        self.assertFalse(self.robot.is_ancestor("passive_a", "prismatic"))
+        self.assertEqual(self.robot.get_subtree_links("passive_b"), ["passive_b", "prismatic"])
+        self.assertEqual(self.robot.get_chain("root", "end_effector"),
+                         ["root", "passive_a_joint", "passive_a", "end_effector_joint", "end_effector"])
+        self.assertEqual(sorted(self.robot.get_leaves()), ["end_effector", "prismatic"])
+        self.assertEqual(self.robot.get_leaves("passive_a"), ["end_effector"])
+        self.assertEqual(sorted(self.robot.get_leaves("root", stop=["passive_b"])), ["end_effector", "passive_b"])
+        self.assertEqual([self.robot.get_link_level(l) for l in ["root", "passive_b", "prismatic"]], [0, 1, 2])
+
+    def test_queries_after_move_link_in_tree(self):
+        self.robot._get_tree_tables()
+        self.robot.move_link_in_tree("prismatic", "end_effector")
+        self.assert_consistent()
+        self.assertEqual(self.robot.get_lowest_common_ancestor("prismatic", "passive_b"), "root")
+        self.assertTrue(self.robot.is_ancestor("passive_a", "prismatic"))
+        self.assertEqual(self.robot.get_subtree_links("passive_b"), ["passive_b"])
+        self.assertEqual(self.robot.get_chain("passive_a", "prismatic", joints=False),
+                         ["passive_a", "end_effector", "prismatic"])
+        self.assertEqual(sorted(self.robot.get_leaves()), ["passive_b", "prismatic"])
+        self.assertEqual(self.robot.get_leaves("passive_a"), ["prismatic"])
+        self.assertEqual(self.robot.get_link_level("prismatic"), 3)
+
+    def test_queries_after_remove_aggregate(self):
+        self.robot._get_tree_tables()
+        self.robot.remove_aggregate("link", "passive_b")
+        self.assert_consistent()
+        self.assertNotIn("passive_b", self.robot._get_tree_tables()["index"])
+        self.assertEqual(self.robot.get_lowest_common_ancestor("prismatic", "end_effector"), "root")
+        self.assertEqual(self.robot.get_chain("root", "prismatic"), ["root", "prismatic_joint", "prismatic"])
+        self.assertEqual(sorted(self.robot.get_leaves()), ["end_effector", "prismatic"])
+        self.assertEqual(self.robot.get_link_level("prismatic"), 1)
+
+
+class TestCollisionScene(unittest.TestCase):
+    def test_zero_pose_collisions(self):
+        robot = create_chain_robot()
+        collisions = phobos.geometry.find_zero_pose_collisions(robot)
+        self.assertIn(("link0_collision", "link1_collision"), collisions)
+
+    def test_scene_does_not_keep_robot_alive(self):
+        gc.collect()
+        n_scenes = len(robot_geometry._collision_scenes)
+        robot = create_chain_robot()
+        robot_geometry.get_collision_scene(robot).get_self_collisions([[0.5, 0.5, 0.5]])
+        self.assertEqual(len(robot_geometry._collision_scenes), n_scenes + 1)
+        del robot
+        gc.collect()
+        self.assertEqual(len(robot_geometry._collision_scenes), n_scenes)
+
+
+class TestJointOrder(unittest.TestCase):
+    def assert_topologically_ordered(self, robot, n_joints):
+        joints = robot.joints
+        self.assertEqual(len(joints), n_joints)
+        reached = {str(robot.get_root())}
+        for joint in joints:
+            self.assertIn(joint.parent, reached, [str(j) for j in joints])
+            reached.add(joint.child)
+
+    def add_joint(self, robot, name, parent, child):
+        robot.add_aggregate("joint", representation.Joint(
+            name=name, parent=parent, child=child, joint_type="fixed", origin=representation.Pose(xyz=[0, 0, 0.1])
+        ))
+
+    def test_order_after_add_aggregate(self):
+        robot = create_chain_robot()
+        # a branch whose joints are added from the tip to the base
+        for name in ["branch1", "branch0"]:
+            robot.add_aggregate("link", representation.Link(name=name))
+        self.add_joint(robot, "branch_joint1", "branch0", "branch1")
+        self.add_joint(robot, "branch_joint0", "link1", "branch0")
+        self.assert_topologically_ordered(robot, 5)
+
+    def test_order_after_remove_aggregate(self):
+        robot = create_chain_robot()
+        robot.remove_aggregate("joint", "joint1")
+        self.assert_topologically_ordered(robot, 2)
+        self.assertEqual(robot.get_joint("joint2").parent, "link0")
+
+    def test_order_after_move_link_in_tree(self):
+        robot = create_chain_robot(6)
+        robot.move_link_in_tree("link4", "link1")
+        # link5 is now a sibling branch of link2
+        robot.move_link_in_tree("link2", "link5")
+        self.assertEqual(robot.get_joint("joint2").parent, "link5")
+        self.assert_topologically_ordered(robot, 5)
+
+    def test_fallback_is_logged(self):
+        robot = create_chain_robot()
+        robot.add_aggregate("link", representation.Link(name="floating"))
+        self.add_joint(robot, "floating_joint", "floating", "link0")
+        robot.add_aggregate("link", representation.Link(name="unreachable"))
+        with self.assertLogs(xmlrobot.log, "DEBUG") as logs:
+            self.assertEqual([str(joint) for joint in robot.joints][:3], ["joint1", "joint2", "joint3"])
+        self.assertIn("2 roots", logs.output[-1])
+        self.add_joint(robot, "unreachable_joint", "link3", "unreachable")
+        self.assert_topologically_ordered(robot, 5)
+        self.assertEqual(str(robot.joints[0]), "floating_joint")
+
+
+class TestForwardKinematics(unittest.TestCase):
+    def test_zero_pose(self):
+        robot = create_chain_robot()
+        joint_names = robot.get_fk_joint_names()
+        self.assertEqual(joint_names, ["joint1", "joint2", "joint3"])
+        link_names, transformations = robot.get_forward_kinematics(np.zeros((2, len(joint_names))))
+        self.assertEqual(transformations.shape, (2, 4, 4, 4))
+        for i, link_name in enumerate(link_names):
+            self.assertTrue(np.allclose(transformations[1, i], robot.get_transformation(link_name)))
+
+    def test_rotation(self):
+        robot = create_chain_robot()
+        link_names, T = robot.get_forward_kinematics([0.5, 0.0, 0.0])
+        i0, i1 = link_names.index("link0"), link_names.index("link1")
+        relative = np.linalg.inv(T[i0]).dot(T[i1])
+        zero_pose = robot.get_transformation("link1", start="link0")
+        rotation = np.identity(4)
+        rotation[0:2, 0:2] = [[np.cos(0.5), -np.sin(0.5)], [np.sin(0.5), np.cos(0.5)]]
+        self.assertTrue(np.allclose(relative, zero_pose.dot(rotation)))
+
+    def test_joint_without_axis(self):
+        robot = create_chain_robot()
+        robot.get_joint("joint1").axis = None
+        link_names, T = robot.get_forward_kinematics([0.5, 0.0, 0.0])
+        i0, i1 = link_names.index("link0"), link_names.index("link1")
+        rotation = np.identity(4)
+        rotation[1:3, 1:3] = [[np.cos(0.5), -np.sin(0.5)], [np.sin(0.5), np.cos(0.5)]]
+        self.assertTrue(np.allclose(np.linalg.inv(T[i0]).dot(T[i1]),
+                                    robot.get_transformation("link1", start="link0").dot(rotation)))
+
+    def test_mimic_joints(self):
+        robot = create_chain_robot()
+        robot.get_joint("joint3").mimic = representation.JointMimic(joint="joint2", multiplier=2.0, offset=0.1)
+        self.assertEqual(robot.get_fk_joint_names(), ["joint1", "joint2"])
+        _, T_mimic = robot.get_forward_kinematics([0.3, 0.2])
+        _, T_explicit = robot.get_forward_kinematics([0.3, 0.2, 0.5], joint_names=["joint1", "joint2", "joint3"])
+        self.assertTrue(np.allclose(T_mimic, T_explicit))
+
+
+class TestTransformationCache(unittest.TestCase):
+    def test_origin_edits_invalidate_the_descendants(self):
+        robot = create_chain_robot()
+        link_names = [str(link) for link in robot.links]
+        before = robot.get_transformations(link_names)
+        robot.get_joint("joint2").origin.xyz = [0.1, 0, 1.2]
+        edited = create_chain_robot()
+        edited.get_joint("joint2").origin.xyz = [0.1, 0, 1.2]
+        after = robot.get_transformations(link_names)
+        self.assertTrue(np.allclose(after[:2], before[:2]))
+        self.assertFalse(np.allclose(after[2:], before[2:]))
+        self.assertTrue(np.allclose(after, edited.get_transformations(link_names)))
+        robot.get_joint("joint3").origin = representation.Pose(xyz=[0, 0.5, 0], relative_to="link2")
+        edited.get_joint("joint3").origin = representation.Pose(xyz=[0, 0.5, 0], relative_to="link2")
+        self.assertTrue(np.allclose(robot.get_transformation("link3"), edited.get_transformation("link3")))
+
+    def test_transformations_relative_to_start(self):
+        robot = create_chain_robot()
+        link_names = [str(link) for link in robot.links]
+        expected = np.stack([robot.get_transformation(link_name, start="link1") for link_name in link_names])
+        self.assertTrue(np.allclose(robot.get_transformations(link_names, start="link1"), expected))
+
+
+class TestCollisionMatrix(unittest.TestCase):
+    def test_exclusions_match_matrix(self):
+        robot = create_chain_robot()
+        configurations = np.random.default_rng(0).uniform(-1, 1, (10, len(robot.get_fk_joint_names())))
+        for kwargs in [{}, {"joint_configurations": configurations, "collision_ratio": 0.5},
+                       {"joint_configurations": configurations, "disable_never_colliding": True}]:
+            coll_names, matrix = robot.generate_collision_matrix(**kwargs)
+            exclusion_names, exclusions = robot.generate_collision_exclusions(**kwargs)
+            self.assertEqual(coll_names, exclusion_names)
+            self.assertTrue(scipy.sparse.issparse(exclusions))
+            expected = 1.0 - matrix
+            np.fill_diagonal(expected, 0.0)
+            self.assertTrue(np.array_equal(exclusions.toarray(), expected))
+
+    def test_disable_never_colliding(self):
+        robot = create_chain_robot()
+        configurations = np.zeros((1, len(robot.get_fk_joint_names())))
+        coll_names, matrix = robot.generate_collision_matrix(joint_configurations=configurations,
+                                                             disable_never_colliding=True)
+        # only the collisions with themselves are left to be checked
+        self.assertTrue(np.array_equal(matrix, np.identity(len(coll_names))))
+        coll_names, matrix = robot.generate_collision_matrix(
+            joint_configurations=configurations, disable_never_colliding=True,
+            coll_override={"link0_collision": ["link3_collision"]})
+        i0, i3 = coll_names.index("link0_collision"), coll_names.index("link3_collision")
+        self.assertEqual(matrix[i0, i3], 1.0)
+        self.assertEqual(matrix[i3, i0], 1.0)
+        self.assertEqual(matrix.sum(), len(coll_names) + 2)
+
+    def test_parent_collisions_are_not_checked(self):
+        robot = create_chain_robot()
+        coll_names, matrix = robot.generate_collision_matrix()
+        i0, i1 = coll_names.index("link0_collision"), coll_names.index("link1_collision")
+        self.assertEqual(matrix[i0, i1], 0.0)
+        self.assertEqual(matrix[i1, i0], 0.0)
+        _, matrix = robot.generate_collision_matrix(coll_override={"link0_collision": ["link1_collision"]})
+        self.assertEqual(matrix[i0, i1], 1.0)
+
+
+class TestInertials(unittest.TestCase):
+    def test_estimate_inertials(self):
+        robot = create_chain_robot()
+        masses = robot.estimate_inertials(density=1000.0)
+        for link in robot.links:
+            self.assertAlmostEqual(masses[link.name], 3.0)
+            self.assertAlmostEqual(link.inertial.mass, 3.0)
+            self.assertTrue(np.allclose(link.inertial.origin.xyz, [0, 0, 0.1]))
+            # the inertia of the box around its center
+            self.assertTrue(np.allclose(np.diag(link.inertial.inertia.to_matrix()),
+                                        3.0 / 12 * np.array([0.1, 0.1, 0.02])))
+        robot.estimate_inertials(total_mass=2.0, links=["link0", "link1"])
+        self.assertAlmostEqual(robot.get_link("link0").inertial.mass, 1.0)
+        self.assertAlmostEqual(robot.compute_mass(), 8.0)
+
+    def get_com(self, robot):
+        # the center of mass in the root frame, computed link by link
+        mass, weighted = 0.0, np.zeros(3)
+        for link in robot.links:
+            if link.inertial is not None:
+                T = robot.get_transformation(link.name).dot(link.inertial.origin.to_matrix())
+                mass += link.inertial.mass
+                weighted += link.inertial.mass * T[0:3, 3]
+        return weighted / mass
+
+    def test_compute_subtree_inertial(self):
+        robot = create_chain_robot()
+        robot.estimate_inertials(density=1000.0)
+        inertial = robot.compute_subtree_inertial()
+        self.assertAlmostEqual(inertial.mass, 12.0)
+        self.assertAlmostEqual(robot.compute_mass(), 12.0)
+        self.assertTrue(np.allclose(inertial.origin.xyz, self.get_com(robot)))
+        self.assertTrue(np.allclose(robot.compute_com(), self.get_com(robot)))
+        inertial = robot.compute_subtree_inertial("link3")
+        self.assertAlmostEqual(inertial.mass, 3.0)
+        self.assertTrue(np.allclose(inertial.origin.xyz, [0, 0, 0.1]))
+
+    def test_composite_inertias_are_cached_until_edited(self):
+        robot = create_chain_robot()
+        robot.estimate_inertials(density=1000.0)
+        composites = robot._get_composite_inertias()
+        self.assertIs(robot._get_composite_inertias(), composites)
+        robot.get_link("link3").inertial.mass = 6.0
+        self.assertAlmostEqual(robot.compute_mass(), 15.0)
+        robot.get_joint("joint3").origin.xyz = [0, 0, 1.0]
+        self.assertTrue(np.allclose(robot.compute_com(), self.get_com(robot)))
+        inertia = robot.compute_subtree_inertial("link3").inertia.ixx
+        robot.get_link("link3").inertial.inertia.ixx += 1.0
+        self.assertAlmostEqual(robot.compute_subtree_inertial("link3").inertia.ixx, inertia + 1.0)
+        robot.get_joint("joint3").joint_type = "fixed"
+        self.assertAlmostEqual(robot._get_composite_inertias(fixed_only=True)["link2"][0], 9.0)
+
+    def test_remove_fixed_keeps_mass_and_com(self):
+        robot = create_chain_robot()
+        robot.estimate_inertials(density=1000.0)
+        robot.get_joint("joint2").joint_type = "fixed"
+        robot.get_joint("joint3").joint_type = "fixed"
+        com = self.get_com(robot)
+        subtree = robot.compute_subtree_inertial("link1")
+        robot.remove_fixed()
+        self.assertEqual(sorted(str(link) for link in robot.links), ["link0", "link1"])
+        self.assertAlmostEqual(robot.compute_mass(), 12.0)
+        self.assertTrue(np.allclose(self.get_com(robot), com))
+        self.assertAlmostEqual(robot.get_link("link1").inertial.mass, 9.0)
+        self.assertTrue(np.allclose(robot.get_link("link1").inertial.inertia.to_matrix(),
+                                    subtree.inertia.to_matrix()))
+
+    def test_remove_joint_list_options(self):
+        for kwargs, n_collisions, mass in [({}, 3, None), ({"merge_inertial": False}, 3, 3.0),
+                                           ({"only_frame": False}, 1, 3.0)]:
+            robot = create_chain_robot()
+            robot.estimate_inertials(density=1000.0)
+            robot.remove_joint(["joint2", "joint3"], **kwargs)
+            self.assertEqual(sorted(str(link) for link in robot.links), ["link0", "link1"])
+            link = robot.get_link("link1")
+            self.assertEqual(len(link.collisions), n_collisions)
+            if mass is None:
+                self.assertGreater(link.inertial.mass, 3.0)
+            else:
+                self.assertAlmostEqual(link.inertial.mass, mass)
+
+    def test_correct_inertials(self):
+        robot = create_chain_robot()
+        robot.estimate_inertials(density=1000.0)
+        robot.get_link("link1").inertial.mass = 0.0
+        report = robot.correct_inertials(limit=0.001)
+        self.assertEqual(report["link1"]["mass"], (0.0, 0.001))
+        self.assertNotIn("link0", report)
+        self.assertAlmostEqual(robot.get_link("link1").inertial.mass, 0.001)
+
+
+class TestXMLWriting(unittest.TestCase):
+    def create_robot(self):
+        robot = create_chain_robot()
+        material = representation.Material(name="red", diffuse=[1, 0, 0, 1])
+        for i, link in enumerate(robot.links):
+            link.inertial = representation.Inertial(
+                mass=0.5 + i, inertia=representation.Inertia(ixx=0.01, ixy=0.001, iyy=0.02, izz=0.03),
+                origin=representation.Pose(xyz=[0, 0, 0.1 * i], rpy=[0.1, 0, 0], relative_to=link)
+            )
+            link.add_aggregate("visual", representation.Visual(
+                name=f"link{i}_visual", geometry=representation.Cylinder(radius=0.05, length=0.3 + i / 3),
+                material=material, origin=representation.Pose(xyz=[0, 0, 0.1], relative_to=link)
+            ))
+        robot.add_aggregate("link", representation.Link(name="tool"))
+        robot.add_aggregate("joint", representation.Joint(
+            name="tool_joint", parent="link3", child="tool", joint_type="fixed",
+            origin=representation.Pose(xyz=[0, 0, 1 / 3], rpy=[0, 0, 1 / 7])
+        ))
+        robot.link_entities()
+        return robot
+
+    def test_xml_equals_expected_output(self):
+        # the expected files have been written by the interpreting to_xml() before the writers were compiled
+        robot = self.create_robot()
+        for dialect in ["urdf", "sdf"]:
+            with open("test_data/xml_writing/chain." + dialect, "r") as f:
+                self.assertEqual(getattr(robot, "to_" + dialect + "_string")(), f.read())
+
+    def test_streamed_xml_equals_xml_string(self):
+        robot = create_chain_robot()
+        for dialect in ["urdf", "sdf"]:
+            f = io.StringIO()
+            getattr(robot, "write_" + dialect)(f)
+            self.assertEqual(f.getvalue(), getattr(robot, "to_" + dialect + "_string")())
+
+
+class TestExportTargets(unittest.TestCase):
+    def get_files(self, outputdir):
+        files = {}
+        for directory, _, filenames in os.walk(outputdir):
+            for filename in filenames:
+                with open(os.path.join(directory, filename), "r") as f:
+                    files[os.path.relpath(os.path.join(directory, filename), outputdir)] = f.read()
+        return files
+
+    def test_workers_export_the_same_files(self):
+        robot = create_chain_robot()
+        export_config = [
+            {"type": "urdf", "mesh_format": "stl", "ros_pathes": False, "link_in_smurf": True},
+            {"type": "sdf", "mesh_format": "stl", "ros_pathes": False},
+            {"type": "smurf"}
+        ]
+        exported = []
+        for n_workers in [1, 2]:
+            outputdir = f"test_data/.temp/export_targets_{n_workers}"
+            shutil.rmtree(outputdir, ignore_errors=True)
+            robot.export(outputdir, export_config=export_config, with_meshes=False, n_workers=n_workers)
+            exported.append(self.get_files(outputdir))
+        self.assertIn(os.path.join("urdf", "chain.urdf"), exported[0])
+        self.assertIn(os.path.join("sdf", "chain.sdf"), exported[0])
+        self.assertIn(os.path.join("smurf", "chain.smurf"), exported[0])
+        self.assertEqual(sorted(exported[0].keys()), sorted(exported[1].keys()))
+        self.assertEqual(exported[0], exported[1])